@@ -0,0 +1,45 @@
+"""
+Dump and load times of the serializers for a large, numeric-heavy synced root.
+
+Run from the repository root with `python -m benchmarks.bench_serializers`.
+"""
+
+import timeit
+
+from syncx import tag
+from syncx.serializer import JsonSerializer
+from syncx.serializer import PickleSerializer
+from syncx.serializer import YamlSerializer
+from syncx.serializer import memory_stream
+
+ROWS = 10_000
+REPEATS = 3
+
+
+def make_root():
+    return tag({
+        'name': 'measurements',
+        'rows': [{'id': i, 'values': [i * 0.5 + j for j in range(10)], 'ok': i % 2 == 0} for i in range(ROWS)],
+    })
+
+
+def bench(serializer, root):
+    def dump():
+        stream = memory_stream(serializer)
+        serializer.dump(root, stream)
+        return stream
+
+    contents = dump().getvalue()
+
+    def load():
+        serializer.load(memory_stream(serializer, contents))
+
+    return timeit.timeit(dump, number=REPEATS) / REPEATS, timeit.timeit(load, number=REPEATS) / REPEATS
+
+
+if __name__ == '__main__':
+    root = make_root()
+    print(f'{"serializer":>12} {"dump":>10} {"load":>10}')
+    for serializer in (YamlSerializer(), JsonSerializer(), PickleSerializer()):
+        dump_time, load_time = bench(serializer, root)
+        print(f'{serializer.file_extension:>12} {dump_time * 1e3:>7.1f} ms {load_time * 1e3:>7.1f} ms')
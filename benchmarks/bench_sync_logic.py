@@ -0,0 +1,72 @@
+"""
+Cost of `MultiClientIncremental.put()` when other clients have recorded changes, as the data grows.
+
+Run from the repository root with `python -m benchmarks.bench_sync_logic`. Changes to separate keys are accepted
+without copying the data, so their time should stay flat across sizes; changes to the same key need the full
+comparison, which copies the data.
+"""
+
+import contextlib
+import copy
+import timeit
+
+from syncx.sync_logic import Content
+from syncx.sync_logic import DeltaWithSignature
+from syncx.sync_logic import MultiClientIncremental
+from syncx.sync_logic import get_signature
+
+SIZES = (1_000, 10_000, 100_000)
+REPEATS = 20
+
+
+class UnchangingFrontend:
+    """
+    Leaves the local data as is when remote changes are applied, so that every repeat starts from the same data.
+    """
+
+    def apply_external_delta(self, delta):
+        pass
+
+
+class MemoryBackend:
+
+    def __init__(self, content: Content):
+        self.content = content
+
+    @contextlib.contextmanager
+    def get_content(self):
+        yield self.content
+
+    def add_to_deltas(self, signature, delta):
+        pass
+
+
+def put_time(size, remote_key):
+    data = {str(i): {'value': i} for i in range(size)}
+    local_delta = [('change', ['0', 'value'], (0, -1))]
+    local_object = copy.deepcopy(data)
+    local_object['0']['value'] = -1
+
+    local_signature = get_signature(None, local_delta)
+    remote_delta = [('change', [remote_key, 'value'], (int(remote_key), -2))]
+    remote_signature = get_signature(local_signature, remote_delta)
+    content = Content(
+        latest_signature=remote_signature,
+        full_object=data,
+        unapplied_changes=[
+            DeltaWithSignature(local_signature, local_delta),
+            DeltaWithSignature(remote_signature, remote_delta),
+        ],
+    )
+    backend = MemoryBackend(content)
+
+    def put():  # From the same starting point every time, as a put that loses a conflict adopts the remote state
+        MultiClientIncremental(UnchangingFrontend(), backend).put(local_delta, local_object)
+
+    return timeit.timeit(put, number=REPEATS) / REPEATS
+
+
+if __name__ == '__main__':
+    print(f'{"size":>10} {"separate keys":>16} {"same key":>16}')
+    for size in SIZES:
+        print(f'{size:>10} {put_time(size, "1") * 1e3:>13.3f} ms {put_time(size, "0") * 1e3:>13.3f} ms')
@@ -0,0 +1,44 @@
+"""
+Cost of single tracked mutations as the container grows.
+
+Run from the repository root with `python -m benchmarks.bench_wrappers`. Per-operation times should stay
+roughly flat across sizes.
+"""
+
+import timeit
+
+from syncx import tag
+
+SIZES = (1_000, 10_000, 100_000)
+REPEATS = 1_000
+
+
+def bench(size):
+    data = tag({'items': [{'value': i} for i in range(size)], 'index': {str(i): i for i in range(size)}})
+    items = data['items']
+    index = data['index']
+
+    def append():
+        items.append({'value': 0})
+
+    def set_item():
+        items[0] = {'value': 1}
+
+    def set_key():
+        index['0'] = {'value': 1}
+
+    def insert_first():
+        items.insert(0, {'value': 0})
+
+    def pop_first():
+        items.pop(0)
+
+    operations = (append, set_item, set_key, insert_first, pop_first)
+    return [timeit.timeit(operation, number=REPEATS) / REPEATS for operation in operations]
+
+
+if __name__ == '__main__':
+    print(f'{"size":>10} {"list.append":>14} {"list[0] =":>14} {"dict[k] =":>14} {"insert(0)":>14} {"pop(0)":>14}')
+    for size in SIZES:
+        timings = bench(size)
+        print(f'{size:>10}', *(f'{timing * 1e6:>11.1f} µs' for timing in timings))
@@ -1,7 +1,9 @@
+from syncx.api import flush
 from syncx.api import manage
 from syncx.api import redo
 from syncx.api import rollback
 from syncx.api import sync
+from syncx.api import sync_async
 from syncx.api import undo
 from syncx.api import untag
 from syncx.api import tag
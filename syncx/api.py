@@ -1,11 +1,14 @@
 import copy
 from typing import Any
+from typing import Optional
 from typing import Type
 from typing import TypeVar
 from typing import Union
 
+from syncx.backend import AsyncBackend
 from syncx.backend import Backend
 from syncx.exceptions import Rollback
+from syncx.history import History
 from syncx.manager import Manager
 from syncx.manager import ManagerInterface
 from syncx.serializer import Serializer
@@ -19,16 +22,40 @@ def tag(
     target: T,
     change_callback: callable = None,
     history: bool = False,
-    manager: Manager = None
+    manager: Manager = None,
+    lazy: bool = False,
+    history_capacity: int = None,
+    history_max_bytes: int = None,
+    history_checkpoint_interval: Optional[int] = History.default_checkpoint_interval,
+    read_write_lock: bool = False,
+    lock_timeout: float = None,
 ) -> T:
     """
     Tag target data structure to get notified of any changes.
 
     Return value is a proxy type, but type hinted to match the tagged object for editor convenience.
+
+    With `lazy=True`, only the root is wrapped immediately, and contained data structures are wrapped when they
+    are first accessed. Useful for large structures where only some parts are touched.
+
+    History keeps at most `history_capacity` changes and `history_max_bytes` of them (as pickled), if given.
+    Once the history has been moved around in with `goto()`, a copy of the data is kept as a checkpoint every
+    `history_checkpoint_interval` changes, counted in `history_max_bytes`. With `None`, there are no checkpoints,
+    e.g. for large lazily wrapped data that checkpoints would load in full.
+
+    With `read_write_lock=True`, threads reading the data within `manage(tagged).read()` do not block each other,
+    only changes. `lock_timeout` (seconds, default 1) limits the wait for the lock before `LockingRaceCondition`.
     """
-    tagged = wrap_target(target, [], manager or Manager(change_callback))
+    manager = manager or Manager(change_callback)
+    if read_write_lock or lock_timeout is not None:
+        manager.set_lock(read_write_lock, lock_timeout)
+    if lazy:
+        manager.lazy = True
+    tagged = wrap_target(target, manager)
     if history:
-        tagged._manager.set_history()
+        tagged._manager.set_history(
+            history_capacity, history_max_bytes, checkpoint_interval=history_checkpoint_interval
+        )
     return tagged
 
 
@@ -63,14 +90,95 @@ def sync(
     serializer: Union[Serializer, Type[Serializer]] = None,
     backend: Backend = None,
     history: bool = False,
+    lazy: bool = False,
+    flush_interval: float = None,
+    flush_changes: int = None,
+    history_capacity: int = None,
+    history_max_bytes: int = None,
+    history_checkpoint_interval: Optional[int] = History.default_checkpoint_interval,
+    persistent_history: bool = False,
+    read_write_lock: bool = False,
+    lock_timeout: float = None,
+    poll_interval: float = None,
+) -> T:
+    """
+    Tag the target and save it, and every change to it, with the backend.
+
+    History and lock options are as in `tag()`. With `persistent_history=True`, history is also saved in a file
+    next to the synced data (`<name>.history`), and restored from it on the next run. Only recent changes are
+    kept in memory.
+
+    With `lazy=True`, contained data structures are wrapped when first accessed. If the target is a dict and the
+    backend can read single keys, like `SqliteBackend` and `ShardedFileBackend`, existing data is also loaded from
+    the backend one top-level key at a time, as the keys are accessed.
+
+    If `flush_interval` (seconds) or `flush_changes` is given, changes are written in a background thread, at
+    most every `flush_interval` seconds or when `flush_changes` changes have accumulated. Pending changes are
+    written at exit, or with `flush()`.
+
+    With a backend that detects changes made by other processes, like `SharedFileBackend`, the changes are merged
+    into the data before every write, and also every `poll_interval` seconds if given, or on `manage().refresh()`.
+    """
+    if not is_wrapped(target):
+        target = tag(target, lazy=lazy, read_write_lock=read_write_lock, lock_timeout=lock_timeout)
+    else:
+        if lazy:
+            target._manager.lazy = True
+        if read_write_lock or lock_timeout is not None:
+            target._manager.set_lock(read_write_lock, lock_timeout)
+    tagged = target._manager.start_sync(target, name, serializer, backend, flush_interval, flush_changes)
+    if history or persistent_history:
+        history_path = f'{tagged._manager.name}.history' if persistent_history else None
+        tagged._manager.set_history(
+            history_capacity, history_max_bytes, history_path, history_checkpoint_interval
+        )
+    if poll_interval:
+        tagged._manager.set_watcher(poll_interval)
+    return tagged
+
+
+async def sync_async(
+    target: T,
+    name: str,
+    serializer: Union[Serializer, Type[Serializer]] = None,
+    backend: AsyncBackend = None,
+    history: bool = False,
+    lazy: bool = False,
+    flush_interval: float = None,
+    flush_changes: int = None,
+    history_capacity: int = None,
+    history_max_bytes: int = None,
+    history_checkpoint_interval: Optional[int] = History.default_checkpoint_interval,
 ) -> T:
+    """
+    Like `sync()`, for use in asyncio code: the backend is async, and changes are written from a task on the
+    running event loop.
+
+    All changes made before the task gets to run are written together. With `flush_interval` (seconds), the task
+    waits that long for more changes, unless `flush_changes` changes have accumulated. `await flush()` writes
+    pending changes immediately, and is needed before the event loop stops: pending changes are written when
+    `asyncio.run()` cancels the task, but not if the loop is just stopped.
+    """
     if not is_wrapped(target):
-        target = tag(target)
-    tagged = target._manager.start_sync(target, name, serializer, backend)
+        target = tag(target, lazy=lazy)
+    elif lazy:
+        target._manager.lazy = True
+    tagged = await target._manager.start_sync_async(target, name, serializer, backend, flush_interval, flush_changes)
     if history:
-        tagged._manager.set_history()
+        tagged._manager.set_history(
+            history_capacity, history_max_bytes, checkpoint_interval=history_checkpoint_interval
+        )
     return tagged
 
 
+def flush(tagged: Any):
+    """
+    Writes pending changes of background-written data. Returns an awaitable for data synced with `sync_async()`.
+    """
+    if not is_wrapped(tagged):
+        raise ValueError(f'Call sync() on {tagged} before using flush()')
+    return tagged._manager.flush()
+
+
 def rollback():
     raise Rollback()
\ No newline at end of file
@@ -1,14 +1,59 @@
-import io
+import asyncio
+import contextlib
+import copy
+import functools
+import json
+import pickle
+import sqlite3
+import struct
 import tempfile
+import threading
+import urllib.parse
+from collections.abc import Mapping
 from pathlib import Path
 from typing import Any
+from typing import Callable
+from typing import Iterator
+from typing import Optional
 from typing import Protocol
+from typing import Union
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+import dictdiffer
+from syncx.deltas import CHANGE
+from syncx.deltas import node_path
+from syncx.deltas import plain_delta
 from syncx.serializer import Serializer
+from syncx.serializer import locked
+from syncx.serializer import memory_stream
+from syncx.serializer import serializable
+from syncx.sync_logic import Content
+from syncx.sync_logic import DeltaSignature
+from syncx.sync_logic import DeltaWithSignature
+from syncx.sync_logic import MultiClientIncremental
+from syncx.utils import flatten
+
+
+def member(content: Any, key: Any) -> Any:
+    """
+    Returns the content, or the value of the key in it if a key is given.
+    """
+    if key is None or content is None:
+        return content
+    try:
+        return content[key]
+    except (KeyError, IndexError, TypeError):
+        return None
 
 
 class Backend(Protocol):
 
+    incremental: bool  # If True, put() is given the delta of every change
+
     def __init__(self, name: str, *args, **kwargs):
         """
         Initialize the backend with a name.
@@ -22,38 +67,779 @@ class Backend(Protocol):
     def get(self, serializer: Serializer, key: str = None) -> Any:
         """
         Read/get value from the backend provider, with an optional key.
+
+        With a key, returns only the value of that top-level key. Backends that can read it without reading the
+        rest of the data also have a `keys(serializer)` method, returning the top-level keys, or None if there is
+        no data or it is not a mapping. These backends are loaded lazily with `sync(..., lazy=True)`.
+        """
+
+
+class AsyncBackend(Protocol):
+    """
+    Backend for data synced with `sync_async()`, called from the running event loop.
+    """
+
+    incremental: bool  # If True, put() is given the delta of every change
+
+    def __init__(self, name: str, *args, **kwargs):
+        """
+        Initialize the backend with a name.
+        """
+
+    async def put(self, root: Any, serializer: Serializer, delta: Any = None):
+        """
+        Write/send value to the backend provider. Root should be serialized before the first await, so that the
+        value written is the value at the time of the call.
+        """
+
+    async def get(self, serializer: Serializer, key: str = None) -> Any:
+        """
+        Read/get value from the backend provider, with an optional key.
         """
 
 
 class FileBackend:
 
+    incremental = False
+
     def __init__(self, name: str):
         self.filename = name
 
     def put(self, root: Any, serializer: Serializer, delta: Any = None):
         """
-        Writes contents first to a temporary file to avoid empty/corrupted contents in case of an error.
+        Serializes the data directly into the file, without building the contents in memory first.
         """
-        stream = io.StringIO()
-        serializer.dump(root, stream)
+        with self.replacement_file(binary=getattr(serializer, 'binary', False)) as stream:
+            serializer.dump(root, stream)
+
+    def get(self, serializer: Serializer, key: str = None) -> Any:
+        """
+        Returns the file contents as de-serialized data, or None if file does not exist or is empty.
+        """
+        content = self.load(self.read(binary=getattr(serializer, 'binary', False)), serializer)
+        return member(content, key)
+
+    def write(self, contents: Union[str, bytes]):
+        with self.replacement_file(binary=isinstance(contents, bytes)) as stream:
+            stream.write(contents)
 
-        _, temporary_file_path = tempfile.mkstemp(text=True)
-        temporary_file = Path(temporary_file_path)
+    @contextlib.contextmanager
+    def replacement_file(self, binary: bool = False):
+        """
+        Yields a stream to a temporary file that replaces the file when done, to avoid empty/corrupted contents in
+        case of an error. The temporary file is in the same directory, so the replacement is atomic.
+        """
+        directory = Path(self.filename).resolve().parent
+        mode = 'wb' if binary else 'w'
+        with tempfile.NamedTemporaryFile(mode, dir=directory, suffix='.tmp', delete=False) as temporary_file:
+            temporary_path = Path(temporary_file.name)
+            try:
+                yield temporary_file
+            except:
+                temporary_file.close()
+                temporary_path.unlink()
+                raise
+        temporary_path.replace(self.filename)
+
+    def read(self, binary: bool = False) -> Optional[Union[str, bytes]]:
+        file = Path(self.filename)
         try:
-            temporary_file.write_text(stream.getvalue())
-        except:
-            temporary_file.unlink()
-            raise
-        temporary_file.replace(self.filename)
+            return file.read_bytes() if binary else file.read_text()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def load(contents: Optional[Union[str, bytes]], serializer: Serializer) -> Any:
+        if contents is None:
+            return None
+        try:
+            return serializer.load(memory_stream(serializer, contents))
+        except EOFError:
+            return None
+
+
+class SharedFileBackend(FileBackend):
+    """
+    FileBackend for a file that several processes sync to.
 
+    Reads and writes are coordinated with an advisory lock (`fcntl.flock`) on a separate `<name>.lock` file, as
+    the file itself is replaced on every write. Before writing, the inode, size and modification time of the file
+    are compared with those seen on the last read or write. If another process has written in between, the
+    current contents are passed to `on_external_change(content, delta)` together with the local delta being
+    written, so that the manager can merge them into the data before it is written.
+
+    `changed()` is cheap enough to be polled, see `sync(..., poll_interval=...)`.
+    """
+
+    incremental = True  # Deltas are needed to merge local changes with external ones
+
+    def __init__(self, name: str):
+        if fcntl is None:
+            raise OSError('SharedFileBackend needs fcntl, which is not available on this platform')
+        super().__init__(name)
+        self.lock_filename = f'{name}.lock'
+        self.known_state = None  # State of the file when last read or written
+        self.on_external_change: Optional[Callable[[Any, Any], None]] = None
+
+    def put(self, root: Any, serializer: Serializer, delta: Any = None):
+        with self.file_lock(exclusive=True):
+            if self.on_external_change and self.changed():
+                content, self.known_state = self.read_content(serializer)
+                self.on_external_change(content, delta)
+            super().put(root, serializer, delta)
+            self.known_state = self.file_state()
 
     def get(self, serializer: Serializer, key: str = None) -> Any:
+        with self.file_lock(exclusive=False):
+            content, self.known_state = self.read_content(serializer)
+        return member(content, key)
+
+    def read_content(self, serializer: Serializer) -> tuple:
+        """
+        Returns the contents of the file and its state. Expects to be called with the lock held.
+        """
+        state = self.file_state()
+        return super().get(serializer), state
+
+    def changed(self) -> bool:
+        """
+        Returns True if the file has been written by someone else since it was last read or written.
+        """
+        return self.file_state() != self.known_state
+
+    def file_state(self) -> Optional[tuple]:
+        try:
+            stat = Path(self.filename).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    @contextlib.contextmanager
+    def file_lock(self, exclusive: bool):
+        with open(self.lock_filename, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class AsyncFileBackend:
+    """
+    File backend for use with `sync_async()`.
+
+    Data is serialized on the event loop, so that it does not change while being written, but reading and writing
+    the file happens in an executor, so that a slow disk does not block the loop. Uses the loop's default executor
+    unless one is given.
+    """
+
+    incremental = False
+
+    def __init__(self, name: str, executor: Any = None):
+        self.file_backend = FileBackend(name)
+        self.executor = executor
+
+    async def put(self, root: Any, serializer: Serializer, delta: Any = None):
+        stream = memory_stream(serializer)
+        serializer.dump(root, stream)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.file_backend.write, stream.getvalue())
+
+    async def get(self, serializer: Serializer, key: str = None) -> Any:
         """
         Returns the file contents as de-serialized data, or None if file does not exist or is empty.
         """
-        file = Path(self.filename)
+        loop = asyncio.get_running_loop()
+        binary = getattr(serializer, 'binary', False)
+        contents = await loop.run_in_executor(self.executor, self.file_backend.read, binary)
+        return FileBackend.load(contents, serializer)
+
+
+class JournalBackend:
+    """
+    Appends the delta of each change to the file as a record, instead of rewriting all of the data.
+
+    The file starts with a snapshot of the data, written with the serializer, followed by the change records.
+    When there are more than `max_records` records or `max_bytes` of them, the journal is compacted into a new
+    snapshot in a background thread. Records are pickled, so only read journals you have written yourself.
+    """
+
+    incremental = True
+
+    frame_header = struct.Struct('>I')
+
+    def __init__(self, name: str, max_records: int = 1000, max_bytes: int = 10_000_000):
+        self.filename = name
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+
+        self.lock = threading.Lock()
+        self.record_count = 0
+        self.record_bytes = 0
+        self.compaction_thread = None
+        self.records_during_compaction = []
+
+    def put(self, root: Any, serializer: Serializer, delta: Any = None):
+        """
+        Appends the delta to the journal, or replaces the whole journal with a snapshot if there is no delta.
+        """
+        if delta is None:
+            snapshot = self.snapshot_frame(root, serializer)
+            with self.lock:
+                self.replace_journal(snapshot, [])
+            return
+
+        if not delta:
+            return
+
+        frame = self.frame(pickle.dumps(delta, pickle.HIGHEST_PROTOCOL))
+        with self.lock:
+            with open(self.filename, 'ab') as journal:
+                journal.write(frame)
+            self.record_count += 1
+            self.record_bytes += len(frame)
+
+            if self.compaction_thread:
+                self.records_during_compaction.append(frame)
+            elif self.record_count > self.max_records or self.record_bytes > self.max_bytes:
+                self.compaction_thread = threading.Thread(
+                    target=self.compact, args=(copy.deepcopy(root), serializer), daemon=True
+                )
+                self.compaction_thread.start()
+
+    def get(self, serializer: Serializer, key: str = None) -> Any:
+        """
+        Returns the snapshot with the recorded changes applied, or None if the file does not exist or is empty.
+        """
         try:
-            stream = io.StringIO(file.read_text())
-            return serializer.load(stream)
+            with open(self.filename, 'rb') as journal:
+                frames = self.read_frames(journal)
+                snapshot = next(frames, None)
+                if snapshot is None:
+                    return None
+                content = serializer.load(memory_stream(serializer, pickle.loads(snapshot)))
+
+                record_count = record_bytes = 0
+                for frame in frames:
+                    dictdiffer.patch(plain_delta(pickle.loads(frame)), content, in_place=True)
+                    record_count += 1
+                    record_bytes += self.frame_header.size + len(frame)
+                complete_length = self.frame_header.size + len(snapshot) + record_bytes
+                journal.seek(0, 2)
+                torn = journal.tell() > complete_length
         except (FileNotFoundError, EOFError):
             return None
+
+        with self.lock:
+            if torn:  # Left by a crash in the middle of a write, and in the way of the next record
+                with open(self.filename, 'r+b') as journal:
+                    journal.truncate(complete_length)
+            self.record_count = record_count
+            self.record_bytes = record_bytes
+        return member(content, key)
+
+    def compact(self, content: Any, serializer: Serializer):
+        """
+        Writes a new snapshot of the content, followed by any changes recorded while the snapshot was written.
+        """
+        try:
+            snapshot = self.snapshot_frame(content, serializer)
+            with self.lock:
+                self.replace_journal(snapshot, self.records_during_compaction)
+        finally:
+            with self.lock:
+                self.records_during_compaction = []
+                self.compaction_thread = None
+
+    def snapshot_frame(self, content: Any, serializer: Serializer) -> bytes:
+        stream = memory_stream(serializer)
+        serializer.dump(content, stream)
+        return self.frame(pickle.dumps(stream.getvalue(), pickle.HIGHEST_PROTOCOL))
+
+    def replace_journal(self, snapshot: bytes, frames: list):
+        """
+        Writes a new journal to a temporary file first to avoid empty/corrupted contents in case of an error.
+        Expects to be called with the lock held.
+        """
+        directory = Path(self.filename).resolve().parent
+        with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as temporary_file:
+            temporary_path = Path(temporary_file.name)
+            try:
+                temporary_file.write(snapshot)
+                for frame in frames:
+                    temporary_file.write(frame)
+            except:
+                temporary_file.close()
+                temporary_path.unlink()
+                raise
+        temporary_path.replace(self.filename)
+        self.record_count = len(frames)
+        self.record_bytes = sum(len(frame) for frame in frames)
+
+    @classmethod
+    def frame(cls, payload: bytes) -> bytes:
+        return cls.frame_header.pack(len(payload)) + payload
+
+    @classmethod
+    def read_frames(cls, stream) -> Iterator[bytes]:
+        """
+        Yields the payloads of the frames in the stream, ignoring an incomplete last frame left by a crash.
+        """
+        while True:
+            header = stream.read(cls.frame_header.size)
+            if len(header) < cls.frame_header.size:
+                return
+            (length,) = cls.frame_header.unpack(header)
+            payload = stream.read(length)
+            if len(payload) < length:
+                return
+            yield payload
+
+
+class SqliteBackend:
+    """
+    Stores the data in an SQLite database, as rows keyed by path, and updates only the rows that a change touches.
+
+    Mappings and lists down to `depth` levels are split into rows, one per member, and anything deeper is stored
+    as a single serialized value in the row of its ancestor at that depth. With the default depth of 1, there is
+    one row per top-level key. Inserting into or removing from a split list rewrites the rows of the whole list,
+    as the indexes of the following members change.
+    """
+
+    incremental = True
+
+    def __init__(self, name: str, depth: int = 1):
+        self.filename = name
+        self.depth = depth
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(name, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS syncx (path TEXT PRIMARY KEY, kind TEXT NOT NULL, value BLOB)'
+            )
+
+    def put(self, root: Any, serializer: Serializer, delta: Any = None):
+        """
+        Rewrites the rows touched by the delta, or all of them if there is no delta.
+        """
+        if delta is not None and not delta:
+            return
+        touched = [[]] if delta is None else self.touched_paths(root, plain_delta(delta))
+
+        with locked(root), self.lock, self.connection:
+            for path in touched:
+                try:
+                    value = self.lookup(root, path)
+                except (KeyError, IndexError, TypeError):
+                    self.delete_rows(path, including_path=True)  # Removed
+                    continue
+                self.delete_rows(path)
+                self.upsert_rows(path, value, serializer)
+
+    def get(self, serializer: Serializer, key: str = None) -> Any:
+        """
+        Returns the data rebuilt from the rows, or None if the database is empty. With a key, reads only the rows
+        of that top-level key, if the data is split by key.
+        """
+        if key is None:
+            with self.lock:
+                rows = self.connection.execute('SELECT path, kind, value FROM syncx ORDER BY rowid').fetchall()
+            return self.rebuild(rows, [], serializer)
+
+        if self.root_kind() != 'dict':
+            return member(self.get(serializer), key)
+        path = [key]
+        prefix = json.dumps(path)[:-1] + ', '
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT path, kind, value FROM syncx WHERE path = ? OR (path >= ? AND path < ?) ORDER BY rowid',
+                (json.dumps(path), prefix, prefix[:-1] + '!'),
+            ).fetchall()
+        return self.rebuild(rows, path, serializer)
+
+    def keys(self, serializer: Serializer) -> Optional[list]:
+        """
+        Returns the top-level keys, or None if the database is empty or the data is not split by key.
+        """
+        if self.root_kind() != 'dict':
+            return None
+        with self.lock:
+            paths = self.connection.execute("SELECT path FROM syncx WHERE path != '[]' ORDER BY rowid").fetchall()
+        return [path[0] for path in map(json.loads, (row[0] for row in paths)) if len(path) == 1]
+
+    def root_kind(self) -> Optional[str]:
+        with self.lock:
+            root_row = self.connection.execute("SELECT kind FROM syncx WHERE path = '[]'").fetchone()
+        return root_row and root_row[0]
+
+    @staticmethod
+    def rebuild(rows: list, base_path: list, serializer: Serializer) -> Any:
+        """
+        Returns the value at `base_path` rebuilt from its rows, or None if there are no rows.
+        """
+        if not rows:
+            return None
+        rows = sorted(((json.loads(path), kind, value) for path, kind, value in rows), key=lambda row: len(row[0]))
+        containers = {}
+        root = None
+        for path, kind, value in rows:
+            if kind in ('dict', 'list'):
+                value = {}  # Lists are collected by index first
+                containers[json.dumps(path)] = (kind, path, value)
+            else:
+                value = serializer.load(memory_stream(serializer, value))
+            if path != base_path:
+                containers[json.dumps(path[:-1])][2][path[-1]] = value
+            else:
+                root = value
+
+        for kind, path, members in reversed(containers.values()):  # Deepest first
+            if kind == 'list':
+                members = [members[index] for index in sorted(members)]
+                if path != base_path:
+                    containers[json.dumps(path[:-1])][2][path[-1]] = members
+                else:
+                    root = members
+        return root
+
+    def touched_paths(self, root: Any, delta: list) -> list:
+        """
+        Returns the paths of the rows to rewrite for the delta, shortened to the storage depth, without paths
+        that are under another touched path.
+        """
+        touched = set()
+        for action, node, changes in delta:
+            path = node_path(node)
+            if action == CHANGE or len(path) >= self.depth:
+                touched.add(tuple(path[:self.depth]))
+                continue
+            try:
+                kind = self.container_kind(self.lookup(root, path))
+            except (KeyError, IndexError, TypeError):
+                kind = None
+            if kind == 'dict':
+                touched.update(tuple(path + [key]) for key, _ in changes)
+            else:
+                touched.add(tuple(path))  # Indexes of the following list members change
+
+        return [
+            list(path) for path in sorted(touched, key=len)
+            if not any(path[:length] in touched for length in range(len(path)))
+        ]
+
+    @staticmethod
+    def lookup(root: Any, path: list) -> Any:
+        value = serializable(root)
+        for key in path:
+            value = serializable(value[key])
+        return value
+
+    def delete_rows(self, path: list, including_path: bool = False):
+        """
+        Deletes the rows under the path, and optionally the row for the path itself.
+        """
+        encoded = json.dumps(path)
+        if not path:
+            self.connection.execute('DELETE FROM syncx' + ('' if including_path else " WHERE path != '[]'"))
+            return
+        prefix = encoded[:-1] + ', '  # Encoded paths under this one start with this
+        self.connection.execute(
+            'DELETE FROM syncx WHERE path >= ? AND path < ?',
+            (prefix, prefix[:-1] + '!'),
+        )
+        if including_path:
+            self.connection.execute('DELETE FROM syncx WHERE path = ?', (encoded,))
+
+    def upsert_rows(self, path: list, value: Any, serializer: Serializer):
+        """
+        Writes the rows for the value. The row for the path itself is updated in place, to keep its position among
+        its siblings.
+        """
+        rows = []
+        self.collect_rows(path, value, serializer, rows)
+        self.connection.executemany(
+            'INSERT INTO syncx (path, kind, value) VALUES (?, ?, ?) '
+            'ON CONFLICT (path) DO UPDATE SET kind = excluded.kind, value = excluded.value',
+            rows,
+        )
+
+    @staticmethod
+    def container_kind(value: Any) -> Optional[str]:
+        """
+        Returns the kind of the value if it can be split into rows, otherwise None.
+        """
+        if isinstance(value, Mapping) and all(type(key) in (str, int) for key in value):
+            return 'dict'
+        if isinstance(value, list):
+            return 'list'
+        return None
+
+    def collect_rows(self, path: list, value: Any, serializer: Serializer, rows: list):
+        kind = self.container_kind(value) if len(path) < self.depth else None
+        if kind:
+            rows.append((json.dumps(path), kind, None))
+            members = value.items() if kind == 'dict' else enumerate(value)
+            for key, member in members:
+                self.collect_rows(path + [key], serializable(member), serializer, rows)
+            return
+        stream = memory_stream(serializer)
+        serializer.dump(value, stream)
+        rows.append((json.dumps(path), 'value', stream.getvalue()))
+
+
+class StoredContent(Content):
+    """
+    Content with the full object read from the store only if it is needed.
+    """
+
+    def __init__(self, latest_signature, load_full_object, unapplied_changes, base_signature):
+        self.latest_signature = latest_signature
+        self.load_full_object = load_full_object
+        self.unapplied_changes = unapplied_changes
+        self.base_signature = base_signature
+
+    @functools.cached_property
+    def full_object(self) -> Any:
+        return self.load_full_object()
+
+
+class SqliteLogStore:
+    """
+    Log of changes shared by the clients of MultiClientIncremental, in an SQLite database: the full object as of
+    some point, and the deltas recorded after it.
+
+    `get_content()` holds a write transaction, which keeps other connections, also in other processes, from
+    changing the log until it is done. When there are more than `max_deltas` deltas, the older half of them is
+    folded into the full object. Clients that have not seen the folded deltas catch up by comparing full objects.
+    """
+
+    def __init__(self, name: str, max_deltas: int = 100):
+        self.max_deltas = max_deltas
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(name, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS content '
+                '(id INTEGER PRIMARY KEY CHECK (id = 0), counter INTEGER, hash TEXT, full_object BLOB)'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS deltas (counter INTEGER PRIMARY KEY, hash TEXT NOT NULL, delta BLOB)'
+            )
+
+    @contextlib.contextmanager
+    def get_content(self) -> Iterator[Content]:
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.load_content()
+            except:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+
+    def set_content(self, full_object: Any, signature: Optional[DeltaSignature]):
+        """
+        Stores the full object, with the changes up to the signature included. Expects to be called within
+        `get_content()`.
+        """
+        counter, delta_hash = (signature.counter, signature.hash) if signature else (None, None)
+        self.connection.execute(
+            'INSERT INTO content (id, counter, hash, full_object) VALUES (0, ?, ?, ?) ON CONFLICT(id) DO UPDATE '
+            'SET counter = excluded.counter, hash = excluded.hash, full_object = excluded.full_object',
+            (counter, delta_hash, pickle.dumps(full_object, pickle.HIGHEST_PROTOCOL)),
+        )
+        self.connection.execute('DELETE FROM deltas WHERE counter <= ?', (-1 if counter is None else counter,))
+
+    def add_to_deltas(self, signature: DeltaSignature, delta: Any):
+        """
+        Records the delta. Expects to be called within `get_content()`.
+        """
+        self.connection.execute(
+            'INSERT INTO deltas (counter, hash, delta) VALUES (?, ?, ?)',
+            (signature.counter, signature.hash, pickle.dumps(delta, pickle.HIGHEST_PROTOCOL)),
+        )
+        (count,) = self.connection.execute('SELECT COUNT(*) FROM deltas').fetchone()
+        if count > self.max_deltas:
+            self.fold(count // 2)
+
+    def fold(self, count: int):
+        """
+        Applies the oldest deltas to the full object.
+        """
+        content = self.load_content()
+        folded = content.unapplied_changes[:count]
+        full_object = dictdiffer.patch(flatten([change.delta for change in folded]), content.full_object)
+        self.set_content(full_object, folded[-1].signature)
+
+    def latest_signature(self) -> Optional[DeltaSignature]:
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT counter, hash FROM deltas ORDER BY counter DESC LIMIT 1'
+            ).fetchone() or self.connection.execute('SELECT counter, hash FROM content').fetchone()
+        return self.signature(row)
+
+    def load_content(self) -> Content:
+        base_row = self.connection.execute('SELECT counter, hash FROM content').fetchone()
+        base_signature = self.signature(base_row)
+        unapplied_changes = [
+            DeltaWithSignature(DeltaSignature(counter, delta_hash), pickle.loads(delta))
+            for counter, delta_hash, delta in self.connection.execute(
+                'SELECT counter, hash, delta FROM deltas ORDER BY counter'
+            )
+        ]
+        latest_signature = unapplied_changes[-1].signature if unapplied_changes else base_signature
+        return StoredContent(latest_signature, self.load_full_object, unapplied_changes, base_signature)
+
+    def load_full_object(self) -> Any:
+        row = self.connection.execute('SELECT full_object FROM content').fetchone()
+        return None if row is None or row[0] is None else pickle.loads(row[0])
+
+    @staticmethod
+    def signature(row: Optional[tuple]) -> Optional[DeltaSignature]:
+        if row is None or row[0] is None:
+            return None
+        return DeltaSignature(*row)
+
+
+class SharedLogBackend:
+    """
+    Backend for data edited by several processes at once, with only changes passed between them.
+
+    Changes are recorded as deltas in a log shared through an SQLite database (see SqliteLogStore). Before a
+    change is recorded, the changes recorded by others since are applied to the local data, incrementally. If
+    they conflict with the local change, the local change is reverted instead of recorded. Changes by others are
+    also applied on `manage().refresh()`, or with `sync(..., poll_interval=...)`.
+
+    The data and the deltas are pickled, so only share the database between processes you trust.
+    """
+
+    incremental = True
+
+    def __init__(self, name: str, max_deltas: int = 100):
+        self.store = SqliteLogStore(name, max_deltas)
+        self.clients = MultiClientIncremental(None, self.store)
+
+    @property
+    def frontend(self):
+        """
+        Manager that changes recorded by others are applied to.
+        """
+        return self.clients.frontend
+
+    @frontend.setter
+    def frontend(self, frontend):
+        self.clients.frontend = frontend
+
+    def put(self, root: Any, serializer: Serializer, delta: Any = None):
+        """
+        Records the delta, or replaces the shared data with the root if there is no delta.
+        """
+        if delta is None:
+            with locked(root):
+                self.clients.replace(copy.deepcopy(root))
+        elif delta:
+            self.clients.put(delta, root)
+
+    def get(self, serializer: Serializer, key: str = None) -> Any:
+        return member(self.clients.get_initial(), key)
+
+    def changed(self) -> bool:
+        """
+        Returns True if others have recorded changes since the latest local change.
+        """
+        return self.store.latest_signature() != self.clients.latest_signature
+
+    def pull(self, root: Any) -> bool:
+        return self.clients.pull(root)
+
+
+class ShardedFileBackend:
+    """
+    Stores each top-level key of a mapping root, or each attribute of an object root, in its own file in the
+    `name` directory, and rewrites only the files of the keys that a change touches.
+
+    Key order is kept in a separate index file, which is rewritten only when keys are added or removed.
+    """
+
+    incremental = True
+
+    def __init__(self, name: str):
+        self.directory = Path(name)
+
+    def put(self, root: Any, serializer: Serializer, delta: Any = None):
+        if delta is not None and not delta:
+            return
+
+        with locked(root):
+            content = serializable(root)
+            if not isinstance(content, Mapping):
+                raise TypeError(f'Sharded data must be a mapping or an object, not {type(content)}')
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+            keys = list(content)
+            shard_names = {self.shard_name(key, serializer): key for key in keys}
+            if len(shard_names) < len(keys):
+                raise ValueError(f'Keys with the same file name: {keys}')
+
+            touched, keys_changed = self.touched_keys(delta)
+            for key in keys if touched is None else touched:
+                if key in content:
+                    self.shard(key, serializer).put(content[key], serializer)
+
+            if keys_changed:
+                self.index(serializer).put(keys, serializer)
+                for path in self.directory.glob(f'*.{serializer.file_extension}'):
+                    if path.name not in shard_names and not path.name.startswith('.'):
+                        path.unlink()
+
+    def get(self, serializer: Serializer, key: str = None) -> Any:
+        """
+        Returns the data read from the shards, or None if there is no index file. With a key, reads only the shard
+        of that key.
+        """
+        if key is not None:
+            return self.shard(key, serializer).get(serializer)
+        keys = self.keys(serializer)
+        if keys is None:
+            return None
+        return {key: self.shard(key, serializer).get(serializer) for key in keys}
+
+    def keys(self, serializer: Serializer) -> Optional[list]:
+        """
+        Returns the top-level keys, or None if there is no index file.
+        """
+        return self.index(serializer).get(serializer)
+
+    @staticmethod
+    def touched_keys(delta: Optional[list]) -> tuple:
+        """
+        Returns the top-level keys touched by the delta, or None for all of them, and whether keys were added or
+        removed.
+        """
+        if delta is None:
+            return None, True
+        touched = {}  # Used as an ordered set
+        keys_changed = False
+        for action, node, changes in plain_delta(delta):
+            path = node_path(node)
+            if path:
+                touched[path[0]] = None
+            elif action == CHANGE:
+                return None, True
+            else:
+                touched.update((key, None) for key, _ in changes)
+                keys_changed = True
+        return list(touched), keys_changed
+
+    def shard(self, key: Any, serializer: Serializer) -> FileBackend:
+        return FileBackend(str(self.directory / self.shard_name(key, serializer)))
+
+    def index(self, serializer: Serializer) -> FileBackend:
+        return FileBackend(str(self.directory / f'.index.{serializer.file_extension}'))
+
+    @staticmethod
+    def shard_name(key: Any, serializer: Serializer) -> str:
+        name = urllib.parse.quote(str(key), safe='')
+        if name.startswith('.'):  # Keep clear of the index and other hidden files
+            name = '%2E' + name[1:]
+        return f'{name}.{serializer.file_extension}'
@@ -0,0 +1,279 @@
+"""
+Build dictdiffer-compatible deltas directly from intercepted mutating calls, without diffing copies.
+"""
+
+import copy
+from collections.abc import MutableMapping
+from collections.abc import MutableSequence
+from collections.abc import MutableSet
+from collections.abc import Sequence
+from typing import Any
+from typing import Optional
+
+from syncx.wrappers import is_wrapped
+
+ADD, REMOVE, CHANGE = 'add', 'remove', 'change'
+
+
+def dotted(path: list):
+    """
+    Returns the path in the same notation as `dictdiffer.diff`: a dotted string if possible, otherwise a list.
+    """
+    if all(isinstance(key, str) and '.' not in key for key in path):
+        return '.'.join(path)
+    return list(path)
+
+
+def node_path(node) -> list:
+    """
+    Returns the path of a delta node as a list, whether it is in dotted or list notation.
+    """
+    if isinstance(node, str):
+        return node.split('.') if node else []
+    return list(node)
+
+
+def plain_delta(delta: list) -> list:
+    """
+    Returns the delta without the `__dict__` path elements of tracked objects, for applying it to data in its
+    serialized form, where objects are plain dicts.
+    """
+    return [
+        (action, dotted([key for key in node_path(node) if key != '__dict__']), changes)
+        for action, node, changes in delta
+    ]
+
+
+def operation_delta(location: Any, path: list, function_name: str, args: tuple, kwargs: dict) -> Optional[list]:
+    """
+    Returns the delta that calling `function_name` on `location` with the given arguments is about to cause.
+
+    Must be called before the change is made. Returns None if the operation cannot be modelled, in which case
+    the caller should fall back to diffing copies of the location.
+
+    Wrapped locations are recognized through their subject's class, hence the `collections.abc` checks.
+    """
+    if isinstance(location, MutableSet):
+        builders = set_builders
+    elif isinstance(location, MutableSequence):
+        builders = sequence_builders
+    elif isinstance(location, MutableMapping):
+        builders = mapping_builders
+    else:
+        return None
+
+    builder = builders.get(function_name)
+    if builder is None:
+        return None
+    try:
+        return builder(location, path, *args, **kwargs)
+    except (TypeError, ValueError):  # Unexpected arguments, let the original function decide
+        return None
+
+
+def _set_key(location, path, key, value):
+    if key not in location:
+        return [(ADD, dotted(path), [(key, copy.deepcopy(value))])]
+    old_value = location[key]
+    if old_value is value:
+        return []
+    return [(CHANGE, dotted(path + [key]), (copy.deepcopy(old_value), copy.deepcopy(value)))]
+
+
+def _delete_key(location, path, key):
+    if key not in location:
+        return []
+    return [(REMOVE, dotted(path), [(key, copy.deepcopy(location[key]))])]
+
+
+def _pop_key(location, path, key, *default):
+    return _delete_key(location, path, key)
+
+
+def _setdefault(location, path, key, default=None):
+    if key in location:
+        return []
+    return [(ADD, dotted(path), [(key, copy.deepcopy(default))])]
+
+
+def _update(location, path, other=(), **kwargs):
+    if hasattr(other, 'keys'):
+        updates = {key: other[key] for key in other.keys()}
+    elif isinstance(other, Sequence):
+        updates = dict(other)
+    else:
+        return None  # Iterators would be consumed here
+    updates.update(kwargs)
+
+    delta = []
+    additions = []
+    for key, value in updates.items():
+        if key in location:
+            delta.extend(_set_key(location, path, key, value))
+        else:
+            additions.append((key, copy.deepcopy(value)))
+    if additions:
+        delta.append((ADD, dotted(path), additions))
+    return delta
+
+
+def _clear_mapping(location, path):
+    if not len(location):
+        return []
+    return [(REMOVE, dotted(path), [(key, copy.deepcopy(value)) for key, value in location.items()])]
+
+
+def _index(location, index):
+    """
+    Returns the index normalized to a non-negative value, or None if it is out of range.
+    """
+    length = len(location)
+    if index < 0:
+        index += length
+    if 0 <= index < length:
+        return index
+    return None
+
+
+def _set_index(location, path, index, value):
+    if isinstance(index, slice):
+        return None
+    index = _index(location, index)
+    if index is None:
+        return []
+    old_value = location[index]
+    if old_value is value:
+        return []
+    return [(CHANGE, dotted(path + [index]), (copy.deepcopy(old_value), copy.deepcopy(value)))]
+
+
+def _delete_index(location, path, index):
+    if isinstance(index, slice):
+        return None
+    index = _index(location, index)
+    if index is None:
+        return []
+    return [(REMOVE, dotted(path), [(index, copy.deepcopy(location[index]))])]
+
+
+def _pop_index(location, path, index=-1):
+    return _delete_index(location, path, index)
+
+
+def _insert(location, path, index, value):
+    length = len(location)
+    if index < 0:
+        index = max(index + length, 0)
+    index = min(index, length)
+    return [(ADD, dotted(path), [(index, copy.deepcopy(value))])]
+
+
+def _append(location, path, value):
+    return [(ADD, dotted(path), [(len(location), copy.deepcopy(value))])]
+
+
+def _extend(location, path, values):
+    if not isinstance(values, Sequence):
+        return None  # Iterators would be consumed here
+    if not len(values):
+        return []
+    start = len(location)
+    return [(ADD, dotted(path), [(start + i, copy.deepcopy(value)) for i, value in enumerate(values)])]
+
+
+def _remove_value(location, path, value):
+    try:
+        index = location.index(value)
+    except ValueError:
+        return []
+    return _delete_index(location, path, index)
+
+
+def _add_members(path, members):
+    if not members:
+        return []
+    return [(ADD, dotted(path), [(0, copy.deepcopy(members))])]
+
+
+def _remove_members(path, members):
+    if not members:
+        return []
+    return [(REMOVE, dotted(path), [(0, copy.deepcopy(members))])]
+
+
+def _add(location, path, value):
+    return _add_members(path, set() if value in location else {value})
+
+
+def _discard(location, path, value):
+    return _remove_members(path, {value} if value in location else set())
+
+
+def _clear_set(location, path):
+    return _remove_members(path, set(location))
+
+
+def _set_operator(build):
+    """
+    Models an in-place set operator only for operands that builtin sets accept. With others, there is no change,
+    as the operator returns NotImplemented or raises.
+    """
+    def builder(location, path, other):
+        if not isinstance(other, (set, frozenset)) or is_wrapped(other):
+            return None
+        return build(location, path, other)
+
+    return builder
+
+
+def _union(location, path, other):
+    return _add_members(path, {value for value in other if value not in location})
+
+
+def _difference(location, path, other):
+    return _remove_members(path, {value for value in other if value in location})
+
+
+def _intersection(location, path, other):
+    return _remove_members(path, {value for value in location if value not in other})
+
+
+def _symmetric_difference(location, path, other):
+    return _remove_members(path, {value for value in other if value in location}) + _add_members(
+        path, {value for value in other if value not in location}
+    )
+
+
+# Attribute changes of tracked objects come here too, with the object's __dict__ as the location
+mapping_builders = {
+    '__setitem__': _set_key,
+    '__setattr__': _set_key,
+    '__delitem__': _delete_key,
+    '__delattr__': _delete_key,
+    'pop': _pop_key,
+    'setdefault': _setdefault,
+    'update': _update,
+    'clear': _clear_mapping,
+}
+
+sequence_builders = {
+    '__setitem__': _set_index,
+    '__delitem__': _delete_index,
+    'pop': _pop_index,
+    'insert': _insert,
+    'append': _append,
+    'extend': _extend,
+    '__iadd__': _extend,
+    'remove': _remove_value,
+}
+
+set_builders = {
+    'add': _add,
+    'discard': _discard,
+    'remove': _discard,
+    'clear': _clear_set,
+    '__ior__': _set_operator(_union),
+    '__isub__': _set_operator(_difference),
+    '__iand__': _set_operator(_intersection),
+    '__ixor__': _set_operator(_symmetric_difference),
+}
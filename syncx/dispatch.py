@@ -0,0 +1,240 @@
+"""
+Delivering change notifications outside the thread making the change.
+"""
+
+import asyncio
+import atexit
+import itertools
+import logging
+import threading
+import time
+from collections.abc import MutableSequence
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+COALESCE = 'coalesce'
+
+# Changes to a single member, given as the first argument
+keyed_functions = ('__setitem__', '__delitem__', '__setattr__', '__delattr__', 'pop', 'setdefault')
+
+
+class ThreadDispatcher:
+    """
+    Change callback that queues the change details and calls `callback` with them from a background thread, so
+    that changes are not held up by a slow callback. Use it in place of the callback:
+
+        tag(data, ThreadDispatcher(update_ui, batch_interval=0.1))
+
+    With `batch_interval` (seconds), the callback is called with a list of the changes made within the interval,
+    instead of once for every change.
+
+    With `max_pending`, at most that many changes are queued, and `overflow` decides what happens to further
+    changes: with `'block'`, the change waits until there is room; with `'drop_oldest'`, the oldest queued
+    change is dropped; with `'coalesce'`, a queued change to the same key or item is replaced with the new one
+    (even when there is room), and the change waits if there is no such change. Changes that are not to a single
+    member, like `update()` or `append()`, are coalesced by container. Dropped and coalesced changes are counted
+    in `dropped` and `coalesced`.
+
+    A change waiting for room holds the lock on the data, which cannot be released before the change has been
+    synced. While a change waits, a callback that changes the data, or reads it with `read_lock()`, waits for
+    the lock in turn and gets `LockingRaceCondition` when the lock timeout runs out. Use `'drop_oldest'`, or no
+    `max_pending`, with such callbacks.
+
+    Change details refer to the live data, so the callback sees the data as it is when called, not as it was
+    when the change was made. Exceptions raised by the callback are logged. Pending changes are delivered on
+    `flush()`, `close()` and at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Any], Any],
+        batch_interval: float = None,
+        max_pending: int = None,
+        overflow: str = BLOCK,
+    ):
+        if overflow not in (BLOCK, DROP_OLDEST, COALESCE):
+            raise ValueError(f'Unknown overflow option {overflow!r}, use one of: {BLOCK}, {DROP_OLDEST}, {COALESCE}')
+        self.callback = callback
+        self.batch_interval = batch_interval
+        self.max_pending = max_pending
+        self.overflow = overflow
+
+        self.condition = threading.Condition()
+        self.pending = {}  # Change details in order, by path when coalescing, otherwise by running number
+        self.ids = itertools.count()
+        self.delivering = False
+        self.hurry = False  # Deliver without waiting for the batch interval
+        self.closed = False
+        self.dropped = 0
+        self.coalesced = 0
+
+        self.thread = threading.Thread(target=self.run, name='syncx-dispatcher', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def __call__(self, change_details: Any):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('Dispatcher is closed')
+            if self.overflow == COALESCE:
+                key = changed_path(change_details)
+                if key in self.pending:
+                    del self.pending[key]  # Moves the change to the end of the queue
+                    self.coalesced += 1
+            else:
+                key = next(self.ids)
+            if key not in self.pending and self.full():
+                if self.overflow == DROP_OLDEST:
+                    del self.pending[next(iter(self.pending))]
+                    self.dropped += 1
+                elif threading.current_thread() is not self.thread:  # A callback would be waiting for itself
+                    self.condition.wait_for(lambda: not self.full() or self.closed)
+            self.pending[key] = change_details
+            self.condition.notify_all()
+
+    def full(self) -> bool:
+        return bool(self.max_pending) and len(self.pending) >= self.max_pending
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.closed)
+                if not self.pending:
+                    return
+
+                if self.batch_interval:
+                    deadline = time.monotonic() + self.batch_interval
+                    while not (self.closed or self.hurry or self.full()):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.condition.wait(remaining)
+
+                changes = list(self.pending.values())
+                self.pending.clear()
+                self.delivering = True
+                self.condition.notify_all()  # Changes waiting for room can go ahead
+
+            try:
+                if self.batch_interval:
+                    self.deliver(changes)
+                else:
+                    for change_details in changes:
+                        self.deliver(change_details)
+            finally:
+                with self.condition:
+                    self.delivering = False
+                    self.condition.notify_all()
+
+    def deliver(self, changes: Any):
+        """
+        Calls the callback with a change, or a list of changes if batching.
+        """
+        try:
+            self.callback(changes)
+        except Exception:
+            logger.exception('Change callback failed')
+
+    def flush(self):
+        """
+        Delivers pending changes now, and waits until they have been delivered.
+        """
+        if threading.current_thread() is self.thread:
+            return
+        with self.condition:
+            self.hurry = True
+            self.condition.notify_all()
+            try:
+                self.condition.wait_for(lambda: not (self.pending or self.delivering) or not self.thread.is_alive())
+            finally:
+                self.hurry = False
+
+    def close(self):
+        """
+        Delivers pending changes and stops the background thread.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+        atexit.unregister(self.close)
+
+
+class PoolDispatcher(ThreadDispatcher):
+    """
+    Like ThreadDispatcher, but calls the callback in a thread pool, so that a slow callback does not hold up the
+    following ones. The callbacks may then run at the same time and finish in any order.
+
+    Uses the given `executor`, or creates a ThreadPoolExecutor with `max_workers`, shut down on `close()`.
+    `flush()` waits until the changes have been handed to the pool.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Any], Any],
+        executor: Executor = None,
+        max_workers: int = None,
+        **options,
+    ):
+        self.own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers, thread_name_prefix='syncx-callback')
+        super().__init__(callback, **options)
+
+    def deliver(self, changes: Any):
+        try:
+            self.executor.submit(self.callback, changes).add_done_callback(log_failure)
+        except RuntimeError:  # Pool already shut down
+            logger.exception('Change callback could not be scheduled')
+
+    def close(self):
+        super().close()
+        if self.own_executor:
+            self.executor.shutdown()
+
+
+class AsyncioDispatcher(ThreadDispatcher):
+    """
+    Like ThreadDispatcher, but calls the callback on an asyncio event loop, by default the one running when the
+    dispatcher is created. The callback can be a coroutine function. `flush()` waits until the changes have been
+    handed to the loop.
+    """
+
+    def __init__(self, callback: Callable[[Any], Any], loop: asyncio.AbstractEventLoop = None, **options):
+        self.loop = loop or asyncio.get_running_loop()
+        super().__init__(callback, **options)
+
+    def deliver(self, changes: Any):
+        try:
+            if asyncio.iscoroutinefunction(self.callback):
+                asyncio.run_coroutine_threadsafe(self.callback(changes), self.loop).add_done_callback(log_failure)
+            else:
+                self.loop.call_soon_threadsafe(self.callback, changes)
+        except RuntimeError:  # Loop already closed
+            logger.exception('Change callback could not be scheduled')
+
+
+def changed_path(change_details: Any) -> tuple:
+    """
+    Returns the path to the member the change is to, or to the container if the change is not to a single member
+    or shifts the positions of list items.
+    """
+    path = tuple(change_details.path_to_location)
+    if change_details.function_name in keyed_functions and change_details.args:
+        key = change_details.args[0]
+        is_sequence = isinstance(change_details.location, MutableSequence)
+        if not isinstance(key, slice) and (change_details.function_name == '__setitem__' or not is_sequence):
+            return path + (key,)
+    return path
+
+
+def log_failure(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error('Change callback failed', exc_info=future.exception())
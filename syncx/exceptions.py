@@ -21,4 +21,11 @@ class HistoryError(Exception):
     pass
 
 
+class TransactionError(Exception):
+    """
+    Raised when using savepoints outside of a transaction, or one that is not available.
+    """
+    pass
+
+
 class UnresolvableConflict(Exception): pass
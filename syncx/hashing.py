@@ -0,0 +1,144 @@
+"""
+Canonical binary encoding of data, for hashing.
+"""
+
+import datetime
+import decimal
+import enum
+import hashlib
+import struct
+import uuid
+from collections.abc import Mapping
+from collections.abc import Set
+from typing import Any
+
+from syncx.serializer import make_serializable
+from syncx.wrappers import is_wrapped
+
+length = struct.Struct('>Q')
+double = struct.Struct('>d')
+
+# Encoded as their string form, with the tag telling the types apart
+scalar_tags = {
+    decimal.Decimal: (b'D', str),
+    uuid.UUID: (b'u', str),
+    datetime.datetime: (b'w', datetime.datetime.isoformat),
+    datetime.date: (b'y', datetime.date.isoformat),
+    datetime.time: (b'h', datetime.time.isoformat),
+    datetime.timedelta: (b'r', repr),
+}
+
+
+def new_hash(previous: bytes = b''):
+    """
+    Returns a hash object to feed encodings to, seeded with the previous hash for chaining.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(previous)
+    return digest
+
+
+def canonical_hash(value: Any, previous: bytes = b'') -> bytes:
+    """
+    Returns the hash of the canonical encoding of the value, chained to a previous hash if given.
+    """
+    digest = new_hash(previous)
+    digest.update(encode(value))
+    return digest.digest()
+
+
+def encode(value: Any) -> bytes:
+    """
+    Returns the value as bytes that are the same for equal data, regardless of dict or set ordering.
+
+    Supports the types the serializers handle: standard containers and scalars, tagged data, dataclasses, pydantic
+    models and other objects with a `__dict__`, as well as Decimals, UUIDs and datetimes. Lists and tuples are
+    encoded the same, as serializers do not tell them apart either.
+    """
+    out = bytearray()
+    write(value, out)
+    return bytes(out)
+
+
+def write(value: Any, out: bytearray):
+    value_type = type(value)  # Plain types first, by exact type, as deltas consist mostly of them
+    if value_type is str:
+        encoded = value.encode('utf-8', 'surrogatepass')
+        out += b's'
+        out += length.pack(len(encoded))
+        out += encoded
+    elif value_type is int:
+        encoded = str(value).encode()
+        out += b'i'
+        out += length.pack(len(encoded))
+        out += encoded
+    elif value_type is list or value_type is tuple:
+        out += b'l'
+        out += length.pack(len(value))
+        for item in value:
+            write(item, out)
+    elif value_type is dict:
+        write_mapping(value, out)
+    else:
+        write_other(value, out)
+
+
+def write_other(value: Any, out: bytearray):
+    if is_wrapped(value):
+        value = value.__subject__
+
+    if value is None:
+        out += b'N'
+    elif value is True or value is False:
+        out += b'T' if value else b'F'
+    elif isinstance(value, str):
+        write_bytes(b's', value.encode('utf-8', 'surrogatepass'), out)
+    elif isinstance(value, enum.Enum):
+        write_bytes(b'n', f'{type(value).__qualname__}.{value.name}'.encode(), out)
+    elif isinstance(value, int):
+        write_bytes(b'i', str(value).encode(), out)
+    elif isinstance(value, float):
+        out += b'f'
+        out += double.pack(value)
+    elif isinstance(value, (bytes, bytearray)):
+        write_bytes(b'b', value, out)
+    elif isinstance(value, (list, tuple)):
+        out += b'l'
+        out += length.pack(len(value))
+        for item in value:
+            write(item, out)
+    elif isinstance(value, Mapping):
+        write_mapping(value, out)
+    elif isinstance(value, Set):
+        out += b'e'
+        out += length.pack(len(value))
+        for item in sorted(encode(item) for item in value):
+            out += item
+    else:
+        for scalar_type, (tag, to_str) in scalar_tags.items():
+            if isinstance(value, scalar_type):
+                write_bytes(tag, to_str(value).encode(), out)
+                return
+        write_object(value, out)
+
+
+def write_bytes(tag: bytes, value: bytes, out: bytearray):
+    out += tag
+    out += length.pack(len(value))
+    out += value
+
+
+def write_mapping(mapping: Mapping, out: bytearray):
+    out += b'm'
+    out += length.pack(len(mapping))
+    for key, value in sorted(((encode(key), value) for key, value in mapping.items()), key=lambda item: item[0]):
+        out += key
+        write(value, out)
+
+
+def write_object(value: Any, out: bytearray):
+    serializable_value = make_serializable(value)
+    if serializable_value is None:
+        raise TypeError(f'Cannot encode value of type {type(value).__name__}')
+    write_bytes(b'o', type(value).__qualname__.encode(), out)
+    write(serializable_value, out)
@@ -1,16 +1,57 @@
-from types import SimpleNamespace
+import bisect
+import copy
+import pickle
+import struct
+import tempfile
+from collections import deque
+from pathlib import Path
+from typing import Any
+from typing import Optional
 
-import dictdiffer
+from syncx.backend import JournalBackend
 
 
 class History:
+    """
+    Change history for undo and redo, as a ring buffer of deltas.
 
-    def __init__(self, capacity=None):
-        self._capacity = capacity
+    When there are more than `capacity` entries, or the entries and checkpoints take more than `max_bytes` (as
+    pickled), the oldest checkpoints and then the oldest entries are dropped. Changes made within transactions are
+    logged, so that they can be rolled back.
+
+    Once there is a first checkpoint, a full copy of the data is kept as a checkpoint every `checkpoint_interval`
+    versions, so that any version can be reached by replaying at most about half an interval of deltas from the
+    nearest checkpoint. With `checkpoint_interval=None`, no checkpoints are kept.
+    """
+
+    default_checkpoint_interval = 100
+
+    def __init__(
+        self,
+        capacity: int = None,
+        max_bytes: int = None,
+        checkpoint_interval: Optional[int] = default_checkpoint_interval,
+    ):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.checkpoint_interval = checkpoint_interval
         self._ignore_changes = False
 
         self.current_index = 0
-        self.entries = []
+        self.entries = deque()
+        self.entry_sizes = deque()
+        self.total_bytes = 0
+
+        self.base_version = 0  # Number of entries dropped from the start, to keep checkpoint versions stable
+        self.checkpoints = {}  # Copies of the data by version, counting dropped entries
+        self.checkpoint_sizes = {}  # By version, counted in total_bytes
+        self.checkpoint_versions = []  # Sorted
+
+        self.transactions = []  # Savepoints at the start of each transaction
+        self.rollback_log = []  # Operations that reverse the changes made within transactions
+
+    def entry(self, index: int) -> Any:
+        return self.entries[index]
 
     @property
     def on(self) -> bool:
@@ -18,4 +59,403 @@ class History:
 
     @on.setter
     def on(self, value: bool):
-        self._ignore_changes = not value
\ No newline at end of file
+        self._ignore_changes = not value
+
+    def add(self, delta: Any) -> int:
+        """
+        Adds an entry at the current index, dropping any entries that could have been redone. Returns the new
+        current index.
+        """
+        while len(self.entries) > self.current_index:
+            self.log('append', *self.pop())
+        current_version = self.base_version + self.current_index
+        while self.checkpoint_versions and self.checkpoint_versions[-1] > current_version:
+            version = self.checkpoint_versions[-1]
+            self.log('set_checkpoint', version, *self.remove_checkpoint(version))
+
+        size = self.entry_size(delta) if self.max_bytes else 0
+        self.entries.append(delta)
+        self.entry_sizes.append(size)
+        self.total_bytes += size
+        self.log('pop')
+        self.trim()
+
+        self.current_index = len(self.entries)
+        return self.current_index
+
+    def entry_size(self, entry: Any) -> int:
+        return len(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+
+    def trim(self):
+        while self.entries and self.capacity is not None and len(self.entries) > self.capacity:
+            self.log('appendleft', *self.popleft())
+        self.drop_checkpoints_before(self.base_version)
+        while self.max_bytes is not None and self.total_bytes > self.max_bytes and (
+            self.entries or self.checkpoint_versions
+        ):
+            if self.checkpoint_versions and (not self.entries or self.checkpoint_versions[0] <= self.base_version):
+                self.drop_checkpoints_before(self.checkpoint_versions[0] + 1)  # Oldest first
+            else:
+                self.log('appendleft', *self.popleft())
+                self.drop_checkpoints_before(self.base_version)
+
+    def drop_checkpoints_before(self, version: int):
+        while self.checkpoint_versions and self.checkpoint_versions[0] < version:
+            oldest = self.checkpoint_versions[0]
+            self.log('set_checkpoint', oldest, *self.remove_checkpoint(oldest))
+
+    def over_max_bytes(self) -> bool:
+        return self.max_bytes is not None and self.total_bytes > self.max_bytes
+
+    def pop(self) -> tuple:
+        size = self.entry_sizes.pop()
+        self.total_bytes -= size
+        return self.entries.pop(), size
+
+    def popleft(self) -> tuple:
+        size = self.entry_sizes.popleft()
+        self.total_bytes -= size
+        self.base_version += 1
+        self.current_index = max(self.current_index - 1, 0)  # Still at the same version
+        return self.entries.popleft(), size
+
+    def append(self, entry: Any, size: int):
+        self.entries.append(entry)
+        self.entry_sizes.append(size)
+        self.total_bytes += size
+
+    def appendleft(self, entry: Any, size: int):
+        self.entries.appendleft(entry)
+        self.entry_sizes.appendleft(size)
+        self.total_bytes += size
+        self.base_version -= 1
+
+    def needs_first_checkpoint(self) -> bool:
+        return bool(self.checkpoint_interval) and not self.checkpoint_versions
+
+    def needs_checkpoint(self) -> bool:
+        """
+        Returns True if a checkpoint is due at the current index, once there is a first checkpoint.
+        """
+        if not self.checkpoint_interval or not self.checkpoint_versions:
+            return False
+        version = self.base_version + self.current_index
+        return version % self.checkpoint_interval == 0 and version not in self.checkpoints
+
+    def add_checkpoint(self, data: Any):
+        """
+        Keeps `data`, a copy of the data at the current index, as a checkpoint.
+        """
+        version = self.base_version + self.current_index
+        self.set_checkpoint(version, data, self.entry_size(data) if self.max_bytes else 0)
+        self.log('remove_checkpoint', version)
+        self.trim()
+
+    def set_checkpoint(self, version: int, data: Any, size: int):
+        if version in self.checkpoints:
+            self.remove_checkpoint(version)
+        bisect.insort(self.checkpoint_versions, version)
+        self.checkpoints[version] = data
+        self.checkpoint_sizes[version] = size
+        self.total_bytes += size
+
+    def remove_checkpoint(self, version: int) -> tuple:
+        """
+        Removes the checkpoint and returns its data and size.
+        """
+        self.checkpoint_versions.remove(version)
+        size = self.checkpoint_sizes.pop(version)
+        self.total_bytes -= size
+        return self.checkpoints.pop(version), size
+
+    def nearest_checkpoint(self, index: int) -> Optional[int]:
+        """
+        Returns the index of the checkpoint closest to the index, or None if there are no checkpoints.
+        """
+        version = self.base_version + index
+        position = bisect.bisect_left(self.checkpoint_versions, version)
+        candidates = self.checkpoint_versions[max(position - 1, 0):position + 1]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda candidate: abs(candidate - version)) - self.base_version
+
+    def checkpoint(self, index: int) -> Any:
+        """
+        Returns a copy of the data at the checkpoint at the index.
+        """
+        return copy.deepcopy(self.checkpoints[self.base_version + index])
+
+    def log(self, operation: str, *args):
+        if self.transactions:
+            self.rollback_log.append((operation, args))
+
+    def start_transaction(self):
+        self.transactions.append(self.savepoint())
+
+    def end_transaction(self, do_rollback: bool):
+        if not self.transactions:  # History was set up within the transaction
+            return
+        savepoint = self.transactions.pop()
+        if do_rollback:
+            self.rollback_to(savepoint)
+        elif not self.transactions:
+            self.rollback_log.clear()
+
+    def savepoint(self) -> Any:
+        """
+        Returns the position in the rollback log and the current index, for `rollback_to`.
+        """
+        return len(self.rollback_log), self.current_index
+
+    def rollback_to(self, savepoint: Any):
+        """
+        Reverses the changes logged after the savepoint.
+        """
+        log_position, current_index = savepoint
+        for operation, args in reversed(self.rollback_log[log_position:]):
+            getattr(self, operation)(*args)
+        del self.rollback_log[log_position:]
+        self.current_index = current_index
+
+
+class StoredEntry:
+    """
+    History entry or checkpoint of PersistentHistory: the delta or checkpointed data, if in memory, and the
+    position of its record in the file.
+    """
+
+    __slots__ = ('delta', 'offset', 'size')
+
+    def __init__(self, delta: Any, offset: Optional[int], size: int):
+        self.delta = delta
+        self.offset = offset
+        self.size = size
+
+
+class PersistentHistory(History):
+    """
+    History that is also appended to a file, and loaded from it on start, so that undo survives restarts.
+
+    Only the latest `memory_entries` deltas are kept in memory, older ones are read from the file when needed.
+    Checkpoints are only kept in the file. Records of changes made within transactions are written when the
+    outermost transaction is committed. The file is compacted when most of its records are no longer needed.
+    Records are pickled, so only read history files you have written yourself.
+    """
+
+    default_memory_entries = 100
+
+    ADD, INDEX, CHECKPOINT = b'a', b'i', b'c'
+    checkpoint_header = struct.Struct('>Q')  # Version, counted from the start of the file
+
+    def __init__(
+        self,
+        path: str,
+        capacity: int = None,
+        max_bytes: int = None,
+        memory_entries: int = None,
+        checkpoint_interval: Optional[int] = History.default_checkpoint_interval,
+    ):
+        self._current_index = 0
+        self.recording = False
+        super().__init__(capacity, max_bytes, checkpoint_interval)
+        self.path = Path(path)
+        self.memory_entries = self.default_memory_entries if memory_entries is None else memory_entries
+        self.pending = []  # Records waiting for the outermost transaction to be committed
+        self.record_count = 0
+        self.file_base = 0  # Version of the first entry in the file
+        self.load()
+        self.recording = True
+
+    @property
+    def current_index(self) -> int:
+        return self._current_index
+
+    @current_index.setter
+    def current_index(self, value: int):
+        if value != self._current_index:
+            self._current_index = value
+            if self.recording:  # Counted from the start of the file, like the entries when loading
+                file_index = self.base_version - self.file_base + value
+                self.write(self.INDEX + pickle.dumps(file_index, pickle.HIGHEST_PROTOCOL))
+
+    def entry(self, index: int) -> Any:
+        stored = self.entries[index]
+        if stored.delta is not None:
+            return stored.delta
+        with self.path.open('rb') as file:
+            return pickle.loads(self.read_payload(file, stored.offset)[1:])
+
+    def add(self, delta: Any) -> int:
+        payload = self.ADD + pickle.dumps(delta, pickle.HIGHEST_PROTOCOL)
+        stored = StoredEntry(delta, None, len(payload))
+        self.write(payload, stored)
+
+        self.recording = False  # The index follows from the add record
+        try:
+            index = super().add(stored)
+        finally:
+            self.recording = True
+
+        self.page_out()
+        if not self.transactions and self.needs_compaction():
+            self.compact()
+        return index
+
+    def page_out(self):
+        """
+        Drops the deltas of written entries older than the latest `memory_entries` from memory. Stops at the first
+        entry that has no delta in memory or is not written yet, as the entries before it have been paged out.
+        """
+        for position in range(len(self.entries) - self.memory_entries - 1, -1, -1):
+            stored = self.entries[position]
+            if stored.delta is None or stored.offset is None:
+                break
+            stored.delta = None
+
+    def add_checkpoint(self, data: Any):
+        version = self.base_version + self.current_index
+        payload = (
+            self.CHECKPOINT +
+            self.checkpoint_header.pack(version - self.file_base) +
+            pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        )
+        stored = StoredEntry(data, None, len(payload))
+        self.write(payload, stored)
+        super().add_checkpoint(stored)
+
+    def checkpoint(self, index: int) -> Any:
+        stored = self.checkpoints[self.base_version + index]
+        if stored.delta is not None:  # Not written yet
+            return copy.deepcopy(stored.delta)
+        with self.path.open('rb') as file:
+            return pickle.loads(self.read_payload(file, stored.offset)[1 + self.checkpoint_header.size:])
+
+    def needs_compaction(self) -> bool:
+        return self.record_count > 2 * len(self.entries) + len(self.checkpoints) + self.memory_entries
+
+    def entry_size(self, entry: StoredEntry) -> int:
+        return entry.size
+
+    def write(self, payload: bytes, stored: StoredEntry = None):
+        if self.transactions:
+            self.pending.append((payload, stored))
+            return
+        with self.path.open('ab') as file:
+            self.append_record(file, payload, stored)
+
+    def append_record(self, file, payload: bytes, stored: Optional[StoredEntry]):
+        if stored is not None:
+            stored.offset = file.tell()
+            if payload[:1] == self.CHECKPOINT:
+                stored.delta = None
+        file.write(JournalBackend.frame(payload))
+        self.record_count += 1
+
+    def savepoint(self) -> Any:
+        return super().savepoint(), len(self.pending)
+
+    def rollback_to(self, savepoint: Any):
+        history_savepoint, pending_position = savepoint
+        self.recording = False  # Restoring the index is not a change to record
+        try:
+            super().rollback_to(history_savepoint)
+        finally:
+            self.recording = True
+        del self.pending[pending_position:]
+
+    def end_transaction(self, do_rollback: bool):
+        if not self.transactions:
+            return
+        super().end_transaction(do_rollback)
+        if not do_rollback and not self.transactions:
+            pending, self.pending = self.pending, []
+            with self.path.open('ab') as file:
+                for payload, stored in pending:
+                    self.append_record(file, payload, stored)
+            self.page_out()  # Entries added within the transaction could not be paged out before being written
+
+    def load(self):
+        """
+        Replays the records in the file to restore the entries and the current index.
+        """
+        if not self.path.exists():
+            return
+        entries = []
+        checkpoints = {}
+        index = 0
+        offset = 0
+        record_count = 0
+        header_size = JournalBackend.frame_header.size
+        with self.path.open('rb') as file:
+            for payload in JournalBackend.read_frames(file):
+                if payload[:1] == self.ADD:
+                    del entries[index:]
+                    checkpoints = {version: stored for version, stored in checkpoints.items() if version <= index}
+                    entries.append(StoredEntry(None, offset, len(payload)))
+                    index = len(entries)
+                elif payload[:1] == self.CHECKPOINT:
+                    (version,) = self.checkpoint_header.unpack_from(payload, 1)
+                    checkpoints[version] = StoredEntry(None, offset, len(payload))
+                else:
+                    index = pickle.loads(payload[1:])
+                offset += header_size + len(payload)
+                record_count += 1
+            self.truncate_incomplete_record(file, offset)
+
+            for entry in entries[-self.memory_entries:] if self.memory_entries else []:
+                entry.delta = pickle.loads(self.read_payload(file, entry.offset)[1:])
+
+        self.record_count = record_count
+        for entry in entries:
+            self.append(entry, entry.size if self.max_bytes else 0)
+        for version, stored in checkpoints.items():
+            if version <= len(entries):
+                self.set_checkpoint(version, stored, stored.size if self.max_bytes else 0)
+        self._current_index = min(index, len(self.entries))
+        self.trim()
+        if self.needs_compaction():
+            self.compact()
+
+    def truncate_incomplete_record(self, file, length: int):
+        file.seek(0, 2)
+        if file.tell() > length:  # Left by a crash in the middle of a write
+            with self.path.open('r+b') as writable:
+                writable.truncate(length)
+
+    def compact(self):
+        """
+        Rewrites the file with only the records of the current entries and checkpoints.
+        """
+        checkpoints = [self.checkpoints[version] for version in self.checkpoint_versions]
+        directory = self.path.resolve().parent
+        with self.path.open('rb') as file, tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as new:
+            temporary_path = Path(new.name)
+            try:
+                offsets = []
+                for entry in self.entries:
+                    offsets.append(new.tell())
+                    new.write(JournalBackend.frame(self.read_payload(file, entry.offset)))
+                checkpoint_offsets = []
+                for version, stored in zip(self.checkpoint_versions, checkpoints):
+                    checkpoint_offsets.append(new.tell())
+                    payload = self.read_payload(file, stored.offset)
+                    header = self.checkpoint_header.pack(version - self.base_version)
+                    new.write(JournalBackend.frame(self.CHECKPOINT + header + payload[1 + len(header):]))
+                new.write(JournalBackend.frame(self.INDEX + pickle.dumps(self.current_index, pickle.HIGHEST_PROTOCOL)))
+            except:
+                new.close()
+                temporary_path.unlink()
+                raise
+        temporary_path.replace(self.path)
+        for entry, offset in zip(self.entries, offsets):
+            entry.offset = offset
+        for stored, offset in zip(checkpoints, checkpoint_offsets):
+            stored.offset = offset
+        self.file_base = self.base_version
+        self.record_count = len(self.entries) + len(checkpoints) + 1
+
+    @staticmethod
+    def read_payload(file, offset: int) -> bytes:
+        file.seek(offset)
+        (length,) = JournalBackend.frame_header.unpack(file.read(JournalBackend.frame_header.size))
+        return file.read(length)
@@ -0,0 +1,56 @@
+"""
+Data that is loaded from the backend piece by piece, as it is accessed.
+"""
+
+import copy
+from collections.abc import MutableMapping
+from typing import Any
+from typing import Callable
+from typing import Iterable
+
+NOT_LOADED = object()
+
+
+class LazyDict(MutableMapping):
+    """
+    Mapping with known keys, where the value of each key is loaded with `load_value(key)` when first accessed.
+    """
+
+    __slots__ = ('load_value', 'values_by_key')
+
+    def __init__(self, keys: Iterable, load_value: Callable[[Any], Any]):
+        self.load_value = load_value
+        self.values_by_key = dict.fromkeys(keys, NOT_LOADED)
+
+    def __getitem__(self, key):
+        value = self.values_by_key[key]
+        if value is NOT_LOADED:
+            value = self.values_by_key[key] = self.load_value(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.values_by_key[key] = value
+
+    def __delitem__(self, key):
+        del self.values_by_key[key]
+
+    def __contains__(self, key):
+        return key in self.values_by_key
+
+    def __iter__(self):
+        return iter(self.values_by_key)
+
+    def __len__(self):
+        return len(self.values_by_key)
+
+    def __repr__(self):
+        return repr({key: '...' if value is NOT_LOADED else value for key, value in self.values_by_key.items()})
+
+    def __deepcopy__(self, memo):
+        """
+        Copies are plain dicts, with everything loaded.
+        """
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def is_loaded(self, key) -> bool:
+        return self.values_by_key[key] is not NOT_LOADED
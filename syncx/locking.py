@@ -0,0 +1,115 @@
+"""
+Reader-writer lock for data that is read by many threads and changed by a few.
+"""
+
+import threading
+from dataclasses import dataclass
+
+
+@dataclass
+class LockStatistics:
+    """
+    Counts of lock acquisitions, of acquisitions that had to wait for other threads, and of timeouts.
+    """
+    reads: int = 0
+    writes: int = 0
+    read_waits: int = 0
+    write_waits: int = 0
+    timeouts: int = 0
+
+
+class RWLock:
+    """
+    Lock that any number of threads can hold for reading at the same time, or one thread for writing.
+
+    Writers are preferred: while a writer is waiting, new readers wait too, so that a steady stream of readers
+    cannot starve the writers. Both kinds of locking are re-entrant, and the thread holding the lock for writing
+    can also acquire it for reading, but a read lock cannot be upgraded to a write lock.
+
+    `acquire`, `release` and using the lock in a `with` statement lock for writing, like with `threading.RLock`.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.writer = None  # Identity of the thread holding the lock for writing
+        self.write_count = 0
+        self.read_counts = {}  # By thread identity
+        self.waiting_writers = 0
+        self.statistics = LockStatistics()
+
+    def can_read(self) -> bool:
+        return self.writer is None and not self.waiting_writers
+
+    def can_write(self) -> bool:
+        return self.writer is None and not self.read_counts
+
+    def acquire_read(self, blocking: bool = True, timeout: float = -1) -> bool:
+        me = threading.get_ident()
+        with self.condition:
+            if self.writer != me and me not in self.read_counts and not self.can_read():
+                if not self.wait(self.can_read, blocking, timeout, 'read_waits'):
+                    return False
+            self.read_counts[me] = self.read_counts.get(me, 0) + 1
+            self.statistics.reads += 1
+            return True
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self.condition:
+            count = self.read_counts.get(me)
+            if not count:
+                raise RuntimeError('Cannot release a read lock that is not held')
+            if count == 1:
+                del self.read_counts[me]
+                if not self.read_counts:
+                    self.condition.notify_all()
+            else:
+                self.read_counts[me] = count - 1
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        me = threading.get_ident()
+        with self.condition:
+            if self.writer != me:
+                if me in self.read_counts:
+                    raise RuntimeError('Cannot upgrade a read lock to a write lock')
+                if not self.can_write():
+                    self.waiting_writers += 1
+                    try:
+                        acquired = self.wait(self.can_write, blocking, timeout, 'write_waits')
+                    finally:
+                        self.waiting_writers -= 1
+                    if not acquired:
+                        self.condition.notify_all()  # Readers held back by this writer can go ahead
+                        return False
+                self.writer = me
+            self.write_count += 1
+            self.statistics.writes += 1
+            return True
+
+    def release(self):
+        with self.condition:
+            if self.writer != threading.get_ident():
+                raise RuntimeError('Cannot release a write lock that is not held')
+            self.write_count -= 1
+            if not self.write_count:
+                self.writer = None
+                self.condition.notify_all()
+
+    def wait(self, predicate, blocking: bool, timeout: float, counter: str) -> bool:
+        """
+        Waits for the predicate to become true, with the condition held. Returns False on timeout.
+        """
+        if not blocking:
+            return False
+        setattr(self.statistics, counter, getattr(self.statistics, counter) + 1)
+        if not self.condition.wait_for(predicate, None if timeout < 0 else timeout):
+            self.statistics.timeouts += 1
+            return False
+        return True
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
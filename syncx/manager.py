@@ -1,20 +1,45 @@
+import contextlib
 import copy
+import dataclasses
+import functools
+import itertools
 import threading
+import weakref
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 from typing import Optional
 
 import dictdiffer
+from syncx.backend import AsyncBackend
+from syncx.backend import AsyncFileBackend
 from syncx.backend import Backend
 from syncx.backend import FileBackend
+from syncx.deltas import operation_delta
+from syncx.deltas import plain_delta
 from syncx.exceptions import HistoryError
 from syncx.exceptions import LockingRaceCondition
+from syncx.exceptions import TransactionError
 from syncx.history import History
+from syncx.history import PersistentHistory
+from syncx.lazy import LazyDict
+from syncx.locking import LockStatistics
+from syncx.locking import RWLock
+from syncx.merkle import HashSource
+from syncx.merkle import LocalSource
+from syncx.merkle import reconciling_delta
+from syncx.merkle import subtree_hash
 from syncx.serializer import JsonSerializer
+from syncx.serializer import PickleSerializer
 from syncx.serializer import Serializer
 from syncx.serializer import YamlSerializer
+from syncx.snapshot import Snapshot
+from syncx.snapshot import SnapshotView
 from syncx.utils import flatten
+from syncx.watcher import ChangeWatcher
+from syncx.wrappers import wrap_target
+from syncx.writer import AsyncWriteBehind
+from syncx.writer import WriteBehind
 
 
 @dataclass
@@ -32,6 +57,7 @@ class Manager:
 
     default_serializer = YamlSerializer
     default_backend = FileBackend
+    default_async_backend = AsyncFileBackend
     default_name = 'data.yaml'
 
     LOCK_TIMEOUT = 1.0
@@ -48,29 +74,50 @@ class Manager:
         self.root = None
         self.root_type = None
 
-        self.all_changes = []  # All changes within context, raw appended list
+        self.all_changes = []  # All changes within the outermost transaction, raw appended list
         self.history = None  # Optional history that can be manipulated with undo and redo
         self.transactions = []
+        self.savepoints = {}  # Transaction depth, change index and history savepoint by name
+        self.savepoint_ids = itertools.count(1)
+        self.writer = None  # Optional background writer, see set_write_behind
+        self.watcher = None  # Optional poller for changes made by other processes, see set_watcher
+
+        self.change_count = 0
+        self.snapshots = weakref.WeakSet()  # Snapshots in use, preserving the state of containers before changes
 
         self.change_tracking_active = True
+        self.lazy = False  # Wrap members on first access instead of all up front
 
     def execute_change(self, path, original_function, args, kwargs):
 
+        if self.snapshots:
+            location = dictdiffer.dot_lookup(self.root, path)
+            for snapshot in list(self.snapshots):
+                snapshot.preserve(location)
+        self.change_count += 1
+
         if not self.change_tracking_active:
             return original_function(*args, **kwargs)
 
         need_all_changes = bool(len(self.transactions))
         need_history = self.history and self.history.on
-        need_delta = any((need_all_changes, need_history))
+        need_sync_delta = bool(self.backend and getattr(self.backend, 'incremental', False))
+        need_delta = any((need_all_changes, need_history, need_sync_delta))
 
         diff_location = dictdiffer.dot_lookup(self.root, path)
-        before_change = need_delta and copy.deepcopy(diff_location)
+        function_name = original_function.__name__
 
-        return_value = original_function(*args, **kwargs)
+        delta = None
+        if need_delta:
+            delta = operation_delta(diff_location, path, function_name, args, kwargs)
+            if delta is None:  # Not a modelled operation, fall back to diffing
+                before_change = copy.deepcopy(diff_location)
 
-        after_change = need_delta and copy.deepcopy(diff_location)
+        return_value = original_function(*args, **kwargs)
 
-        delta = need_delta and list(dictdiffer.diff(before_change, after_change, node=path))
+        if need_delta and delta is None:
+            after_change = copy.deepcopy(diff_location)
+            delta = list(dictdiffer.diff(before_change, after_change, node=path))
 
         if need_all_changes:
             self.all_changes.append(delta)
@@ -83,7 +130,7 @@ class Manager:
             location=diff_location,
             path_to_location=path,
             delta=delta,
-            function_name=original_function.__name__,
+            function_name=function_name,
             args=args,
             kwargs=kwargs,
         )
@@ -92,44 +139,91 @@ class Manager:
             self.did_change_callback(change_details)
 
         if self.backend and not self.transactions:
-            self.sync(change_details)
+            self.sync(delta)
 
         return return_value
 
-    def set_as_manager_for(self, root):
-        self.root = root
-        object.__setattr__(root, '_manager', self)
-
     def start_sync(
         self,
         wrapped: Any,
         name: str = None,
         serializer: Serializer = None,
-        backend: Backend = None
+        backend: Backend = None,
+        flush_interval: float = None,
+        flush_changes: int = None,
     ):
-        self.name = name or self.default_name
-        self.serializer = serializer or self.get_serializer(name)
-        self.backend = backend or self.default_backend
-        if type(self.serializer) is type:
-            self.serializer = self.serializer()
-        if type(self.backend) is type:
-            self.backend = self.backend(self.name)
+        self.set_backend(name, serializer, backend or self.default_backend)
 
-        existing_content = self.backend.get(self.serializer)
+        existing_content = self.get_existing_content()
 
         if existing_content:
-            if self.instantiate_root_with_keywords:
-                existing_content = self.root_type(**existing_content)
-            else:
-                existing_content = self.root_type(existing_content)
-            from syncx import tag
-            wrapped = tag(existing_content)
-            self.set_as_manager_for(wrapped)
+            wrapped = self.wrap_existing_content(existing_content)
         else:
             self.backend.put(wrapped, self.serializer)
 
+        if flush_interval or flush_changes:
+            self.set_write_behind(flush_interval, flush_changes)
+
+        return wrapped
+
+    async def start_sync_async(
+        self,
+        wrapped: Any,
+        name: str = None,
+        serializer: Serializer = None,
+        backend: AsyncBackend = None,
+        flush_interval: float = None,
+        flush_changes: int = None,
+    ):
+        """
+        Like start_sync, but with an async backend, and changes written from a task on the running event loop.
+        """
+        self.set_backend(name, serializer, backend or self.default_async_backend)
+
+        existing_content = await self.backend.get(self.serializer)
+
+        if existing_content:
+            wrapped = self.wrap_existing_content(existing_content)
+        else:
+            await self.backend.put(wrapped, self.serializer)
+
+        self.writer = AsyncWriteBehind(self, flush_interval or AsyncWriteBehind.default_interval, flush_changes)
+
         return wrapped
 
+    def set_backend(self, name: str, serializer: Serializer, backend: Any):
+        self.name = name or self.default_name
+        self.serializer = serializer or self.get_serializer(name)
+        self.backend = backend
+        if type(self.serializer) is type:
+            self.serializer = self.serializer()
+        if type(self.backend) is type:
+            self.backend = self.backend(self.name)
+        if hasattr(self.backend, 'on_external_change'):
+            self.backend.on_external_change = self.merge_external_content
+        if hasattr(self.backend, 'frontend'):
+            self.backend.frontend = self
+
+    def get_existing_content(self):
+        """
+        Returns the data in the backend. In lazy mode, a dict root is loaded key by key as it is accessed, if the
+        backend supports reading single keys.
+        """
+        if self.lazy and self.root_type is dict and hasattr(self.backend, 'keys'):
+            keys = self.backend.keys(self.serializer)
+            if keys is not None:
+                return LazyDict(keys, functools.partial(self.backend.get, self.serializer))
+        return self.backend.get(self.serializer)
+
+    def wrap_existing_content(self, existing_content: Any):
+        if isinstance(existing_content, LazyDict):
+            return wrap_target(existing_content, self)  # Converting would load everything
+        if self.instantiate_root_with_keywords:
+            existing_content = self.root_type(**existing_content)
+        else:
+            existing_content = self.root_type(existing_content)
+        return wrap_target(existing_content, self)
+
     @classmethod
     def get_serializer(cls, name: str):
         path = Path(name)
@@ -139,16 +233,105 @@ class Manager:
             return YamlSerializer
         elif suffix == 'json':
             return JsonSerializer
+        elif suffix in ['pickle', 'pkl', 'bin']:
+            return PickleSerializer
         else:
             return cls.default_serializer
 
     def sync(self, delta: Any):
-        self.backend.put(self.root, self.serializer, delta=delta)
+        if self.writer:
+            self.writer.mark_dirty(delta)
+        else:
+            self.backend.put(self.root, self.serializer, delta=delta)
+
+    def set_write_behind(self, interval: float = None, max_changes: int = None):
+        if self.writer:
+            self.writer.close()
+        self.writer = WriteBehind(self, interval or WriteBehind.default_interval, max_changes)
+
+    def flush(self):
+        """
+        Writes pending changes. Returns an awaitable if the data was synced with sync_async.
+        """
+        if self.writer:
+            return self.writer.flush()
+
+    def set_watcher(self, interval: float):
+        """
+        Starts polling the backend for changes made by other processes every `interval` seconds.
+        """
+        if not hasattr(self.backend, 'changed'):
+            raise TypeError(f'{type(self.backend).__name__} cannot detect changes made by others')
+        self.watcher = ChangeWatcher(self, interval)
+
+    def check_external_changes(self) -> bool:
+        """
+        Merges changes that other processes have made to the backend into the data, keeping local changes that
+        have not been written yet. Returns True if there were any.
+        """
+        backend = self.backend
+        if not hasattr(backend, 'changed') or not backend.changed():  # Cheap check without the lock first
+            return False
+        with self.lock:
+            if not backend.changed():
+                return False
+            if hasattr(backend, 'pull'):  # Changes can be applied incrementally, once local ones are written
+                if isinstance(self.writer, WriteBehind):
+                    self.writer.flush()
+                backend.pull(self.root)
+                return True
+            local_deltas = self.all_changes + (self.writer.deltas if isinstance(self.writer, WriteBehind) else [])
+            self.merge_external_content(backend.get(self.serializer), flatten(local_deltas))
+        return True
+
+    def merge_external_content(self, content: Any, local_delta: Any = None):
+        """
+        Makes the data match content written to the backend by someone else, with the local changes in
+        `local_delta` applied on top. Local changes that no longer apply, e.g. removing a key that was already
+        removed, are dropped. The merge is not synced back or recorded in the history.
+        """
+        if content is None:
+            return
+        merged = copy.deepcopy(content)
+        for change in plain_delta(local_delta or []):
+            try:
+                merged = dictdiffer.patch([change], merged, in_place=True)
+            except (LookupError, TypeError, ValueError):
+                pass
+        self.apply_external_delta(list(dictdiffer.diff(copy.deepcopy(self.root), merged)))
+
+    def apply_external_delta(self, delta: Any):
+        """
+        Applies a change made elsewhere to the data, without syncing it back or recording it in the history.
+        """
+        with self.lock:
+            self.change_tracking_active = False
+            try:
+                dictdiffer.patch(delta, self.root, in_place=True)
+            finally:
+                self.change_tracking_active = True
 
-    def set_history(self):
+    def set_history(
+        self,
+        capacity: int = None,
+        max_bytes: int = None,
+        path: str = None,
+        checkpoint_interval: Optional[int] = History.default_checkpoint_interval,
+    ):
+        """
+        Sets up history, persisted in the file at `path` if given. Checkpoint interval only applies to new history.
+        """
         if self.history is None:
-            from syncx import tag
-            self.history = tag(History())
+            if path:
+                self.history = PersistentHistory(path, capacity, max_bytes, checkpoint_interval=checkpoint_interval)
+            else:
+                self.history = History(capacity, max_bytes, checkpoint_interval)
+        else:
+            if capacity is not None:
+                self.history.capacity = capacity
+            if max_bytes is not None:
+                self.history.max_bytes = max_bytes
+            self.history.trim()
         return self.history
 
     def add_history_entry(self, delta):
@@ -157,20 +340,17 @@ class Manager:
         history = self.history
         if not history.on:
             return
-        if history.current_index < len(history.entries):
-            del history.entries[history.current_index:]
-        history.entries.append(delta)
-        if history._capacity and len(history.entries) > history._capacity:
-            del history.entries[:-history._capacity]
-        history.current_index = len(history.entries)
-        return history.current_index
+        index = history.add(delta)
+        if history.needs_checkpoint():
+            history.add_checkpoint(copy.deepcopy(self.root))
+        return index
 
     def undo(self):
         history = self.check_history()
         if history.current_index == 0:
             return history.current_index
         history.current_index -= 1
-        delta = history.entries[history.current_index]
+        delta = copy.deepcopy(history.entry(history.current_index))  # Values end up in the data
         history.on = False
         dictdiffer.revert(delta, self.root, in_place=True)
         history.on = True
@@ -180,47 +360,205 @@ class Manager:
         history = self.check_history()
         if history.current_index == len(history.entries):
             return history.current_index
-        delta = history.entries[history.current_index]
+        delta = copy.deepcopy(history.entry(history.current_index))  # Values end up in the data
         history.current_index += 1
         history.on = False
         dictdiffer.patch(delta, self.root, in_place=True)
         history.on = True
         return history.current_index
 
+    def goto(self, index: int) -> int:
+        """
+        Moves the data to the state at the history index, as a single change.
+
+        Steps there with undo or redo if that is closer than the nearest checkpoint, otherwise applies the
+        difference to the state rebuilt from the checkpoint. The first checkpoint is taken here, of the current
+        state, as it is only needed once the history is moved around in. If the oldest entries are dropped to make
+        room for it, the index is lowered to match and the new index returned.
+        """
+        history = self.check_history()
+        self.start_transaction()
+        do_rollback = True
+        try:
+            if history.needs_first_checkpoint():  # Jumping around, worth copying the data
+                base_version = history.base_version
+                history.add_checkpoint(copy.deepcopy(self.root))
+                index -= history.base_version - base_version  # Entries dropped to make room for the checkpoint
+            if not 0 <= index <= len(history.entries):
+                raise HistoryError(f'No history index {index}, available indexes are 0-{len(history.entries)}')
+            checkpoint = history.nearest_checkpoint(index)
+            if checkpoint is None or abs(index - history.current_index) <= abs(index - checkpoint):
+                while history.current_index > index:
+                    self.undo()
+                while history.current_index < index:
+                    self.redo()
+            else:
+                target = self.materialize(index)
+                history.on = False
+                delta = list(dictdiffer.diff(copy.deepcopy(self.root), target))
+                dictdiffer.patch(delta, self.root, in_place=True)
+                history.on = True
+                history.current_index = index
+            do_rollback = False
+        finally:
+            history.on = True
+            self.end_transaction(do_rollback)
+        return history.current_index
+
+    def materialize(self, index: int) -> Any:
+        """
+        Returns an untracked copy of the data as it was at the history index, leaving the data itself as is.
+        """
+        history = self.check_history()
+        if not 0 <= index <= len(history.entries):
+            raise HistoryError(f'No history index {index}, available indexes are 0-{len(history.entries)}')
+        with self.read_lock():
+            checkpoint = history.nearest_checkpoint(index)
+            if checkpoint is None or abs(index - history.current_index) <= abs(index - checkpoint):
+                start = history.current_index
+                data = copy.deepcopy(self.root)
+            else:
+                start = checkpoint
+                data = history.checkpoint(checkpoint)
+            for entry_index in range(start, index):
+                data = dictdiffer.patch(copy.deepcopy(history.entry(entry_index)), data, in_place=True)
+            for entry_index in reversed(range(index, start)):
+                data = dictdiffer.revert(copy.deepcopy(history.entry(entry_index)), data, in_place=True)
+        return data
+
     def check_history(self):
         history = self.history
         if not history or not history.on:
             raise HistoryError('History not active when trying to undo or redo')
         return history
 
+    def snapshot(self) -> SnapshotView:
+        """
+        Returns a read-only view of the data as it is now, which does not change when the data is changed.
+        """
+        with self.read_lock():
+            snapshot = Snapshot(self, self.change_count)
+            self.snapshots.add(snapshot)
+        return snapshot.view(self.root)
+
+    def root_hash(self) -> bytes:
+        with self.read_lock():
+            return subtree_hash(self.root)
+
+    def reconcile(self, source: HashSource) -> list:
+        """
+        Makes the data match the source, as a single change, and returns the delta applied. Only the parts of
+        the source whose subtree hashes differ from those of the data are fetched.
+        """
+        self.start_transaction()
+        do_rollback = True
+        try:
+            delta = reconciling_delta(LocalSource(self.root), source)
+            dictdiffer.patch(delta, self.root, in_place=True)
+            do_rollback = False
+        finally:
+            self.end_transaction(do_rollback)
+        return delta
+
+    def set_lock(self, read_write: bool = False, timeout: float = None):
+        """
+        Switches to a reader-writer lock if `read_write`, so that readers using `read_lock()` do not block each
+        other. Must be done before the data is used from several threads. Sets also the timeout for acquiring
+        the lock, if given.
+        """
+        if read_write and not isinstance(self.lock, RWLock):
+            self.lock = RWLock()
+        if timeout is not None:
+            self.LOCK_TIMEOUT = timeout
+
     def lock_acquire(self):
         if not self.lock.acquire(timeout=self.LOCK_TIMEOUT):
             raise LockingRaceCondition(f'Trying to acquire lock for: {self.root}')
 
+    @contextlib.contextmanager
+    def read_lock(self, timeout: float = None):
+        """
+        Holds the lock for reading, shared with other readers if the lock is an RWLock, otherwise exclusively.
+        Waits for `timeout` seconds (negative for no limit), by default LOCK_TIMEOUT.
+        """
+        shared = isinstance(self.lock, RWLock)
+        acquire = self.lock.acquire_read if shared else self.lock.acquire
+        if not acquire(timeout=self.LOCK_TIMEOUT if timeout is None else timeout):
+            raise LockingRaceCondition(f'Trying to acquire read lock for: {self.root}')
+        try:
+            yield
+        finally:
+            if shared:
+                self.lock.release_read()
+            else:
+                self.lock.release()
+
     def start_transaction(self):
         self.lock_acquire()
         self.transactions.append(len(self.all_changes))
 
         if self.history is not None:
-            self.history._manager.start_transaction()
+            self.history.start_transaction()
 
     def end_transaction(self, do_rollback):
-        if self.history is not None:
-            self.history._manager.end_transaction(do_rollback)
-
-        starting_change_index = self.transactions.pop()
-
-        if do_rollback:
-            self.change_tracking_active = False
+        try:
+            if self.history is not None:
+                self.history.end_transaction(do_rollback)
+
+            starting_change_index = self.transactions.pop()
+            depth = len(self.transactions)
+            self.savepoints = {
+                name: savepoint for name, savepoint in self.savepoints.items() if savepoint[0] <= depth
+            }
+
+            if do_rollback:
+                self.revert_changes(starting_change_index)
+            elif not self.transactions:
+                combined_delta = flatten(self.all_changes)
+                self.all_changes = []
+                if self.backend:
+                    self.sync(combined_delta)
+        finally:
+            self.lock.release()
+
+    def revert_changes(self, starting_change_index: int):
+        self.change_tracking_active = False
+        try:
             for delta in reversed(self.all_changes[starting_change_index:]):
                 dictdiffer.revert(delta, self.root, in_place=True)
-            self.all_changes = self.all_changes[:starting_change_index]
+        finally:
             self.change_tracking_active = True
-        elif self.backend and not self.transactions:
-            combined_delta = flatten(self.all_changes[starting_change_index:])
-            self.sync(combined_delta)
-
-        self.lock.release()
+        del self.all_changes[starting_change_index:]
+
+    def savepoint(self, name: Any = None) -> Any:
+        """
+        Marks the current state within the transaction, so that later changes can be rolled back with
+        `rollback_to(name)` without ending the transaction. Returns the name, generated if not given.
+        """
+        if not self.transactions:
+            raise TransactionError('Savepoints can only be set within a transaction')
+        if name is None:
+            name = next(self.savepoint_ids)
+        history_savepoint = self.history.savepoint() if self.history and self.history.transactions else None
+        self.savepoints.pop(name, None)
+        self.savepoints[name] = (len(self.transactions), len(self.all_changes), history_savepoint)
+        return name
+
+    def rollback_to(self, name: Any):
+        """
+        Reverses the changes made after the savepoint. The savepoint is kept, later savepoints are released.
+        """
+        if name not in self.savepoints:
+            raise TransactionError(f'No savepoint {name!r} in the current transaction')
+        depth, change_index, history_savepoint = self.savepoints[name]
+        if depth != len(self.transactions):
+            raise TransactionError(f'Savepoint {name!r} was set outside the current nested transaction')
+        if history_savepoint is not None:
+            self.history.rollback_to(history_savepoint)
+        self.revert_changes(change_index)
+        names = list(self.savepoints)
+        for later_name in names[names.index(name) + 1:]:
+            del self.savepoints[later_name]
 
 
 class ManagerInterface:
@@ -240,3 +578,93 @@ class ManagerInterface:
     def history(self, value: bool):
         history = self._manager.set_history()
         history.on = value
+
+    @property
+    def version(self) -> int:
+        """
+        Current index in the history, as returned by `undo()` and `redo()`.
+        """
+        return self._manager.check_history().current_index
+
+    def goto(self, version: int) -> int:
+        """
+        Moves the data to the history version, undoing or redoing any number of changes at once.
+        """
+        return self._manager.goto(version)
+
+    def materialize(self, version: int) -> Any:
+        """
+        Returns a plain copy of the data at the history version, without changing the data.
+        """
+        return self._manager.materialize(version)
+
+    def read(self):
+        """
+        Context manager for reading the data consistently: no changes are made while it is held.
+
+        With `read_write_lock=True`, many threads can read at the same time. Changes to the data are not allowed
+        within the block then.
+        """
+        return self._manager.read_lock()
+
+    @property
+    def lock_statistics(self) -> Optional[LockStatistics]:
+        """
+        Copy of the counts of lock acquisitions, waits and timeouts, if using a reader-writer lock.
+        """
+        lock = self._manager.lock
+        if not isinstance(lock, RWLock):
+            return None
+        return dataclasses.replace(lock.statistics)
+
+    def snapshot(self) -> Any:
+        """
+        Returns a read-only view of the data as it is now, unaffected by later changes. Taking a snapshot copies
+        nothing: containers in the data are copied (shallowly) when they are first changed while the snapshot is
+        in use. `version` of the view is the number of changes made to the data before the snapshot.
+        """
+        return self._manager.snapshot()
+
+    def savepoint(self, name: Any = None) -> Any:
+        """
+        Marks a point within the current transaction (`with data:`) to roll back to with `rollback_to()`. Returns
+        the name of the savepoint, generated if not given.
+        """
+        return self._manager.savepoint(name)
+
+    def rollback_to(self, savepoint: Any):
+        """
+        Rolls back the changes made after the savepoint, keeping the transaction open.
+        """
+        self._manager.rollback_to(savepoint)
+
+    @property
+    def hash(self) -> str:
+        """
+        Hash of the whole data, equal for equal data. Kept up to date as the data changes, rehashing only the
+        containers on the path to each change.
+        """
+        return self._manager.root_hash().hex()
+
+    def reconcile(self, other: Any) -> list:
+        """
+        Makes the data match `other`, either other data (tagged or not) or a `syncx.merkle.HashSource` for a
+        copy elsewhere, fetching only the parts that differ. Returns the delta applied.
+        """
+        source = other if hasattr(other, 'child_hashes') else LocalSource(other)
+        return self._manager.reconcile(source)
+
+    def refresh(self) -> bool:
+        """
+        Merges changes that other processes have made to the backend, if the backend can detect them (like
+        SharedFileBackend). Returns True if there were any.
+        """
+        return self._manager.check_external_changes()
+
+    def flush(self):
+        """
+        Writes pending changes to the backend now, if they are being written in the background.
+
+        Returns an awaitable if the data was synced with `sync_async()`.
+        """
+        return self._manager.flush()
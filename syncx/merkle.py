@@ -0,0 +1,200 @@
+"""
+Subtree hashes for telling where two copies of the data differ without comparing them in full.
+"""
+
+import copy
+import enum
+from collections.abc import Mapping
+from collections.abc import MutableSequence
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Protocol
+from typing import Tuple
+
+import dictdiffer
+from syncx.hashing import canonical_hash
+from syncx.hashing import encode
+from syncx.hashing import new_hash
+from syncx.wrappers import is_wrapped
+
+MISSING = object()
+
+
+def subtree_hash(node: Any) -> bytes:
+    """
+    Returns the hash of the node and everything under it.
+
+    The hash of a container is computed from the hashes of its members. Tagged containers keep their hash until
+    they or any of their members change, so after a change only the containers on the path to it are hashed
+    again.
+    """
+    if is_wrapped(node):
+        if node._hash is not None:
+            return node._hash
+        subject = node.__subject__
+    else:
+        subject = node
+
+    structure = members(subject)
+    if structure is None:
+        node_hash = canonical_hash(subject)
+    else:
+        tag, items = structure
+        digest = new_hash()
+        digest.update(tag)
+        for encoded_key, key, value in items:
+            digest.update(encoded_key)
+            digest.update(subtree_hash(value))
+        node_hash = digest.digest()
+
+    if is_wrapped(node):
+        object.__setattr__(node, '_hash', node_hash)
+    return node_hash
+
+
+def members(subject: Any) -> Optional[Tuple[bytes, List[Tuple[bytes, Any, Any]]]]:
+    """
+    Returns a tag for the type of the container and its members as (encoded key, key, value), in a canonical
+    order, or None if the value is hashed as a whole. Sets are hashed as a whole, as their members have no keys
+    to address them with.
+    """
+    if isinstance(subject, Mapping):
+        items = subject.items()
+        tag = b'm'
+    elif isinstance(subject, MutableSequence):
+        items = enumerate(subject)
+        tag = b'l'
+    elif hasattr(subject, '__dict__') and not isinstance(subject, (type, enum.Enum)):
+        items = ((key, value) for key, value in vars(subject).items() if not key.startswith('_'))
+        tag = b'o' + type(subject).__qualname__.encode()
+    else:
+        return None
+    return tag, sorted((encode(key), key, value) for key, value in items)
+
+
+class HashSource(Protocol):
+    """
+    Copy of the data to compare with, addressed by paths like those in deltas. Could be local or behind a
+    transport of any kind, as only hashes of the differing parts and the values of differing leaves are asked
+    for.
+    """
+
+    def node_hash(self, path: tuple) -> bytes:
+        ...
+
+    def child_hashes(self, path: tuple) -> Optional[Tuple[bytes, Dict[Any, bytes]]]:
+        """
+        Returns the type tag of the container at the path and the hashes of its members by key, or None if the
+        value is a leaf.
+        """
+        ...
+
+    def fetch(self, path: tuple, default: Any = MISSING) -> Any:
+        """
+        Returns a plain copy of the value at the path, or the default if there is none.
+        """
+        ...
+
+
+class LocalSource:
+    """
+    HashSource for data in the same process, tagged (with cached hashes) or not.
+    """
+
+    def __init__(self, data: Any):
+        self.data = data
+        self.manager = data._manager if is_wrapped(data) else None
+
+    def lookup(self, path: tuple) -> Any:
+        node = self.data
+        for key in path:
+            subject = node.__subject__ if is_wrapped(node) else node
+            if key == '__dict__' and not isinstance(subject, Mapping):
+                node = vars(subject)
+            else:
+                node = subject[key]
+        return node
+
+    def read(self, path: tuple, read):
+        if self.manager is None:
+            return read(self.lookup(path))
+        with self.manager.read_lock(timeout=-1):
+            return read(self.lookup(path))
+
+    def node_hash(self, path: tuple) -> bytes:
+        return self.read(path, subtree_hash)
+
+    def child_hashes(self, path: tuple) -> Optional[Tuple[bytes, Dict[Any, bytes]]]:
+        def read(node):
+            structure = members(node.__subject__ if is_wrapped(node) else node)
+            if structure is None:
+                return None
+            tag, items = structure
+            return tag, {key: subtree_hash(value) for encoded_key, key, value in items}
+
+        return self.read(path, read)
+
+    def fetch(self, path: tuple, default: Any = MISSING) -> Any:
+        try:
+            return self.read(path, copy.deepcopy)
+        except (LookupError, TypeError):
+            return default
+
+
+def differences(local: HashSource, remote: HashSource) -> List[tuple]:
+    """
+    Returns the paths where the two copies of the data differ, as deep as they can be told apart: a key that is
+    only in one of the copies, a leaf value, or a container that differs in type or length. Only containers
+    with differing hashes are looked into.
+    """
+    found = []
+    if local.node_hash(()) != remote.node_hash(()):
+        collect_differences(local, remote, (), found)
+    return found
+
+
+def collect_differences(local: HashSource, remote: HashSource, path: tuple, found: list):
+    local_children = local.child_hashes(path)
+    remote_children = remote.child_hashes(path)
+    if local_children is None or remote_children is None or local_children[0] != remote_children[0]:
+        found.append(path)
+        return
+
+    tag, local_hashes = local_children
+    remote_hashes = remote_children[1]
+    if tag == b'l' and len(local_hashes) != len(remote_hashes):
+        found.append(path)
+        return
+
+    prefix = path + ('__dict__',) if tag.startswith(b'o') else path
+    for key in {**local_hashes, **remote_hashes}:
+        local_hash = local_hashes.get(key)
+        remote_hash = remote_hashes.get(key)
+        if local_hash == remote_hash:
+            continue
+        if local_hash is None or remote_hash is None:
+            found.append(prefix + (key,))
+        else:
+            collect_differences(local, remote, prefix + (key,), found)
+
+
+def reconciling_delta(local: HashSource, remote: HashSource) -> list:
+    """
+    Returns a delta that makes the local copy of the data match the remote one, fetching only the differing
+    parts of each.
+    """
+    delta = []
+    for path in differences(local, remote):
+        local_value = local.fetch(path)
+        remote_value = remote.fetch(path)
+        if local_value is MISSING:
+            delta.append(('add', list(path[:-1]), [(path[-1], remote_value)]))
+        elif remote_value is MISSING:
+            delta.append(('remove', list(path[:-1]), [(path[-1], local_value)]))
+        elif not path:  # Different types of root, changed member by member
+            delta.extend(dictdiffer.diff(local_value, remote_value))
+        else:
+            delta.append(('change', list(path), (local_value, remote_value)))
+    return delta
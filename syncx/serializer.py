@@ -1,9 +1,17 @@
+import contextlib
 import copy
 import dataclasses
+import pickle
+import re
+import types
+from io import BytesIO
 from io import StringIO
 from typing import Any
 from typing import Protocol
 
+from syncx.lazy import LazyDict
+from syncx.wrappers import is_wrapped
+
 try:
     import yaml
 except ImportError:
@@ -22,11 +30,25 @@ except ImportError:
 
 
 def make_serializable(data):
+    """
+    Returns a representation of the data that the serializers can handle, or None if the data is used as is.
+
+    Only the top level is converted, as the serializers call this again for every contained value. Pydantic models
+    are the exception, and are copied and converted as a whole.
+    """
+    if is_wrapped(data):
+        subject = data.__subject__
+        serializable_subject = make_serializable(subject)
+        return subject if serializable_subject is None else serializable_subject
+
+    if isinstance(data, LazyDict):
+        return dict(data.items())
+
     if use_pydantic and isinstance(data, pydantic.BaseModel):
-        return json.loads(data.json())
+        return json.loads(copy.deepcopy(data).json())
 
     if dataclasses.is_dataclass(data) and not isinstance(data, type):
-        return dataclasses.asdict(data)
+        return {field.name: getattr(data, field.name) for field in dataclasses.fields(data)}
 
     if hasattr(data, '__dict__'):
         return data.__dict__
@@ -34,9 +56,41 @@ def make_serializable(data):
     return None
 
 
+def serializable(data):
+    """
+    Returns the data converted with `make_serializable`, or as is if it needs no conversion.
+
+    Used to look up values by path, so lazily loaded data is returned as is, without loading all of it.
+    """
+    if is_wrapped(data):
+        data = data.__subject__
+    if isinstance(data, LazyDict):
+        return data
+    serializable_data = make_serializable(data)
+    return data if serializable_data is None else serializable_data
+
+
+def locked(content: Any):
+    """
+    Returns the read lock of the manager of wrapped content, to keep it from changing while it is being serialized.
+    """
+    if is_wrapped(content):
+        return content._manager.read_lock(timeout=-1)
+    return contextlib.nullcontext()
+
+
+def memory_stream(serializer: 'Serializer', contents=None):
+    """
+    Returns an in-memory stream of the kind the serializer reads and writes, optionally with initial contents.
+    """
+    stream_type = BytesIO if getattr(serializer, 'binary', False) else StringIO
+    return stream_type() if contents is None else stream_type(contents)
+
+
 class Serializer(Protocol):
 
     file_extension: str
+    binary: bool  # If True, dump and load use binary streams
 
     def dump(self, content: Any, stream: StringIO):
         ...
@@ -48,57 +102,134 @@ class Serializer(Protocol):
 class YamlSerializer:
 
     file_extension = 'yaml'
+    binary = False
 
-    class SyncDumper(yaml.SafeDumper):
+    class SyncRepresenter:
       def represent_data(self, data):
         serializable_data = make_serializable(data)
-        if serializable_data:
+        if serializable_data is not None:
             data = serializable_data
         return super().represent_data(data)
 
+    class SyncDumper(SyncRepresenter, yaml.SafeDumper):
+        pass
+
+    class EmittedDifferently(Exception):
+        """
+        Raised when libyaml would write the data differently than the pure-Python emitter.
+        """
+
+    class CSyncDumper(SyncRepresenter, getattr(yaml, 'CSafeDumper', yaml.SafeDumper)):
+        """
+        Uses the libyaml emitter, but refuses data that it would write differently than the pure-Python one, so
+        that files stay identical. Data is fully represented before anything is emitted, so nothing has been
+        written when the exception is raised.
+
+        Strings with line breaks or characters that need escaping are refused as a whole: the emitters fold them
+        differently when they run past the line width, which depends on where in the file they are written.
+        """
+        # Anything but characters written as is by both emitters
+        different_characters = re.compile('[^\x20-\x7E\xA0-\u2027\u202A-\uD7FF\uE000-\uFEFE\uFF00-\uFFFD]')
+
+        def represent_str(self, data):
+            if not (data.isascii() and data.isprintable()):
+                if self.different_characters.search(data):
+                    raise YamlSerializer.EmittedDifferently()
+            return super().represent_str(data)
+
+        def represent_mapping(self, tag, mapping, flow_style=None):
+            if '' in mapping:  # Empty keys are written as complex keys by the pure-Python emitter
+                raise YamlSerializer.EmittedDifferently()
+            return super().represent_mapping(tag, mapping, flow_style)
+
+    CSyncDumper.add_representer(str, CSyncDumper.represent_str)
+
+    # libyaml-backed versions are several times faster, use them if available
+    with_libyaml = getattr(yaml, '__with_libyaml__', False)
+    loader = yaml.CSafeLoader if with_libyaml else yaml.SafeLoader
+
     def __init__(self):
         assert yaml.dump, 'pyyaml is not installed'
 
     def dump(self, content: Any, stream: StringIO):
-        content_copy = copy.deepcopy(content)
-        # if use_pydantic and isinstance(content_copy, pydantic.BaseModel):
-        #     content_copy = json.loads(content_copy.json())
+        with locked(content):
+            if self.with_libyaml:
+                try:
+                    return self.dump_with(YamlSerializer.CSyncDumper, content, stream)
+                except YamlSerializer.EmittedDifferently:
+                    pass
+            self.dump_with(YamlSerializer.SyncDumper, content, stream)
+
+    @staticmethod
+    def dump_with(dumper, content: Any, stream: StringIO):
         yaml.dump(
-            content_copy,
+            content,
             stream,
-            Dumper=YamlSerializer.SyncDumper,
+            Dumper=dumper,
             default_flow_style=False,
             allow_unicode=True,
         )
 
     def load(self, stream: StringIO) -> Any:
-        return yaml.safe_load(stream)
+        return yaml.load(stream, Loader=self.loader)
 
 
 class JsonSerializer:
 
     file_extension = 'json'
+    binary = False
 
     class SyncDumper(json.JSONEncoder):
         def default(self, obj):
             serializable_obj = make_serializable(obj)
-            if serializable_obj:
+            if serializable_obj is not None:
                 return serializable_obj
             return json.JSONEncoder.default(self, obj)
 
     def dump(self, content: Any, stream: StringIO):
-        content_copy = copy.deepcopy(content)
-        # if use_pydantic and isinstance(content_copy, pydantic.BaseModel):
-        #     stream.write(content_copy.json())
-        # else:
-        json.dump(
-            content_copy,
-            stream,
-            cls=JsonSerializer.SyncDumper,
-            separators=(',', ':'),
-            allow_nan=True,
-            ensure_ascii=False,
-        )
+        with locked(content):
+            json.dump(
+                content,
+                stream,
+                cls=JsonSerializer.SyncDumper,
+                separators=(',', ':'),
+                allow_nan=True,
+                ensure_ascii=False,
+            )
 
     def load(self, stream: StringIO) -> Any:
         return json.load(stream)
+
+
+class PickleSerializer:
+    """
+    Compact and fast binary format, using only the standard library.
+
+    Data is converted with `make_serializable` like in the text formats, so the file contains only standard types
+    and loads without syncx or the original classes. As with any pickle, only load files you have written yourself.
+    """
+
+    file_extension = 'pickle'
+    binary = True
+
+    class SyncPickler(pickle.Pickler):
+        def reducer_override(self, obj):
+            if isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType)):
+                return NotImplemented  # Pickled by reference
+            serializable_obj = make_serializable(obj)
+            if serializable_obj is None:
+                return NotImplemented
+            if isinstance(serializable_obj, dict):
+                return dict, (), None, None, iter(serializable_obj.items())
+            if isinstance(serializable_obj, list):
+                return list, (), None, iter(serializable_obj)
+            if isinstance(serializable_obj, (set, frozenset)):
+                return type(serializable_obj), (list(serializable_obj),)
+            return copy.copy, (serializable_obj,)  # Pickles the unwrapped object as is
+
+    def dump(self, content: Any, stream: BytesIO):
+        with locked(content):
+            PickleSerializer.SyncPickler(stream, pickle.HIGHEST_PROTOCOL).dump(content)
+
+    def load(self, stream: BytesIO) -> Any:
+        return pickle.load(stream)
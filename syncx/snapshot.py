@@ -0,0 +1,215 @@
+"""
+Read-only views of tagged data as it was at a point in time, sharing unchanged parts with the live data.
+"""
+
+import copy
+from collections.abc import Mapping
+from collections.abc import MutableMapping
+from collections.abc import MutableSequence
+from collections.abc import MutableSet
+from collections.abc import Sequence
+from collections.abc import Set
+from typing import Any
+from typing import Callable
+
+from syncx.lazy import LazyDict
+from syncx.wrappers import is_wrapped
+
+
+class Snapshot:
+    """
+    State of the data when the snapshot was taken, kept copy-on-write: before a container in the data is changed
+    for the first time after the snapshot, the manager has the snapshot `preserve` a shallow copy of it. Taking a
+    snapshot copies nothing, and each change copies at most the one container it changes.
+
+    Containers are preserved for the snapshot as long as any of its views is in use.
+    """
+
+    def __init__(self, manager: 'Manager', version: int):
+        self.manager = manager
+        self.root = manager.root
+        self.version = version
+        self.preserved = {}  # Original container and its copy, by the identity of the original
+
+    def preserve(self, location: Any):
+        """
+        Keeps a copy of the container at the location of a change that is about to be made, unless already kept.
+        """
+        container = contents(location)
+        if id(container) in self.preserved:
+            return
+        if isinstance(container, LazyDict):  # Values not loaded yet could change in the backend
+            preserved_copy = dict(container.items())
+        else:
+            preserved_copy = copy.copy(container)
+        self.preserved[id(container)] = (container, preserved_copy)
+
+    def resolve(self, node: Any) -> Any:
+        """
+        Returns the contents of the node as they were when the snapshot was taken.
+        """
+        container = contents(node)
+        preserved = self.preserved.get(id(container))
+        return container if preserved is None else preserved[1]
+
+    def view(self, value: Any) -> Any:
+        """
+        Returns a read-only view of a container in the data, or the value as is if it is not a container.
+        """
+        subject = value.__subject__ if is_wrapped(value) else value
+        for abc, view_type in view_types.items():
+            if isinstance(subject, abc):
+                return view_type(self, value)
+        if hasattr(subject, '__dict__'):
+            return SnapshotObject(self, value)
+        return value
+
+
+def contents(node: Any) -> Any:
+    """
+    Returns the container that holds the members of the node: the unwrapped node, or the `__dict__` of objects.
+    """
+    subject = node.__subject__ if is_wrapped(node) else node
+    if isinstance(subject, (MutableMapping, MutableSequence, MutableSet)):
+        return subject
+    return vars(subject)
+
+
+class SnapshotView:
+    """
+    Read-only view of a node in the data, as it was when the snapshot was taken.
+
+    Members are read under the manager's read lock, so that they are not read in the middle of a change. Deep
+    copies are plain data.
+    """
+
+    def __init__(self, snapshot: Snapshot, node: Any):
+        object.__setattr__(self, '_snapshot', snapshot)
+        object.__setattr__(self, '_node', node)
+
+    @property
+    def version(self) -> int:
+        """
+        Number of changes made to the data before the snapshot was taken.
+        """
+        return self._snapshot.version
+
+    def _read(self, read: Callable[[Any], Any]) -> Any:
+        """
+        Returns the result of calling `read` with the contents of the node, with the read lock held.
+        """
+        snapshot = self._snapshot
+        with snapshot.manager.read_lock(timeout=-1):
+            return read(snapshot.resolve(self._node))
+
+    def _contents(self) -> Any:
+        """
+        Returns a shallow copy of the contents of the node, to go through without holding the lock.
+        """
+        return self._read(copy.copy)
+
+    def _member(self, key) -> Any:
+        return self._snapshot.view(self._read(lambda contents: contents[key]))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Snapshots are read-only')
+
+    def __repr__(self):
+        return repr(copy.deepcopy(self))
+
+    def __eq__(self, other):
+        if isinstance(other, SnapshotView):
+            other = copy.deepcopy(other)
+        return copy.deepcopy(self) == other
+
+    __hash__ = None
+
+
+class SnapshotMapping(SnapshotView, Mapping):
+
+    def __getitem__(self, key):
+        return self._member(key)
+
+    def __iter__(self):
+        return iter(self._read(list))
+
+    def __len__(self):
+        return self._read(len)
+
+    def __contains__(self, key):
+        return self._read(lambda contents: key in contents)
+
+    def items(self):
+        snapshot = self._snapshot
+        return [(key, snapshot.view(value)) for key, value in self._contents().items()]
+
+    def values(self):
+        return [value for key, value in self.items()]
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+
+class SnapshotSequence(SnapshotView, Sequence):
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._snapshot.view(value) for value in self._read(lambda contents: contents[index])]
+        return self._member(index)
+
+    def __iter__(self):
+        snapshot = self._snapshot
+        return iter([snapshot.view(value) for value in self._contents()])
+
+    def __len__(self):
+        return self._read(len)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(value, memo) for value in self]
+
+
+class SnapshotSet(SnapshotView, Set):
+
+    def __iter__(self):
+        snapshot = self._snapshot
+        return iter([snapshot.view(value) for value in self._contents()])
+
+    def __len__(self):
+        return self._read(len)
+
+    def __contains__(self, value):
+        return self._read(lambda contents: value in contents)
+
+    def __deepcopy__(self, memo):
+        return {copy.deepcopy(value, memo) for value in self}
+
+
+class SnapshotObject(SnapshotView):
+    """
+    View of an object: public attributes are read as they were when the snapshot was taken.
+    """
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        try:
+            return self._member(attr)
+        except KeyError:
+            raise AttributeError(attr) from None
+
+    def __deepcopy__(self, memo):
+        node = self._node
+        subject = node.__subject__ if is_wrapped(node) else node
+        snapshot = self._snapshot
+        duplicate = copy.copy(subject)
+        duplicate.__dict__ = {
+            key: copy.deepcopy(snapshot.view(value), memo) for key, value in self._contents().items()
+        }
+        return duplicate
+
+
+view_types = {
+    MutableSequence: SnapshotSequence,
+    MutableMapping: SnapshotMapping,
+    MutableSet: SnapshotSet,
+}
@@ -1,13 +1,17 @@
-import hashlib
-import json
+import copy
 from dataclasses import dataclass
 from dataclasses import field
 from typing import Any
+from typing import Iterable
 from typing import List
 from typing import Optional
+from typing import Set
 
 import dictdiffer
+from syncx.deltas import CHANGE
+from syncx.deltas import node_path
 from syncx.exceptions import UnresolvableConflict
+from syncx.hashing import canonical_hash
 from syncx.utils import flatten
 
 
@@ -28,17 +32,75 @@ class Content:
     latest_signature: DeltaSignature
     full_object: Any
     unapplied_changes: List[DeltaWithSignature] = field(default_factory=list)
+    base_signature: Optional[DeltaSignature] = None  # Signature of the last change included in full_object
 
 
 def get_signature(latest_signature: Optional[DeltaSignature], delta: Any):
+    """
+    Returns the signature of a delta following the latest one.
+
+    Signatures are chained: the hash covers the previous hash as well as the canonical encoding of the delta (see
+    `syncx.hashing`), so two clients with the same latest signature have the same history.
+    """
     counter = latest_signature and latest_signature.counter + 1 or 0
-    delta_as_string = json.dumps(delta, sort_keys=True)
-    delta_hash = hashlib.sha1(delta_as_string.encode()).hexdigest()
+    previous_hash = bytes.fromhex(latest_signature.hash) if latest_signature else b''
+    delta_hash = canonical_hash(delta, previous_hash).hex()
 
     return DeltaSignature(counter, delta_hash)
 
 
+def verify_chain(latest_signature: Optional[DeltaSignature], changes: Iterable[DeltaWithSignature]) -> bool:
+    """
+    Returns True if the changes follow the latest signature, each signed with the one before it.
+    """
+    for change in changes:
+        latest_signature = get_signature(latest_signature, change.delta)
+        if change.signature != latest_signature:
+            return False
+    return True
+
+
+def touched_paths(delta: Any) -> Set[tuple]:
+    """
+    Returns the paths of the nodes that the delta changes.
+
+    Adding or removing an item by index shifts the items after it, so for those the path of the whole sequence is
+    returned instead.
+    """
+    paths = set()
+    for action, node, changes in delta:
+        path = tuple(node_path(node))
+        if action == CHANGE:
+            paths.add(path)
+            continue
+        for key, value in changes:
+            paths.add(path if isinstance(key, int) else path + (key,))
+    return paths
+
+
+def paths_overlap(paths: Iterable[tuple], other_paths: Iterable[tuple]) -> bool:
+    """
+    Returns True if a path in one of the sets is the same as, or inside, a path in the other set.
+    """
+    paths = set(paths)
+    prefixes = set()
+    for path in paths:
+        prefixes.update(path[:length] for length in range(len(path) + 1))
+    for path in other_paths:
+        if path in prefixes or any(path[:length] in paths for length in range(len(path))):
+            return True
+    return False
+
+
 class MultiClientIncremental:
+    """
+    Keeps local data in sync with a log of changes shared with other clients.
+
+    The `backend` stores the full object as of some point, and the deltas recorded after it. It has
+    `get_content()`, a context manager that yields the Content and keeps other clients from changing it until
+    done, `set_content(full_object, signature)` and `add_to_deltas(signature, delta)`. The `frontend` applies
+    changes recorded by other clients to the local data, with `apply_external_delta(delta)`.
+    """
 
     def __init__(self, frontend, backend):
         self.frontend = frontend
@@ -46,20 +108,36 @@ class MultiClientIncremental:
         self.latest_signature = None
 
     def get_initial(self):
+        """
+        Returns the full object with all recorded changes applied, and stores it as the new full object.
+        """
         content: Content
         with self.backend.get_content() as content:
-            signature = None
-
+            full_object = content.full_object
             for change in content.unapplied_changes:
-                dictdiffer.patch(change.delta, content, in_place=True)
-                signature = change.signature
+                full_object = dictdiffer.patch(change.delta, full_object, in_place=True)
 
-            self.latest_signature = signature
-            self.backend.set_content(content, signature)
+            self.latest_signature = content.latest_signature
+            if content.unapplied_changes:
+                self.backend.set_content(full_object, self.latest_signature)
 
-        return content
+        return full_object
+
+    def replace(self, full_object: Any):
+        """
+        Replaces the shared data with the full object.
+        """
+        with self.backend.get_content() as content:
+            signature = get_signature(content.latest_signature, None)
+            self.backend.set_content(full_object, signature)
+            self.latest_signature = signature
 
-    def put(self, delta, local_object):
+    def put(self, delta, local_object) -> bool:
+        """
+        Records the local change, and applies the changes recorded by other clients since the last put or pull to
+        the local object. If the changes conflict, the local change is reverted instead of recorded. Returns True
+        if the local change was recorded.
+        """
         signature = get_signature(self.latest_signature, delta)
 
         content: Content
@@ -72,31 +150,100 @@ class MultiClientIncremental:
                 unconflicting_remote_change = False
 
             if in_sync or unconflicting_remote_change:
+                if not in_sync:
+                    self.apply_remote_changes(content, local_object, delta)
+                    signature = get_signature(content.latest_signature, delta)
                 self.backend.add_to_deltas(signature, delta)
-
-            if not in_sync:
-                # TODO: Override local with remote
-                ...
+                self.latest_signature = signature
+                return True
+
+            # Override local with remote
+            self.frontend.apply_external_delta(list(dictdiffer.swap(reversed(delta))))
+            self.apply_remote_changes(content, local_object)
+            self.latest_signature = content.latest_signature
+            return False
+
+    def pull(self, local_object) -> bool:
+        """
+        Applies the changes recorded by other clients since the last put or pull to the local object. Returns True
+        if there were any.
+        """
+        content: Content
+        with self.backend.get_content() as content:
+            if content.latest_signature == self.latest_signature:
+                return False
+            self.apply_remote_changes(content, local_object)
+            self.latest_signature = content.latest_signature
+        return True
+
+    def apply_remote_changes(self, content: Content, local_object: Any, local_delta: Any = None):
+        """
+        Applies the changes recorded after the latest local one to the local object, which already includes
+        `local_delta`, if given. If the latest local change is no longer in the log, the local object is compared
+        with the full remote object instead.
+        """
+        remote_changes = self.changes_since(content)
+        if remote_changes is not None:
+            try:
+                self.frontend.apply_external_delta(flatten([change.delta for change in remote_changes]))
+                return
+            except (LookupError, TypeError, ValueError):  # Fall back to comparing
+                pass
+
+        target = dictdiffer.patch(flatten([change.delta for change in content.unapplied_changes]), content.full_object)
+        if local_delta:
+            target = dictdiffer.patch(local_delta, target, in_place=True)
+        self.frontend.apply_external_delta(list(dictdiffer.diff(copy.deepcopy(local_object), target)))
+
+    def changes_since(self, content: Content) -> Optional[List[DeltaWithSignature]]:
+        """
+        Returns the changes recorded after the latest local one, or None if it is no longer in the log or the
+        changes do not verify against it.
+        """
+        changes = content.unapplied_changes
+        if (changes[-1].signature if changes else content.base_signature) != content.latest_signature:
+            return None  # Not a complete log
+        if self.latest_signature == content.base_signature:
+            new_changes = changes
+        else:
+            for i, change in enumerate(changes):
+                if change.signature == self.latest_signature:
+                    new_changes = changes[i + 1:]
+                    break
+            else:
+                return None
+        return new_changes if verify_chain(self.latest_signature, new_changes) else None
 
     def ok_to_apply(self, content: Content, signature: DeltaSignature, local_delta: Any, local_object: Any):
-        pre_change = dictdiffer.revert(local_delta, local_object)
+        """
+        Returns True if the local and remote changes do not conflict, i.e. it does not matter in which order they
+        are applied.
+
+        Changes to separate parts of the data always commute, so data is only copied to compare the results of
+        both orders when the changes touch the same paths.
+        """
+        pre_change = None
 
-        # Check if there has just been some additional deltas recorded elsewhere
+        # Check if the change has already been recorded, so that only deltas recorded after it are new
         for i, change in enumerate(content.unapplied_changes):
             if change.signature == signature:
-                remote_delta = flatten([change.delta for change in content.unapplied_changes[i:]])
-                remote_object = dictdiffer.patch(
-                    flatten([change.delta for change in content.unapplied_changes[:i]]),
-                    content.full_object,
-                )
+                remote_delta = flatten([change.delta for change in content.unapplied_changes[i + 1:]])
                 break
-        else: # Otherwise, do a full diff
+        else:
+            remote_changes = self.changes_since(content)
+            remote_delta = remote_changes and flatten([change.delta for change in remote_changes])
+
+        if remote_delta is None:  # Otherwise, do a full diff
+            pre_change = dictdiffer.revert(local_delta, local_object)
             deltas = flatten([change.delta for change in content.unapplied_changes])
             remote_object = dictdiffer.patch(deltas, content.full_object)
             remote_delta = list(dictdiffer.diff(pre_change, remote_object))
 
-        # Check if there is no actual conflict, i.e. it does not matter in which order the changes are applied
-        # try:
+        if not paths_overlap(touched_paths(local_delta), touched_paths(remote_delta)):
+            return True
+
+        if pre_change is None:
+            pre_change = dictdiffer.revert(local_delta, local_object)
         one_way = dictdiffer.patch(local_delta, pre_change)
         one_way = dictdiffer.patch(remote_delta, one_way, in_place=True)
         other_way = dictdiffer.patch(remote_delta, pre_change)
@@ -0,0 +1,32 @@
+"""
+Polling the backend for changes made by other processes.
+"""
+
+import threading
+
+
+class ChangeWatcher:
+    """
+    Checks every `interval` seconds, from a background thread, whether someone else has written to the manager's
+    backend, and merges their changes into the data if so.
+    """
+
+    def __init__(self, manager: 'Manager', interval: float):
+        self.manager = manager
+        self.interval = interval
+        self.stopped = threading.Event()
+
+        self.thread = threading.Thread(target=self.run, name='syncx-watcher', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.manager.check_external_changes()
+
+    def close(self):
+        """
+        Stops the background thread.
+        """
+        self.stopped.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
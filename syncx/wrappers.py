@@ -3,9 +3,9 @@ Proxy wrappers for different data types to detect any changes.
 """
 
 import copy
-from typing import MutableMapping
-from typing import MutableSequence
-from typing import MutableSet
+from collections.abc import MutableMapping
+from collections.abc import MutableSequence
+from collections.abc import MutableSet
 from typing import TypeVar
 
 from peak.util.proxies import ObjectWrapper
@@ -16,13 +16,49 @@ T = TypeVar('T')
 
 
 class NotifyWrapper(ObjectWrapper):
+    """
+    Wrappers know their parent wrapper and their key in it, and compute their path only when needed.
+
+    For members of sequences, the key is only a hint of the current index, so that inserting or removing items
+    does not invalidate the wrappers of all the following items.
+    """
 
-    def __init__(self, obj, path, manager, osa=object.__setattr__):
+    def __init__(self, obj, parent, key, manager, osa=object.__setattr__):
         super().__init__(obj)
 
-        osa(self, '_path',  path)  # noqa
+        osa(self, '_parent', parent)  # noqa
+        osa(self, '_key', key)  # noqa
         osa(self, '_manager', manager)  # noqa
 
+    _path_suffix = ()  # Path elements between this node and its members
+    _hash = None  # Cached subtree hash, see syncx.merkle
+
+    @property
+    def _path(self) -> list:
+        reversed_path = []
+        node = self
+        while node is not None:
+            reversed_path.extend(reversed(node._path_suffix))
+            if node._parent is not None:
+                reversed_path.append(node._current_key())
+            node = node._parent
+        reversed_path.reverse()
+        return reversed_path
+
+    def _current_key(self):
+        parent_subject = self._parent.__subject__
+        if not isinstance(parent_subject, MutableSequence):
+            return self._key
+
+        index = self._key
+        for candidate in (index, index + 1, index - 1):  # Try the usual single insert or removal first
+            if 0 <= candidate < len(parent_subject) and parent_subject[candidate] is self:
+                break
+        else:
+            candidate = next((i for i, value in enumerate(parent_subject) if value is self), index)
+        object.__setattr__(self, '_key', candidate)
+        return candidate
+
     def __repr__(self):
         return self.__subject__.__repr__()
 
@@ -48,27 +84,92 @@ def is_wrapped(obj):
     return isinstance(obj, NotifyWrapper)
 
 
+def invalidate_hashes(tracked: NotifyWrapper):
+    """
+    Clears the cached subtree hashes of the changed node and its ancestors.
+    """
+    node = tracked
+    while node is not None:
+        object.__setattr__(node, '_hash', None)
+        node = node._parent
+
+
 class DictWrapper(NotifyWrapper):
     """
     Wrapper for MutableMappings.
     """
 
+    def __getitem__(self, key):
+        return accessed_member(self, key, self.__subject__[key])
+
+    def get(self, key, default=None):
+        if key in self.__subject__:
+            return self[key]
+        return default
+
+    def values(self):
+        wrap_all_if_lazy(self)
+        return self.__subject__.values()
+
+    def items(self):
+        wrap_all_if_lazy(self)
+        return self.__subject__.items()
+
 
 class ListWrapper(NotifyWrapper):
     """
     Wrapper for MutableSequences.
     """
 
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if self._manager.lazy:
+                wrap_keys(self, range(*index.indices(len(self.__subject__))))
+            return self.__subject__[index]
+        return accessed_member(self, index, self.__subject__[index])
+
+    def __iter__(self):
+        wrap_all_if_lazy(self)
+        return iter(self.__subject__)
+
 
 class SetWrapper(NotifyWrapper):
     """
     Wrapper for MutableSets.
     """
 
+    def __iter__(self):
+        wrap_all_if_lazy(self)
+        return iter(self.__subject__)
+
 
 class CustomObjectWrapper(NotifyWrapper):
     """ If an object has a __dict__ attribute, we track attribute changes. """
 
+    _path_suffix = ('__dict__',)
+
+    def __getattr__(self, attr):
+        subject = self.__subject__
+        value = getattr(subject, attr)
+        if not attr.startswith('_') and attr in subject.__dict__:
+            return accessed_member(self, attr, value)
+        return value
+
+
+def accessed_member(tracked: NotifyWrapper, key, value):
+    """
+    Returns the member value, wrapping it first if the data is wrapped lazily, i.e. on access.
+    """
+    if tracked._manager.lazy and needs_wrapping(tracked, key, value):
+        wrap_member(tracked, key, value)
+        return get_value(tracked.__subject__, key)
+    return value
+
+
+def wrap_all_if_lazy(tracked: NotifyWrapper):
+    if tracked._manager.lazy:
+        wrap_members(tracked)
+
 
 trackable_types = {
   MutableSequence: ListWrapper,
@@ -104,14 +205,28 @@ for wrapper_type in mutating_methods:
 
             self._manager.lock_acquire()
             try:
-
-                result = self._manager.execute_change(
-                    self._path,
-                    original_function,
-                    args,
-                    kwargs,
-                )
-                wrap_members(self)
+                lazy = self._manager.lazy  # Lazily wrapped members are checked on access instead
+                keys = None if lazy else keys_to_wrap(self.__subject__, tracker_function_name, args, kwargs)
+
+                try:
+                    result = self._manager.execute_change(
+                        self._path,
+                        original_function,
+                        args,
+                        kwargs,
+                    )
+                finally:
+                    invalidate_hashes(self)
+
+                if lazy:
+                    pass
+                elif keys is None:
+                    wrap_members(self)
+                else:
+                    wrap_keys(self, keys)
+
+                if tracker_function_name == 'setdefault':  # Return the tracked value, not the raw default
+                    return self[args[0]]
                 return result
 
             finally:
@@ -121,30 +236,31 @@ for wrapper_type in mutating_methods:
         getattr(wrapper_type, func_name).__name__ = func_name
 
 
-def wrap_target(target: T, path: list, manager: 'Manager') -> T:
+def wrap_target(target: T, manager: 'Manager', parent: NotifyWrapper = None, key=None) -> T:
     tracked = None
     is_object = False
 
     for abc, wrapper in trackable_types.items():
         if isinstance(target, abc):
-            tracked = wrapper(target, path, manager)
+            tracked = wrapper(target, parent, key, manager)
             break
     else:
         if type(target) is type:
             target = target()
         if hasattr(target, '__dict__'):
-            tracked = CustomObjectWrapper(target, path + ['__dict__'], manager)
+            tracked = CustomObjectWrapper(target, parent, key, manager)
             is_object = True
 
     if tracked is None:
         raise TypeError(f"'{target}' does not have a trackable type: {type(target)}")
 
-    if not path:  # i.e. root
+    if parent is None:  # i.e. root
         manager.root = tracked
         manager.root_type = type(target)
         manager.instantiate_root_with_keywords = is_object
 
-    wrap_members(tracked)
+    if not manager.lazy:
+        wrap_members(tracked)
 
     return tracked
 
@@ -154,25 +270,121 @@ def wrap_members(tracked: NotifyWrapper):
     Checks to see if some of the changed node's contents now need to be tracked.
     """
     to_wrap = []
-    path = tracked._path
-
-    # if type(tracked) is CustomObjectWrapper:
-    #    path.append('__dict__')
 
     for key, value in get_iterable(tracked.__subject__):
-        if is_wrapped(value):
-            updated_path = path + [key]
-            if value._path != updated_path:
-                to_wrap.append((key, value.__subject__))
-        elif should_wrap(value):
+        if needs_wrapping(tracked, key, value):
             to_wrap.append((key, value))
     for key, value in to_wrap:
-        set_value(
-            tracked.__subject__,
-            key,
-            value,
-            wrap_target(value, path + [key], tracked._manager),
-        )
+        wrap_member(tracked, key, value)
+
+
+def wrap_keys(tracked: NotifyWrapper, keys):
+    """
+    Like `wrap_members`, but only checks the members with the given keys.
+    """
+    subject = tracked.__subject__
+
+    for key in keys:
+        try:
+            value = get_value(subject, key)
+        except (LookupError, AttributeError):  # Key was not inserted after all, e.g. due to an error
+            continue
+        if needs_wrapping(tracked, key, value):
+            wrap_member(tracked, key, value)
+
+
+def needs_wrapping(tracked: NotifyWrapper, key, value):
+    """
+    Values need wrapping if they are trackable, or if they are wrapped but not as this member of `tracked`.
+
+    Sequence members keep their wrappers when they are moved, unless the same wrapper is also in another index.
+    """
+    if not is_wrapped(value):
+        return should_wrap(value)
+    if value._parent is not tracked:
+        return True
+    if value._key == key:
+        return False
+    if isinstance(tracked.__subject__, MutableSequence):
+        hint = value._key
+        subject = tracked.__subject__
+        if not (0 <= hint < len(subject) and subject[hint] is value):
+            object.__setattr__(value, '_key', key)
+            return False
+    return True
+
+
+def wrap_member(tracked: NotifyWrapper, key, value):
+    unwrapped = value.__subject__ if is_wrapped(value) else value
+    set_value(
+        tracked.__subject__,
+        key,
+        value,
+        wrap_target(unwrapped, tracked._manager, tracked, key),
+    )
+
+
+def keys_to_wrap(subject, function_name, args, kwargs):
+    """
+    Returns the keys of the members that calling `function_name` on `subject` will insert or move, or None if
+    that cannot be determined and all members need to be checked.
+
+    Called before the change is made.
+    """
+    try:
+        if isinstance(subject, MutableSequence):
+            return _sequence_keys(subject, function_name, *args, **kwargs)
+        if isinstance(subject, MutableMapping):
+            return _mapping_keys(function_name, *args, **kwargs)
+        if isinstance(subject, MutableSet):
+            return _set_keys(function_name, *args, **kwargs)
+        if function_name == '__setattr__':
+            return [args[0]] if not args[0].startswith('_') else []
+        if function_name == '__delattr__':
+            return []
+    except (TypeError, ValueError, IndexError):  # Unexpected arguments, let the change itself raise
+        return None
+    return None
+
+
+def _sequence_keys(subject, function_name, index=None, *args, **kwargs):
+    length = len(subject)
+    if function_name == 'append':
+        return [length]
+    if function_name in ('extend', '__iadd__'):
+        return range(length, length + len(index)) if hasattr(index, '__len__') else None
+    if function_name in ('__delitem__', 'pop', 'remove', 'clear'):
+        return []  # Remaining members keep their wrappers
+    if isinstance(index, slice) or function_name not in ('__setitem__', 'insert'):
+        return None
+
+    if index < 0:
+        index = max(index + length, 0)
+    return [min(index, length)]
+
+
+def _mapping_keys(function_name, key=None, *args, **kwargs):
+    if function_name in ('__setitem__', 'setdefault'):
+        return [key]
+    if function_name == 'update':
+        if key is None:
+            return list(kwargs)
+        if hasattr(key, 'keys'):
+            return list(key.keys()) + list(kwargs)
+        return None  # Iterable of pairs
+    if function_name in ('__delitem__', 'pop', 'popitem', 'clear'):
+        return []
+    return None
+
+
+def _set_keys(function_name, other=None, *args, **kwargs):
+    if function_name == 'add':
+        return [other]
+    if function_name in ('__ior__', '__ixor__'):
+        return list(other)
+    if function_name in ('discard', 'remove', 'pop', 'clear', '__iand__', '__isub__'):
+        return []
+    return None
 
 
 def get_iterable(obj):
@@ -207,6 +419,19 @@ def should_wrap(contained):
     raise TypeError(f'Not a trackable or hashable type: {contained}')
 
 
+def get_value(target, key):
+    if isinstance(target, (MutableSequence, MutableMapping)):
+        return target[key]
+    elif isinstance(target, MutableSet):
+        if key not in target:
+            raise KeyError(key)
+        return key
+    elif hasattr(target, "__dict__"):
+        return target.__dict__[key]
+    else:
+        raise TypeError(f'Cannot get value for type {type(target)}')
+
+
 def set_value(target, key, old_value, new_value):
     if isinstance(target, (MutableSequence, MutableMapping)):
         target[key] = new_value
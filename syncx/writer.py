@@ -0,0 +1,203 @@
+"""
+Background writing of synced data, coalescing several changes into one write.
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from typing import Any
+
+from syncx.utils import flatten
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehind:
+    """
+    Writes changes to the manager's backend from a background thread.
+
+    Data is written at most every `interval` seconds, or as soon as `max_changes` changes are waiting. Pending
+    changes are also written on `flush()`, `close()` and at interpreter exit. If writing fails, the error is
+    logged and the changes are written again after the interval.
+    """
+
+    default_interval = 0.1
+
+    def __init__(self, manager: 'Manager', interval: float = default_interval, max_changes: int = None):
+        self.manager = manager
+        self.interval = interval
+        self.max_changes = max_changes
+
+        self.condition = threading.Condition()
+        self.deltas = []
+        self.change_count = 0
+        self.closed = False
+
+        self.thread = threading.Thread(target=self.run, name='syncx-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    @property
+    def dirty(self) -> bool:
+        return self.change_count > 0
+
+    def mark_dirty(self, delta: Any):
+        with self.condition:
+            self.change_count += 1
+            if delta:
+                self.deltas.append(delta)
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.dirty and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+
+                deadline = time.monotonic() + self.interval
+                while not self.closed and not self.enough_changes():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Writing changes failed, trying again later')
+
+    def enough_changes(self) -> bool:
+        return bool(self.max_changes) and self.change_count >= self.max_changes
+
+    def flush(self):
+        """
+        Writes any pending changes now. If writing fails, the changes stay pending.
+        """
+        manager = self.manager
+        with manager.lock:
+            with self.condition:
+                if not self.dirty:
+                    return
+                deltas, change_count = self.deltas, self.change_count
+                self.deltas = []
+                self.change_count = 0
+            try:
+                manager.backend.put(manager.root, manager.serializer, delta=flatten(deltas))
+            except Exception:
+                with self.condition:
+                    self.deltas = deltas + self.deltas
+                    self.change_count += change_count
+                raise
+
+    def close(self):
+        """
+        Writes any pending changes and stops the background thread.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+        self.flush()
+        atexit.unregister(self.close)
+
+
+class AsyncWriteBehind:
+    """
+    Writes changes to the manager's async backend from a task on the event loop.
+
+    Changes made while the loop is busy are written together once the loop gets to run the task, `interval`
+    seconds later, or as soon as `max_changes` changes are waiting. Changes are expected to be made on the
+    loop's thread, and pending changes are written on `flush()` and `close()`, which are both awaitable. If
+    writing fails, the error is logged and the changes are written again with the next change or `flush()`.
+
+    There is no interpreter exit hook for the loop, so `await flush()` before the loop stops. If the task is
+    cancelled, as `asyncio.run()` does to tasks still running when it returns, pending changes are written
+    before the task stops, but a write that was already under way when the task was cancelled is lost.
+    """
+
+    default_interval = 0
+
+    def __init__(self, manager: 'Manager', interval: float = default_interval, max_changes: int = None):
+        self.manager = manager
+        self.interval = interval
+        self.max_changes = max_changes
+
+        self.loop = asyncio.get_running_loop()
+        self.enough = asyncio.Event()
+        self.write_lock = asyncio.Lock()
+        self.deltas = []
+        self.change_count = 0
+        self.task = None
+
+    @property
+    def dirty(self) -> bool:
+        return self.change_count > 0
+
+    def mark_dirty(self, delta: Any):
+        self.change_count += 1
+        if delta:
+            self.deltas.append(delta)
+        if self.enough_changes():
+            self.enough.set()
+        if self.task is None:
+            self.task = self.loop.create_task(self.run())
+
+    async def run(self):
+        try:
+            while self.dirty:
+                if self.interval:
+                    try:
+                        await asyncio.wait_for(self.enough.wait(), self.interval)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await asyncio.sleep(0)
+                try:
+                    await self.flush()
+                except Exception:
+                    logger.exception('Writing changes failed, trying again with the next change')
+                    return
+        except asyncio.CancelledError:
+            await self.flush()
+            raise
+        finally:
+            self.task = None
+
+    def enough_changes(self) -> bool:
+        return bool(self.max_changes) and self.change_count >= self.max_changes
+
+    async def flush(self):
+        """
+        Writes any pending changes now. If writing fails, the changes stay pending.
+        """
+        manager = self.manager
+        async with self.write_lock:
+            if not self.dirty:
+                return
+            deltas, change_count = self.deltas, self.change_count
+            self.deltas = []
+            self.change_count = 0
+            self.enough.clear()
+            try:
+                await manager.backend.put(manager.root, manager.serializer, delta=flatten(deltas))
+            except asyncio.CancelledError:  # The write may still finish, so not written again
+                logger.warning('Writing changes was cancelled, they may not have been saved')
+                raise
+            except Exception:
+                self.deltas = deltas + self.deltas
+                self.change_count += change_count
+                raise
+
+    async def close(self):
+        """
+        Writes any pending changes and waits for the background task to finish.
+        """
+        if self.task is not None:
+            self.enough.set()  # Wake the task up to write now
+            await self.task
+        await self.flush()
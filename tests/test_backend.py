@@ -1,8 +1,19 @@
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
+from syncx import manage
+from syncx import sync
 from syncx.backend import FileBackend
+from syncx.backend import JournalBackend
+from syncx.backend import ShardedFileBackend
+from syncx.backend import SharedFileBackend
+from syncx.backend import SharedLogBackend
+from syncx.backend import SqliteLogStore
+from syncx.backend import SqliteBackend
+from syncx.serializer import PickleSerializer
 from syncx.serializer import YamlSerializer
 
 
@@ -24,11 +35,12 @@ def test_file__put__no_change_if_error(tmp_path, mock_func):
 
     my_changed_data = {'value': 'changed'}
 
-    mock_func(Path, 'write_text', exception=NotADirectoryError())
+    mock_func(YamlSerializer, 'dump', exception=NotADirectoryError())
     with pytest.raises(NotADirectoryError):
         backend.put(my_changed_data, serializer)
 
     assert (tmp_path / 'test.yaml').read_text().strip() == 'value: initial'
+    assert [path.name for path in tmp_path.iterdir()] == ['test.yaml']
 
 
 def test_file__get(path_to_test_data):
@@ -38,3 +50,308 @@ def test_file__get(path_to_test_data):
     data = backend.get(serializer)
 
     assert data == expected_data
+
+
+def test_journal__put_and_get(tmp_path):
+    serializer = YamlSerializer()
+    backend = JournalBackend(str(tmp_path / 'test.journal'))
+    backend.put({'a': [1]}, serializer)
+    backend.put(None, serializer, delta=[('add', 'a', [(1, 2)])])
+    backend.put(None, serializer, delta=[('change', '__dict__.b', (None, 3))])
+
+    assert JournalBackend(str(tmp_path / 'test.journal')).get(serializer) == {'a': [1, 2], 'b': 3}
+
+
+def test_journal__get__incomplete_last_record(tmp_path):
+    serializer = YamlSerializer()
+    backend = JournalBackend(str(tmp_path / 'test.journal'))
+    backend.put({'a': 1}, serializer)
+    backend.put(None, serializer, delta=[('change', 'a', (1, 2))])
+    backend.put(None, serializer, delta=[('change', 'a', (2, 3))])
+
+    journal = tmp_path / 'test.journal'
+    journal.write_bytes(journal.read_bytes()[:-3])
+
+    assert backend.get(serializer) == {'a': 2}
+    assert JournalBackend(str(tmp_path / 'missing.journal')).get(serializer) is None
+
+    backend.put(None, serializer, delta=[('change', 'a', (2, 4))])
+    assert JournalBackend(str(tmp_path / 'test.journal')).get(serializer) == {'a': 4}
+
+
+def test_journal__compaction(tmp_path):
+    serializer = YamlSerializer()
+    backend = JournalBackend(str(tmp_path / 'test.journal'), max_records=2)
+    data = {'a': 0}
+    backend.put(data, serializer)
+
+    for value in range(1, 4):
+        delta = [('change', 'a', (data['a'], value))]
+        data['a'] = value
+        backend.put(data, serializer, delta=delta)
+
+    backend.compaction_thread.join()
+
+    assert backend.record_count == 0
+    assert len(list(JournalBackend.read_frames((tmp_path / 'test.journal').open('rb')))) == 1
+    assert backend.get(serializer) == {'a': 3}
+
+
+def test_journal__sync(run_in_tmp_path):
+    data = sync({'a': {'b': 1}}, 'data.journal', backend=JournalBackend)
+    data['a']['b'] = 2
+    with data:
+        data['c'] = [1]
+        data['c'].append(2)
+
+    assert sync({}, 'data.journal', backend=JournalBackend) == {'a': {'b': 2}, 'c': [1, 2]}
+
+
+def test_file__binary(run_in_tmp_path):
+    my_data = sync({'value': 'initial'}, 'data.pickle')
+    my_data['value'] = 'changed'
+
+    assert FileBackend('data.pickle').get(PickleSerializer()) == {'value': 'changed'}
+    assert sync({}, 'data.pickle') == {'value': 'changed'}
+
+
+def test_journal__binary_serializer(tmp_path):
+    backend = JournalBackend(str(tmp_path / 'data.journal'))
+    backend.put({'a': 1}, PickleSerializer())
+    backend.put({'a': 2}, PickleSerializer(), delta=[('change', 'a', (1, 2))])
+
+    assert backend.get(PickleSerializer()) == {'a': 2}
+
+
+@pytest.mark.parametrize('depth', (0, 1, 2, 3))
+def test_sqlite__put_and_get(tmp_path, depth):
+    serializer = YamlSerializer()
+    backend = SqliteBackend(str(tmp_path / 'data.db'), depth=depth)
+    my_data = {'a': ['b', {'c': 0, 'd': [1]}], 'e': {1}, 'f': {}, 'g': []}
+    backend.put(my_data, serializer)
+
+    assert SqliteBackend(str(tmp_path / 'data.db'), depth=depth).get(serializer) == my_data
+
+
+def test_sqlite__get__empty(tmp_path):
+    assert SqliteBackend(str(tmp_path / 'data.db')).get(YamlSerializer()) is None
+
+
+def test_sqlite__only_touched_rows_written(run_in_tmp_path, monkeypatch):
+    data = sync({'a': [1, 2], 'b': {'c': 1}, 'd': 1}, 'data.db', backend=SqliteBackend)
+    dumped = []
+    dump = YamlSerializer.dump
+
+    def recording_dump(self, content, stream):
+        dumped.append(content)
+        dump(self, content, stream)
+    monkeypatch.setattr(YamlSerializer, 'dump', recording_dump)
+
+    data['b']['c'] = 2
+    assert dumped == [{'c': 2}]
+
+    dumped.clear()
+    with data:
+        data['e'] = 3
+        del data['d']
+    assert dumped == [3]
+
+    assert SqliteBackend('data.db').get(YamlSerializer()) == {'a': [1, 2], 'b': {'c': 2}, 'e': 3}
+
+
+def test_sqlite__list_rewritten_on_insert(run_in_tmp_path):
+    data = sync({'items': [{'a': 1}, {'a': 2}]}, 'data.db', backend=SqliteBackend('data.db', depth=2))
+    data['items'].insert(0, {'a': 0})
+    data['items'][2]['a'] = 3
+    data['items'].pop(1)
+
+    assert sync({}, 'data.db', backend=SqliteBackend('data.db', depth=2)) == {'items': [{'a': 0}, {'a': 3}]}
+
+
+def test_sqlite__key_order_kept(run_in_tmp_path):
+    data = sync({'a': 1, 'b': 2}, 'data.db', backend=SqliteBackend)
+    data['a'] = 3
+    data['c'] = 4
+
+    assert list(SqliteBackend('data.db').get(YamlSerializer()).keys()) == ['a', 'b', 'c']
+
+
+def test_sharded__put_and_get(tmp_path):
+    serializer = YamlSerializer()
+    backend = ShardedFileBackend(str(tmp_path / 'data'))
+    backend.put({'products': [1, 2], 'orders': {'a': 1}, '.hidden/key': 3}, serializer)
+
+    assert sorted(path.name for path in (tmp_path / 'data').iterdir()) == [
+        '%2Ehidden%2Fkey.yaml', '.index.yaml', 'orders.yaml', 'products.yaml',
+    ]
+    assert backend.get(serializer) == {'products': [1, 2], 'orders': {'a': 1}, '.hidden/key': 3}
+    assert list(backend.get(serializer)) == ['products', 'orders', '.hidden/key']
+
+
+def test_sharded__only_touched_shards_written(run_in_tmp_path):
+    data = sync({'products': [1, 2], 'orders': {'a': 1}}, 'data', backend=ShardedFileBackend)
+    Path('data/products.yaml').write_text('- not rewritten\n')
+
+    data['orders']['b'] = 2
+    with data:
+        data['customers'] = ['c']
+        del data['orders']
+
+    assert sorted(path.name for path in Path('data').iterdir()) == ['.index.yaml', 'customers.yaml', 'products.yaml']
+    assert sync({}, 'data', backend=ShardedFileBackend) == {'products': ['not rewritten'], 'customers': ['c']}
+
+
+@pytest.mark.parametrize('depth', (0, 1, 2))
+def test_sqlite__get_key(tmp_path, depth):
+    serializer = YamlSerializer()
+    backend = SqliteBackend(str(tmp_path / 'data.db'), depth=depth)
+    backend.put({'a': [1, {'b': 2}], 'c': 3}, serializer)
+
+    assert backend.get(serializer, 'a') == [1, {'b': 2}]
+    assert backend.get(serializer, 'c') == 3
+    assert backend.get(serializer, 'missing') is None
+    assert backend.keys(serializer) == (None if depth == 0 else ['a', 'c'])
+
+
+def test_sharded__get_key(tmp_path):
+    serializer = YamlSerializer()
+    backend = ShardedFileBackend(str(tmp_path / 'data'))
+    backend.put({'a': [1], 'c': 3}, serializer)
+
+    assert backend.get(serializer, 'a') == [1]
+    assert backend.keys(serializer) == ['a', 'c']
+
+
+def test_file__get_key(path_to_test_data):
+    backend = FileBackend(str(path_to_test_data / 'dump.yaml'))
+
+    assert backend.get(YamlSerializer(), 'e') == {1}
+
+
+def test_shared__changes_merged_before_write(run_in_tmp_path):
+    first = sync({'a': 0, 'items': []}, 'data.yaml', backend=SharedFileBackend)
+    second = sync({}, 'data.yaml', backend=SharedFileBackend)
+
+    first['a'] = 1
+    second['b'] = 2
+    assert second == {'a': 1, 'b': 2, 'items': []}
+
+    second['items'].append('x')
+    assert manage(first).refresh()
+    assert first == {'a': 1, 'b': 2, 'items': ['x']}
+    assert not manage(first).refresh()
+
+
+def test_shared__local_changes_kept_on_refresh(run_in_tmp_path):
+    first = sync({'a': 0}, 'data.yaml', backend=SharedFileBackend, flush_interval=60)
+    second = sync({}, 'data.yaml', backend=SharedFileBackend)
+
+    first['a'] = 1  # Not written yet
+    second['b'] = 2
+    manage(first).refresh()
+
+    assert first == {'a': 1, 'b': 2}
+    manage(first).flush()
+    assert SharedFileBackend('data.yaml').get(YamlSerializer()) == {'a': 1, 'b': 2}
+    first._manager.writer.close()
+
+
+def test_shared__polled(run_in_tmp_path):
+    first = sync({'a': 0}, 'data.yaml', backend=SharedFileBackend, poll_interval=0.01)
+    second = sync({}, 'data.yaml', backend=SharedFileBackend)
+
+    second['a'] = 1
+    deadline = time.monotonic() + 1
+    while first['a'] != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert first['a'] == 1
+    first._manager.watcher.close()
+
+
+def test_shared__readers_wait_for_writer(tmp_path):
+    backend = SharedFileBackend(str(tmp_path / 'data.yaml'))
+    backend.put({'value': 'initial'}, YamlSerializer())
+    results = []
+
+    with backend.file_lock(exclusive=True):
+        reader = threading.Thread(target=lambda: results.append(backend.get(YamlSerializer())))
+        reader.start()
+        reader.join(0.05)
+        assert results == []
+        FileBackend.put(backend, {'value': 'changed'}, YamlSerializer())
+    reader.join()
+
+    assert results == [{'value': 'changed'}]
+
+
+def test_shared_log__changes_applied_incrementally(run_in_tmp_path):
+    first = sync({'a': 0, 'items': []}, 'data.db', backend=SharedLogBackend)
+    second = sync({}, 'data.db', backend=SharedLogBackend)
+    assert second == {'a': 0, 'items': []}
+
+    first['a'] = 1
+    second['b'] = 2
+    assert second == {'a': 1, 'b': 2, 'items': []}
+
+    second['items'].append('x')
+    assert manage(first).refresh()
+    assert first == {'a': 1, 'b': 2, 'items': ['x']}
+    assert not manage(first).refresh()
+
+    assert sync({}, 'data.db', backend=SharedLogBackend) == {'a': 1, 'b': 2, 'items': ['x']}
+
+
+def test_shared_log__conflicting_change_reverted(run_in_tmp_path):
+    first = sync({'a': 0}, 'data.db', backend=SharedLogBackend)
+    second = sync({}, 'data.db', backend=SharedLogBackend)
+
+    first['a'] = 1
+    second['a'] = 2
+
+    assert second == {'a': 1}
+    second['a'] = 3
+    manage(first).refresh()
+    assert first == {'a': 3}
+
+
+def test_shared_log__conflicting_transaction_reverted(run_in_tmp_path):
+    first = sync({'items': [], 'x': 0}, 'data.db', backend=SharedLogBackend)
+    second = sync({}, 'data.db', backend=SharedLogBackend)
+
+    first['x'] = 1
+    with second:
+        second['items'].append('a')
+        second['items'].append('b')
+        second['x'] = 5
+
+    assert second == {'items': [], 'x': 1}
+    manage(first).refresh()
+    assert first == {'items': [], 'x': 1}
+
+
+def test_shared_log__only_deltas_read(run_in_tmp_path, monkeypatch):
+    first = sync({'a': 0}, 'data.db', backend=SharedLogBackend)
+    second = sync({}, 'data.db', backend=SharedLogBackend)
+
+    def fail():
+        raise AssertionError('Full object read')
+
+    monkeypatch.setattr(SqliteLogStore, 'load_full_object', lambda store: fail())
+    first['a'] = 1
+    second['b'] = 2
+    manage(first).refresh()
+
+    assert first == second == {'a': 1, 'b': 2}
+
+
+def test_shared_log__old_deltas_folded(run_in_tmp_path):
+    first = sync({'value': 0}, 'data.db', backend=SharedLogBackend('data.db', max_deltas=4))
+    second = sync({}, 'data.db', backend=SharedLogBackend('data.db', max_deltas=4))
+
+    for value in range(1, 10):
+        first['value'] = value
+    assert len(first._manager.backend.store.load_content().unapplied_changes) <= 4
+
+    manage(second).refresh()
+    assert second == {'value': 9}
@@ -6,13 +6,14 @@ from types import SimpleNamespace
 
 import pytest
 
+from syncx import manage
 from syncx import rollback
 from syncx import sync
 from syncx import tag
 from syncx import undo
 from syncx.backend import FileBackend
 from syncx.exceptions import LockingRaceCondition
-from syncx.wrappers import CustomObjectWrapper
+from syncx.exceptions import TransactionError
 
 
 def test_no_rollback():
@@ -57,25 +58,23 @@ def test_rollback_with_object():
     assert wrapped.a == 1
 
 
-def test_history_wrapping_and_rollback(mock_func):
+def test_history_rollback(mock_func):
     manager = tag({})._manager
-    history = manager.set_history()
-    assert type(history) is CustomObjectWrapper
+    history = manager.set_history(capacity=2)
 
     manager.add_history_entry('first entry')
-    assert history._manager.all_changes == []
-    assert history.current_index == 1
+    manager.add_history_entry('second entry')
+    history.current_index = 1
 
-    with history:
-        manager.add_history_entry('second entry')
-        assert history._manager.all_changes == [
-            [('add', '__dict__.entries', [(1, 'second entry')])],
-            [('change', '__dict__.current_index', (1, 2))],
-        ]
-        rollback()
+    manager.start_transaction()
+    manager.add_history_entry('replaced second entry')
+    manager.add_history_entry('third entry')
+    assert list(history.entries) == ['replaced second entry', 'third entry']
+    manager.end_transaction(do_rollback=True)
 
-    assert history._manager.all_changes == []
+    assert list(history.entries) == ['first entry', 'second entry']
     assert history.current_index == 1
+    assert history.rollback_log == []
 
 
 def test_with_history():
@@ -154,6 +153,59 @@ def test_re_entrant_with_history():
     assert wrapped['a'] == 1
 
 
+def test_changes_released_after_commit():
+    wrapped = tag({'a': 1})
+
+    with wrapped:
+        wrapped['a'] = 2
+        with wrapped:
+            wrapped['a'] = 3
+        assert len(wrapped._manager.all_changes) == 2
+
+    assert wrapped._manager.all_changes == []
+
+
+def test_savepoint():
+    wrapped = tag({'a': 1}, history=True)
+
+    with wrapped:
+        wrapped['a'] = 2
+        savepoint = manage(wrapped).savepoint()
+        wrapped['a'] = 3
+        manage(wrapped).savepoint('later')
+        wrapped['b'] = 4
+
+        manage(wrapped).rollback_to(savepoint)
+        assert wrapped == {'a': 2}
+        assert wrapped._manager.history.current_index == 1
+        with pytest.raises(TransactionError):
+            manage(wrapped).rollback_to('later')
+
+        wrapped['a'] = 5
+        manage(wrapped).rollback_to(savepoint)  # Savepoint is kept
+        assert wrapped == {'a': 2}
+
+    assert wrapped == {'a': 2}
+    undo(wrapped)
+    assert wrapped == {'a': 1}
+
+
+def test_savepoint__scoped_to_transaction():
+    wrapped = tag({'a': 1})
+
+    with pytest.raises(TransactionError):
+        manage(wrapped).savepoint()
+
+    with wrapped:
+        outer = manage(wrapped).savepoint()
+        with wrapped:
+            inner = manage(wrapped).savepoint()
+            with pytest.raises(TransactionError):
+                manage(wrapped).rollback_to(outer)
+        with pytest.raises(TransactionError):
+            manage(wrapped).rollback_to(inner)
+
+
 def test_thread_safety():
     def unsafe(counter):
         previous_value = counter['value']
@@ -231,3 +283,29 @@ def test_no_save_on_rollback(mock_func):
 
     assert len(mock_put.calls) == 1
     assert mock_put.args[0]['value'] == 'initial'
+
+
+def test_lock_released_when_save_fails(mock_func):
+    mock_func(FileBackend, 'get', None)
+    mock_put = mock_func(FileBackend, 'put')
+    data = sync({'value': 'initial'}, 'data.yaml')
+    mock_put.exception = OSError('Disk full')
+
+    with pytest.raises(OSError):
+        with data:
+            data['value'] = 'changed'
+
+    mock_put.exception = None
+    errors = []
+
+    def change():
+        try:
+            data['value'] = 'changed in another thread'
+        except LockingRaceCondition as error:
+            errors.append(error)
+
+    thread = Thread(target=change)
+    thread.start()
+    thread.join()
+    assert not errors
+    assert data['value'] == 'changed in another thread'
@@ -0,0 +1,146 @@
+import copy
+
+import pytest
+
+import dictdiffer
+from syncx import rollback
+from syncx import tag
+from syncx import undo
+from syncx.deltas import dotted
+from syncx.deltas import operation_delta
+
+
+def test_dotted():
+    assert dotted([]) == ''
+    assert dotted(['a', 'b']) == 'a.b'
+    assert dotted(['a', 1]) == ['a', 1]
+    assert dotted(['a.b']) == ['a.b']
+
+
+@pytest.mark.parametrize('initial, function_name, args', (
+    ({'a': 1}, '__setitem__', ('a', 2)),
+    ({'a': 1}, '__setitem__', ('b', {'c': [1]})),
+    ({'a': 1, 'b': 2}, '__delitem__', ('a',)),
+    ({'a': 1}, 'pop', ('a',)),
+    ({'a': 1}, 'pop', ('b', None)),
+    ({'a': 1}, 'setdefault', ('a', 2)),
+    ({'a': 1}, 'setdefault', ('b', 2)),
+    ({'a': 1}, 'update', ({'a': 2, 'b': 3},)),
+    ({'a': 1}, 'update', ([('b', 3)],)),
+    ({'a': 1, 'b': [2]}, 'clear', ()),
+    ([1, 2, 3], '__setitem__', (-1, 4)),
+    ([1, 2, 3], '__delitem__', (0,)),
+    ([1, 2, 3], 'insert', (1, 4)),
+    ([1, 2, 3], 'insert', (-10, 4)),
+    ([1, 2, 3], 'insert', (10, 4)),
+    ([1, 2, 3], 'append', ([4],)),
+    ([1, 2, 3], 'extend', ([4, 5],)),
+    ([1, 2, 3], '__iadd__', ((4, 5),)),
+    ([1, 2, 3], 'pop', ()),
+    ([1, 2, 3], 'pop', (0,)),
+    ([1, 2, 1], 'remove', (1,)),
+    ({1, 2}, 'add', (3,)),
+    ({1, 2}, 'add', (1,)),
+    ({1, 2}, 'discard', (1,)),
+    ({1, 2}, 'remove', (2,)),
+    ({1, 2}, 'clear', ()),
+    ({1, 2}, '__ior__', ({2, 3},)),
+    ({1, 2}, '__isub__', ({2, 3},)),
+    ({1, 2}, '__iand__', ({2, 3},)),
+    ({1, 2}, '__ixor__', ({2, 3},)),
+))
+def test_operation_delta__patch_and_revert(initial, function_name, args):
+    root = {'node': initial}
+    before = copy.deepcopy(root)
+
+    delta = operation_delta(root['node'], ['node'], function_name, args, {})
+    getattr(root['node'], function_name)(*args)
+
+    assert delta is not None
+    assert dictdiffer.patch(delta, before) == root
+    assert dictdiffer.revert(delta, root) == before
+
+
+@pytest.mark.parametrize('function_name, args', (
+    ('__setattr__', ('a', 2)),
+    ('__setattr__', ('b', [3])),
+    ('__delattr__', ('a',)),
+))
+def test_operation_delta__object_attributes(function_name, args):
+    class Node:
+        pass
+
+    node = Node()
+    node.a = 1
+    root = {'node': vars(node)}  # Tracked objects are changed at their __dict__
+    before = copy.deepcopy(root)
+
+    delta = operation_delta(vars(node), ['node'], function_name, args, {})
+    getattr(node, function_name)(*args)
+
+    assert delta is not None
+    assert dictdiffer.patch(delta, before) == root
+    assert dictdiffer.revert(delta, root) == before
+
+
+def test_operation_delta__matches_diff():
+    data = {'a': 1}
+    assert operation_delta(data, [], '__setitem__', ('a', 2), {}) == list(dictdiffer.diff({'a': 1}, {'a': 2}))
+    assert operation_delta(data, [], '__setitem__', ('b', 2), {}) == list(dictdiffer.diff({'a': 1}, {'a': 1, 'b': 2}))
+    assert operation_delta([1], ['a'], 'append', (2,), {}) == list(dictdiffer.diff([1], [1, 2], node=['a']))
+
+
+@pytest.mark.parametrize('initial, function_name, args', (
+    ([1, 2], 'reverse', ()),
+    ([1, 2], 'clear', ()),
+    ([1, 2], '__setitem__', (slice(0, 1), [3])),
+    ([1, 2], 'extend', (iter([3]),)),
+    ({'a': 1}, 'popitem', ()),
+    ({1}, 'pop', ()),
+    ({1, 2}, '__ior__', ([3],)),
+    ({1, 2}, '__isub__', ((2,),)),
+    ({1, 2}, '__iand__', ({2: 0},)),
+    ({1, 2}, '__ixor__', ('a',)),
+))
+def test_operation_delta__not_modelled(initial, function_name, args):
+    assert operation_delta(initial, [], function_name, args, {}) is None
+
+
+def test_set_operator_with_unsupported_operand():
+    data = tag({'a': {1}, 'b': {2}}, history=True)
+    with pytest.raises(TypeError):
+        data['a'] |= [2]
+    assert not any(data._manager.history.entries)  # No change recorded
+
+    data['a'] |= data['b']  # Tagged sets are not accepted, assigned the result of `|` instead
+    assert data == {'a': {1, 2}, 'b': {2}}
+    undo(data)
+    assert data == {'a': {1}, 'b': {2}}
+
+
+def test_no_copy_of_whole_container():
+    class CopyCounter:
+        copies = 0
+
+        def __deepcopy__(self, memo):
+            CopyCounter.copies += 1
+            return CopyCounter()
+
+    data = tag([CopyCounter() for _ in range(10)])
+    with data:
+        data.append(CopyCounter())
+        assert CopyCounter.copies == 1
+        rollback()
+
+    assert len(data) == 10
+
+
+def test_fallback_to_diff():
+    data = tag([1, 2, 3])
+    with data:
+        data.reverse()
+        assert data == [3, 2, 1]
+        assert data._manager.all_changes == [list(dictdiffer.diff([1, 2, 3], [3, 2, 1]))]
+        rollback()
+
+    assert data == [1, 2, 3]
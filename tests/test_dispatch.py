@@ -0,0 +1,194 @@
+import asyncio
+import threading
+
+import pytest
+
+from syncx import tag
+from syncx.dispatch import AsyncioDispatcher
+from syncx.dispatch import PoolDispatcher
+from syncx.dispatch import ThreadDispatcher
+from syncx.exceptions import LockingRaceCondition
+
+
+class BlockingCallback:
+    """
+    Callback that holds up the first delivery until released.
+    """
+
+    def __init__(self):
+        self.delivered = []
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def __call__(self, changes):
+        self.started.set()
+        assert self.released.wait(1)
+        self.delivered.append(changes)
+
+
+def test_slow_callback_does_not_block_changes():
+    callback = BlockingCallback()
+    dispatcher = ThreadDispatcher(callback)
+    data = tag({}, dispatcher)
+
+    data['a'] = 1
+    data['b'] = 2
+    assert callback.started.wait(1)
+    assert callback.delivered == []
+
+    callback.released.set()
+    dispatcher.flush()
+
+    assert [details.args for details in callback.delivered] == [('a', 1), ('b', 2)]
+    dispatcher.close()
+
+
+def test_batched(catcher):
+    dispatcher = ThreadDispatcher(catcher.changed, batch_interval=10)
+    data = tag({}, dispatcher)
+
+    data['a'] = 1
+    data['b'] = 2
+    dispatcher.flush()
+    data['c'] = 3
+    dispatcher.close()
+
+    assert [[details.args[0] for details in batch] for batch in catcher.details_list] == [['a', 'b'], ['c']]
+
+
+@pytest.mark.parametrize('overflow, expected_keys, dropped, coalesced', (
+    ('drop_oldest', ['first', 'y', 'x'], 1, 0),
+    ('coalesce', ['first', 'y', 'x'], 0, 1),
+))
+def test_overflow(overflow, expected_keys, dropped, coalesced):
+    callback = BlockingCallback()
+    dispatcher = ThreadDispatcher(callback, max_pending=2, overflow=overflow)
+    data = tag({'a': {}, 'b': {}}, dispatcher)
+
+    data['first'] = True
+    assert callback.started.wait(1)
+    data['a']['x'] = 1
+    data['b']['y'] = 1
+    data['a']['x'] = 2
+    callback.released.set()
+    dispatcher.close()
+
+    assert [details.args[0] for details in callback.delivered] == expected_keys
+    assert (dispatcher.dropped, dispatcher.coalesced) == (dropped, coalesced)
+
+
+def test_overflow__coalesce_by_changed_key():
+    callback = BlockingCallback()
+    dispatcher = ThreadDispatcher(callback, overflow='coalesce')
+    data = tag({'a': {}, 'b': []}, dispatcher)
+
+    data['first'] = True
+    assert callback.started.wait(1)
+    data['a']['x'] = 1
+    data['a']['y'] = 1
+    data['a']['x'] = 2
+    data['b'].append(1)
+    data['b'].append(2)
+    callback.released.set()
+    dispatcher.close()
+
+    assert [(details.function_name, details.args) for details in callback.delivered] == [
+        ('__setitem__', ('first', True)),
+        ('__setitem__', ('y', 1)),
+        ('__setitem__', ('x', 2)),
+        ('append', (2,)),
+    ]
+    assert dispatcher.coalesced == 2
+
+
+def test_overflow__block():
+    callback = BlockingCallback()
+    dispatcher = ThreadDispatcher(callback, max_pending=1)
+    data = tag({}, dispatcher)
+
+    data['a'] = 1
+    assert callback.started.wait(1)
+    data['b'] = 2
+    writer = threading.Thread(target=lambda: data.update(c=3))
+    writer.start()
+    writer.join(0.05)
+
+    assert writer.is_alive()
+    callback.released.set()
+    writer.join(1)
+    dispatcher.close()
+
+    assert not writer.is_alive()
+    assert len(callback.delivered) == 3
+
+
+def test_overflow__block__callback_cannot_change_the_data():
+    errors = []
+    released = threading.Event()
+
+    def callback(details):
+        if details.args[0] == 'a':
+            assert released.wait(1)
+            try:
+                data['seen'] = True
+            except LockingRaceCondition as error:
+                errors.append(error)
+
+    dispatcher = ThreadDispatcher(callback, max_pending=1)
+    data = tag({}, dispatcher, lock_timeout=0.01)
+
+    data['a'] = 1
+    data['b'] = 2
+    writer = threading.Thread(target=lambda: data.update(c=3))
+    writer.start()
+    writer.join(0.05)
+    assert writer.is_alive()  # Waiting for room while holding the lock
+
+    released.set()
+    writer.join(1)
+    dispatcher.close()
+
+    assert not writer.is_alive()
+    assert len(errors) == 1
+    assert 'seen' not in data
+
+
+def test_pool(catcher):
+    threads = set()
+
+    def callback(details):
+        threads.add(threading.current_thread().name)
+        catcher.changed(details)
+
+    dispatcher = PoolDispatcher(callback, max_workers=2)
+    data = tag({}, dispatcher)
+    data['a'] = 1
+    dispatcher.close()
+
+    assert catcher.paths == [[]]
+    assert all(name.startswith('syncx-callback') for name in threads)
+
+
+def test_asyncio(catcher):
+    async def main():
+        delivered = asyncio.Event()
+
+        async def callback(batch):
+            catcher.details_list.extend(batch)
+            delivered.set()
+
+        dispatcher = AsyncioDispatcher(callback, batch_interval=0.01)
+        data = tag({}, dispatcher)
+        data['a'] = 1
+        data['b'] = 2
+        await asyncio.wait_for(delivered.wait(), 1)
+        dispatcher.close()
+
+    asyncio.run(main())
+
+    assert [details.args for details in catcher.details_list] == [('a', 1), ('b', 2)]
+
+
+def test_unknown_overflow():
+    with pytest.raises(ValueError):
+        ThreadDispatcher(print, overflow='ignore')
@@ -0,0 +1,50 @@
+import datetime
+from dataclasses import dataclass
+from decimal import Decimal
+
+import pytest
+
+from syncx import tag
+from syncx.hashing import canonical_hash
+from syncx.hashing import encode
+
+
+@dataclass
+class Item:
+    name: str
+    tags: set
+
+
+def test_encode__order_independent():
+    assert encode({'a': 1, 'b': {2, 3}}) == encode({'b': {3, 2}, 'a': 1})
+
+
+@pytest.mark.parametrize('first, second', (
+    (1, '1'),
+    (1, 1.0),
+    (True, 1),
+    (None, ''),
+    (['ab'], ['a', 'b']),
+    ({'a': 1}, [('a', 1)]),
+    (Decimal('1.0'), Decimal('1.00')),
+    (datetime.date(2020, 1, 1), datetime.datetime(2020, 1, 1)),
+))
+def test_encode__types_distinguished(first, second):
+    assert encode(first) != encode(second)
+
+
+def test_encode__tagged_data_and_objects():
+    data = {'item': Item('a', {'x', 'y'})}
+
+    assert encode(tag(data)) == encode(data)
+    assert encode(data) != encode({'item': {'name': 'a', 'tags': {'x', 'y'}}})
+
+
+def test_encode__unsupported():
+    with pytest.raises(TypeError):
+        encode(object())
+
+
+def test_canonical_hash__chained():
+    assert canonical_hash('a', b'1') != canonical_hash('a', b'2')
+    assert canonical_hash('a', b'1') == canonical_hash('a', b'1')
@@ -2,9 +2,15 @@ import pytest
 
 import dictdiffer
 from syncx import redo
+from syncx import rollback
+from syncx import sync
+from syncx import manage
 from syncx import tag
 from syncx import undo
+from syncx.backend import SqliteBackend
 from syncx.exceptions import HistoryError
+from syncx.history import PersistentHistory
+from syncx.lazy import NOT_LOADED
 
 
 def test_history_indexing(mock_func):
@@ -13,10 +19,10 @@ def test_history_indexing(mock_func):
     manager = tag({}, history=True)._manager
 
     assert manager.add_history_entry(1) == 1
-    assert manager.history.entries == [1]
+    assert list(manager.history.entries) == [1]
 
     assert manager.add_history_entry(2) == 2
-    assert manager.history.entries == [1, 2]
+    assert list(manager.history.entries) == [1, 2]
 
     assert manager.undo() == 1
 
@@ -26,14 +32,14 @@ def test_history_indexing(mock_func):
 
     assert manager.undo() == 1
     assert manager.add_history_entry(3) == 2
-    assert manager.history.entries == [1, 3]
+    assert list(manager.history.entries) == [1, 3]
 
     manager.undo()
     assert manager.undo() == 0
     assert manager.undo() == 0
 
     assert manager.add_history_entry(4) == 1
-    assert manager.history.entries == [4]
+    assert list(manager.history.entries) == [4]
 
 
 def test_history_used_before_activated():
@@ -56,19 +62,18 @@ def test_history_patching():
 
 def test_history_capacity(mock_func):
     mock_func(dictdiffer, 'patch')
-    manager = tag({})._manager
-    manager.set_history()._capacity = 4
+    manager = tag({}, history=True, history_capacity=4)._manager
 
     [manager.add_history_entry(entry) for entry in range(4)]
-    assert manager.history.entries == [0, 1, 2, 3]
+    assert list(manager.history.entries) == [0, 1, 2, 3]
 
     manager.add_history_entry(4)
-    assert manager.history.entries == [1, 2, 3, 4]
+    assert list(manager.history.entries) == [1, 2, 3, 4]
 
     manager.undo()
     manager.add_history_entry(5)
     manager.add_history_entry(6)
-    assert manager.history.entries == [2, 3, 5, 6]
+    assert list(manager.history.entries) == [2, 3, 5, 6]
 
 
 def test_undo_redo():
@@ -95,3 +100,296 @@ def test_undo_redo():
     my_data['a'][1]['c']['f'] = 4
     undo(my_data)
     assert my_data['a'][1]['c']['f'] == 3
+
+
+def test_history_max_bytes(mock_func):
+    mock_func(dictdiffer, 'patch')
+    manager = tag({})._manager
+    history = manager.set_history(max_bytes=100)
+
+    [manager.add_history_entry('x' * 30) for _ in range(5)]
+
+    assert len(history.entries) == 2
+    assert history.total_bytes <= 100
+    assert history.current_index == 2
+
+
+def test_history_capacity_through_sync(run_in_tmp_path):
+    my_data = sync({'value': 0}, 'data.yaml', history=True, history_capacity=2)
+
+    for value in range(1, 5):
+        my_data['value'] = value
+    undo(my_data)
+    undo(my_data)
+    undo(my_data)
+
+    assert my_data['value'] == 2
+
+
+def test_history_capacity_lowered(run_in_tmp_path):
+    my_data = tag({'value': 0}, history=True)
+    for value in range(1, 11):
+        my_data['value'] = value
+
+    my_data = sync(my_data, 'data.yaml', history=True, history_capacity=3)
+    assert manage(my_data).version == 3
+
+    undo(my_data)
+    assert my_data['value'] == 9
+
+
+def test_goto():
+    my_data = tag({'values': []}, history=True, history_checkpoint_interval=5)
+    for value in range(3):
+        my_data['values'].append(value)
+    history = my_data._manager.history
+    assert history.checkpoint_versions == []
+
+    manage(my_data).goto(0)
+    assert history.checkpoint_versions == [3]  # First checkpoint when needed
+    manage(my_data).goto(3)
+    for value in range(3, 23):
+        my_data['values'].append(value)
+    assert history.checkpoint_versions == [3, 5, 10, 15, 20]
+
+    assert manage(my_data).goto(12) == 12
+    assert my_data == {'values': list(range(12))}
+    assert manage(my_data).version == 12
+
+    manage(my_data).goto(0)
+    assert my_data == {'values': []}
+    manage(my_data).goto(23)
+    assert my_data == {'values': list(range(23))}
+
+    with pytest.raises(HistoryError):
+        manage(my_data).goto(24)
+
+
+def test_goto__entries_dropped_for_first_checkpoint():
+    my_data = tag(
+        {'value': 0, 'padding': 'x' * 300}, history=True, history_max_bytes=600, history_checkpoint_interval=2
+    )
+    for value in range(1, 9):
+        my_data['value'] = value
+
+    history = my_data._manager.history
+
+    version = manage(my_data).goto(6)
+    dropped = history.base_version  # Oldest entries dropped to make room for the checkpoint
+    assert dropped > 0
+    assert version == manage(my_data).version == 6 - dropped
+    assert my_data['value'] == 6
+
+    undo(my_data)
+    assert manage(my_data).version == version - 1
+    assert my_data['value'] == 5
+
+
+def test_goto__later_checkpoints_dropped_by_new_changes():
+    my_data = tag({'values': []}, history=True, history_checkpoint_interval=5)
+    my_data['values'].append(0)
+    manage(my_data).goto(1)
+    for value in range(1, 12):
+        my_data['values'].append(value)
+
+    manage(my_data).goto(3)
+    my_data['other'] = True
+
+    assert my_data._manager.history.checkpoint_versions == [1]
+    assert manage(my_data).materialize(0) == {'values': []}
+
+
+def test_materialize():
+    my_data = tag({'value': 0}, history=True, history_checkpoint_interval=5)
+    manage(my_data).goto(0)
+    for value in range(1, 13):
+        my_data['value'] = value
+
+    assert [manage(my_data).materialize(version)['value'] for version in range(13)] == list(range(13))
+    assert my_data == {'value': 12}
+    assert manage(my_data).version == 12
+
+
+def test_materialize__history_unchanged():
+    my_data = tag({'s': set()}, history=True)
+    my_data['s'] = {1}
+    my_data['s'].add(2)
+    undo(my_data)
+    undo(my_data)
+
+    assert manage(my_data).materialize(2) == {'s': {1, 2}}
+
+    redo(my_data)
+    assert my_data['s'] == {1}
+
+
+def test_checkpoints_rolled_back():
+    my_data = tag({'value': 0}, history=True, history_checkpoint_interval=2)
+    manage(my_data).goto(0)
+    with my_data:
+        for value in range(1, 5):
+            my_data['value'] = value
+        rollback()
+
+    assert my_data._manager.history.checkpoint_versions == [0]
+
+
+def test_checkpoints_counted_in_max_bytes():
+    my_data = tag({'text': ''}, history=True, history_max_bytes=20_000, history_checkpoint_interval=2)
+    manage(my_data).goto(0)
+    for value in range(20):
+        my_data['text'] = str(value) * 1000
+
+    history = my_data._manager.history
+    assert history.total_bytes <= 20_000
+    assert history.total_bytes == sum(history.entry_sizes) + sum(history.checkpoint_sizes.values())
+    assert history.checkpoint_versions
+    assert manage(my_data).materialize(len(history.entries) - 1)['text'] == '18' * 1000
+
+
+def test_checkpoints_off():
+    my_data = tag({'value': 0}, history=True, history_checkpoint_interval=None)
+    for value in range(1, 5):
+        my_data['value'] = value
+
+    manage(my_data).goto(1)
+
+    assert my_data['value'] == 1
+    assert my_data._manager.history.checkpoint_versions == []
+
+
+def test_history_on_lazy_data_not_loaded(run_in_tmp_path):
+    sync({'a': 1, 'b': 2}, 'data.db', backend=SqliteBackend)
+    my_data = sync({}, 'data.db', backend=SqliteBackend, lazy=True, history=True)
+    my_data['a'] = 3
+
+    assert my_data.__subject__.values_by_key['b'] is NOT_LOADED
+
+
+def test_persistent_history__survives_restart(run_in_tmp_path):
+    my_data = sync({'value': 0}, 'data.yaml', persistent_history=True)
+    for value in range(1, 4):
+        my_data['value'] = value
+    undo(my_data)
+
+    my_data = sync({}, 'data.yaml', persistent_history=True)
+    assert my_data['value'] == 2
+    assert my_data._manager.history.current_index == 2
+
+    undo(my_data)
+    assert my_data['value'] == 1
+    redo(my_data)
+    redo(my_data)
+    assert my_data['value'] == 3
+
+
+def test_persistent_history__survives_restart_after_entries_dropped(run_in_tmp_path):
+    my_data = sync({'value': 0}, 'data.yaml', persistent_history=True, history_capacity=3)
+    for value in range(1, 6):
+        my_data['value'] = value
+    undo(my_data)
+
+    my_data = sync({}, 'data.yaml', persistent_history=True, history_capacity=3)
+    assert my_data['value'] == 4
+    assert manage(my_data).version == 2
+
+    undo(my_data)
+    assert my_data['value'] == 3
+
+
+def test_persistent_history__older_entries_paged_out(run_in_tmp_path, monkeypatch):
+    monkeypatch.setattr(PersistentHistory, 'default_memory_entries', 2)
+    my_data = sync({'value': 0}, 'data.yaml', persistent_history=True)
+    for value in range(1, 6):
+        my_data['value'] = value
+
+    history = my_data._manager.history
+    assert [entry.delta is not None for entry in history.entries] == [False, False, False, True, True]
+
+    for _ in range(5):
+        undo(my_data)
+    assert my_data['value'] == 0
+
+
+def test_persistent_history__entries_paged_out_after_transaction(run_in_tmp_path, monkeypatch):
+    monkeypatch.setattr(PersistentHistory, 'default_memory_entries', 2)
+    my_data = sync({'value': 0}, 'data.yaml', persistent_history=True)
+    with my_data:
+        for value in range(1, 11):
+            my_data['value'] = value
+    my_data['value'] = 11
+
+    history = my_data._manager.history
+    assert sum(entry.delta is not None for entry in history.entries) == 2
+
+    for _ in range(11):
+        undo(my_data)
+    assert my_data['value'] == 0
+
+
+def test_persistent_history__rolled_back_changes_not_saved(run_in_tmp_path):
+    my_data = sync({'value': 0}, 'data.yaml', persistent_history=True)
+    my_data['value'] = 1
+    with my_data:
+        my_data['value'] = 2
+        my_data['other'] = 3
+        rollback()
+
+    history = sync({}, 'data.yaml', persistent_history=True)._manager.history
+    assert len(history.entries) == 1
+    assert history.current_index == 1
+
+
+def test_persistent_history__changes_after_savepoint_not_saved(run_in_tmp_path):
+    my_data = sync({'value': 0}, 'data.yaml', persistent_history=True)
+    with my_data:
+        my_data['value'] = 1
+        savepoint = manage(my_data).savepoint()
+        my_data['value'] = 2
+        manage(my_data).rollback_to(savepoint)
+
+    history = sync({}, 'data.yaml', persistent_history=True)._manager.history
+    assert len(history.entries) == 1
+    assert history.current_index == 1
+
+
+def test_persistent_history__compacted(tmp_path):
+    history = PersistentHistory(str(tmp_path / 'data.history'), capacity=3, memory_entries=1)
+    for entry in range(20):
+        history.add([entry])
+
+    assert history.record_count <= 2 * 3 + 1 + 1
+    assert [history.entry(index) for index in range(3)] == [[17], [18], [19]]
+    assert PersistentHistory(str(tmp_path / 'data.history')).current_index == 3
+
+
+def test_persistent_history__checkpoints(run_in_tmp_path):
+    my_data = sync({'value': 0}, 'data.yaml', persistent_history=True, history_checkpoint_interval=5)
+    manage(my_data).goto(0)
+    for value in range(1, 13):
+        my_data['value'] = value
+
+    my_data = sync({}, 'data.yaml', persistent_history=True, history_checkpoint_interval=5)
+    history = my_data._manager.history
+    assert history.checkpoint_versions == [0, 5, 10]
+    assert history.checkpoint(5) == {'value': 5}
+
+    manage(my_data).goto(6)
+    assert my_data['value'] == 6
+    assert sync({}, 'data.yaml', persistent_history=True)._manager.history.current_index == 6
+
+
+def test_persistent_history__checkpoints_compacted(tmp_path):
+    history = PersistentHistory(str(tmp_path / 'data.history'), capacity=3, memory_entries=1, checkpoint_interval=4)
+    for entry in range(20):
+        history.add([entry])
+        if history.needs_first_checkpoint() or history.needs_checkpoint():
+            history.add_checkpoint({'entry': entry})
+
+    assert history.checkpoint_versions == [20]
+    assert history.checkpoint(3) == {'entry': 19}
+    assert history.record_count <= 3 + 1 + 1 + 1 + 2
+
+    history = PersistentHistory(str(tmp_path / 'data.history'))
+    assert history.checkpoint_versions == [3]
+    assert history.checkpoint(3) == {'entry': 19}
@@ -0,0 +1,56 @@
+import copy
+
+import pytest
+
+from syncx import sync
+from syncx.backend import ShardedFileBackend
+from syncx.backend import SqliteBackend
+from syncx.lazy import LazyDict
+
+
+def test_lazy_dict(mock_simple):
+    mock_simple.return_value = 'loaded'
+    lazy_dict = LazyDict(['a', 'b'], mock_simple)
+
+    assert list(lazy_dict) == ['a', 'b']
+    assert 'a' in lazy_dict
+    assert not lazy_dict.is_loaded('a')
+    assert mock_simple.calls == []
+
+    assert lazy_dict['a'] == 'loaded'
+    assert lazy_dict['a'] == 'loaded'
+    assert len(mock_simple.calls) == 1
+    assert lazy_dict.is_loaded('a')
+
+    lazy_dict['b'] = 'set'
+    assert lazy_dict.is_loaded('b')
+    assert copy.deepcopy(lazy_dict) == {'a': 'loaded', 'b': 'set'}
+    assert type(copy.deepcopy(lazy_dict)) is dict
+
+
+@pytest.mark.parametrize('name, backend', (
+    ('data.db', SqliteBackend),
+    ('data', ShardedFileBackend),
+))
+def test_sync__loaded_on_access(run_in_tmp_path, name, backend):
+    sync({'a': {'b': 1}, 'c': [1]}, name, backend=backend)
+
+    data = sync({}, name, backend=backend, lazy=True)
+    lazy_dict = data.__subject__
+    assert type(lazy_dict) is LazyDict
+    assert not lazy_dict.is_loaded('a')
+
+    data['c'].append(2)
+    data['d'] = 3
+    assert not lazy_dict.is_loaded('a')
+
+    assert sync({}, name, backend=backend) == {'a': {'b': 1}, 'c': [1, 2], 'd': 3}
+    assert data['a'] == {'b': 1}
+
+
+def test_sync__not_lazily_loaded_without_keyed_backend(run_in_tmp_path):
+    sync({'a': 1}, 'data.yaml')
+
+    data = sync({}, 'data.yaml', lazy=True)
+
+    assert type(data.__subject__) is dict
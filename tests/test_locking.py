@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+
+from syncx import manage
+from syncx import tag
+from syncx.exceptions import LockingRaceCondition
+from syncx.locking import RWLock
+
+
+def test_readers_share_the_lock():
+    lock = RWLock()
+    all_reading = threading.Barrier(3, timeout=1)
+
+    def reader():
+        assert lock.acquire_read(timeout=1)
+        try:
+            all_reading.wait()
+        finally:
+            lock.release_read()
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert lock.statistics.reads == 3
+    assert not lock.read_counts
+
+
+def test_writer_excludes_readers():
+    lock = RWLock()
+    results = []
+
+    with lock:
+        thread = threading.Thread(target=lambda: results.append(lock.acquire_read(timeout=0.01)))
+        thread.start()
+        thread.join()
+
+    assert results == [False]
+    assert lock.statistics.read_waits == 1
+    assert lock.statistics.timeouts == 1
+
+
+def test_waiting_writer_preferred():
+    lock = RWLock()
+    lock.acquire_read()
+    writer_waiting = threading.Event()
+    order = []
+
+    def writer():
+        writer_waiting.set()
+        with lock:
+            order.append('writer')
+
+    def reader():
+        lock.acquire_read()
+        order.append('reader')
+        lock.release_read()
+
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    writer_waiting.wait()
+    while not lock.waiting_writers:
+        pass
+    reader_thread = threading.Thread(target=reader)
+    reader_thread.start()
+
+    lock.release_read()
+    writer_thread.join()
+    reader_thread.join()
+
+    assert order == ['writer', 'reader']
+
+
+def test_reentrant():
+    lock = RWLock()
+
+    with lock:
+        with lock:
+            assert lock.acquire_read()
+            lock.release_read()
+    assert lock.writer is None
+
+    lock.acquire_read()
+    assert lock.acquire_read()
+    with pytest.raises(RuntimeError):
+        lock.acquire()
+    lock.release_read()
+    lock.release_read()
+    with pytest.raises(RuntimeError):
+        lock.release_read()
+
+
+def test_read_context():
+    data = tag({'value': 1}, read_write_lock=True, lock_timeout=0.01)
+    errors = []
+
+    def write():
+        try:
+            data['value'] = 2
+        except LockingRaceCondition as error:
+            errors.append(error)
+
+    with manage(data).read():
+        assert data['value'] == 1
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join()
+
+    assert len(errors) == 1
+
+    data['value'] = 3
+    assert data['value'] == 3
+
+    statistics = manage(data).lock_statistics
+    assert statistics.reads == 1
+    assert statistics.timeouts == 1
+
+
+def test_read_context__exclusive_by_default():
+    data = tag({'value': 1}, lock_timeout=0.01)
+    errors = []
+
+    def read():
+        try:
+            with manage(data).read():
+                pass
+        except LockingRaceCondition as error:
+            errors.append(error)
+
+    with data:
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+
+    assert len(errors) == 1
+    assert manage(data).lock_statistics is None
@@ -5,6 +5,7 @@ from syncx import tag
 from syncx.manager import Manager
 from syncx.manager import ManagerInterface
 from syncx.serializer import JsonSerializer
+from syncx.serializer import PickleSerializer
 from syncx.serializer import YamlSerializer
 
 
@@ -13,6 +14,8 @@ def test_get_serializer():
     assert Manager.get_serializer('foo.yml') is YamlSerializer
     assert Manager.get_serializer('foo.yaml') is YamlSerializer
     assert Manager.get_serializer('foo.json') is JsonSerializer
+    assert Manager.get_serializer('foo.pickle') is PickleSerializer
+    assert Manager.get_serializer('foo.bin') is PickleSerializer
 
 
 def test_interface():
@@ -53,3 +56,15 @@ def test_start_sync__file_exists__custom_type(path_to_test_data):
 
     assert wrapped.a == ['b', {'c': 0, 'd': 1}]
     assert wrapped.e == {1}
+
+
+def test_start_sync__file_exists__nested_change(get_test_data_file, tmp_path):
+    name = str(tmp_path / 'test.yaml')
+    (tmp_path / 'test.yaml').write_text(get_test_data_file('dump.yaml'))
+    initial_data = tag({})
+    wrapped = initial_data._manager.start_sync(initial_data, name)
+
+    wrapped['a'][1]['c'] = 2
+
+    assert wrapped['a']._manager is wrapped._manager
+    assert 'c: 2' in (tmp_path / 'test.yaml').read_text()
@@ -0,0 +1,82 @@
+from pathlib import Path
+
+from syncx import manage
+from syncx import sync
+from syncx import tag
+from syncx.merkle import LocalSource
+from syncx.merkle import differences
+from syncx.merkle import subtree_hash
+
+
+class CountingSource(LocalSource):
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.fetched = []
+        self.listed = []
+
+    def child_hashes(self, path):
+        self.listed.append(path)
+        return super().child_hashes(path)
+
+    def fetch(self, path, *args):
+        self.fetched.append(path)
+        return super().fetch(path, *args)
+
+
+def test_hash__equal_for_equal_data():
+    data = tag({'a': [1, {'b': 2}], 'c': {1, 2}})
+
+    assert manage(data).hash == manage(tag({'c': {2, 1}, 'a': [1, {'b': 2}]})).hash
+    assert subtree_hash(data) == subtree_hash({'a': [1, {'b': 2}], 'c': {1, 2}})
+    assert manage(data).hash != manage(tag({'a': [1, {'b': 3}], 'c': {1, 2}})).hash
+
+
+def test_hash__updated_along_changed_path():
+    data = tag({'changed': {'value': 1}, 'unchanged': {'value': 1}})
+    before = manage(data).hash
+    unchanged_hash = data['unchanged']._hash
+
+    data['changed']['value'] = 2
+
+    assert data['changed']._hash is None
+    assert data._hash is None
+    assert data['unchanged']._hash is unchanged_hash
+    assert manage(data).hash == manage(tag({'changed': {'value': 2}, 'unchanged': {'value': 1}})).hash
+
+    data['changed']['value'] = 1
+
+    assert manage(data).hash == before
+
+
+def test_differences():
+    local = {'same': {'a': [1, 2]}, 'changed': [1, {'b': 2}], 'removed': 1, 'resized': [1]}
+    remote = {'same': {'a': [1, 2]}, 'changed': [1, {'b': 3}], 'added': 1, 'resized': [1, 2]}
+
+    assert sorted(differences(LocalSource(local), LocalSource(remote)), key=str) == [
+        ('added',), ('changed', 1, 'b'), ('removed',), ('resized',),
+    ]
+
+
+def test_reconcile__only_differing_subtrees_fetched():
+    data = tag({str(i): {'values': [i, i]} for i in range(100)})
+    other = tag({str(i): {'values': [i, i]} for i in range(100)})
+    other['5']['values'][1] = -1
+    other['new'] = {}
+    source = CountingSource(other)
+
+    delta = manage(data).reconcile(source)
+
+    assert delta == [('change', ['5', 'values', 1], (5, -1)), ('add', [], [('new', {})])]
+    assert source.fetched == [('5', 'values', 1), ('new',)]
+    assert source.listed == [(), ('5',), ('5', 'values'), ('5', 'values', 1)]
+    assert manage(data).hash == manage(other).hash
+    assert manage(data).reconcile(source) == []
+
+
+def test_reconcile__synced(run_in_tmp_path):
+    data = sync({'value': 1}, 'data.json')
+
+    manage(data).reconcile({'value': 2})
+
+    assert Path('data.json').read_text() == '{"value":2}'
@@ -3,9 +3,13 @@ import io
 from types import SimpleNamespace
 
 import pydantic
+import pytest
 
+from syncx import tag
 from syncx.serializer import JsonSerializer
+from syncx.serializer import PickleSerializer
 from syncx.serializer import YamlSerializer
+from syncx.wrappers import NotifyWrapper
 
 
 def test_to_yaml(get_test_data_file):
@@ -18,6 +22,25 @@ def test_to_yaml(get_test_data_file):
     assert stream.getvalue() == get_test_data_file('dump.yaml')
 
 
+@pytest.mark.parametrize('my_data', (
+    {'a': ['b', {'c': 0, 'd': 1}], 'e': {1}},
+    {'text': 'ä ö 漢字', 'long': 'word ' * 40, 'lines': 'a\nb\n', 'floats': [1.5, float('inf'), 1e20]},
+    {'emoji': '🙂'},
+    {'': 'empty key', 'return': 'a\rb', 'next line': 'a\x85b'},
+    {'a': 'word ' * 20 + '\t' + 'more ' * 10, 'b': [[[[[[[[[[[[[[[[[[[[[[[[[[[[['a\tb c\nd']]]]]]]]]]]]]]]]]]]]]]]]]]]]]},
+))
+def test_to_yaml__same_with_and_without_libyaml(monkeypatch, my_data):
+    serializer = YamlSerializer()
+    stream = io.StringIO()
+    serializer.dump(tag(my_data), stream)
+
+    monkeypatch.setattr(YamlSerializer, 'with_libyaml', False)
+    pure_python_stream = io.StringIO()
+    serializer.dump(tag(my_data), pure_python_stream)
+
+    assert stream.getvalue() == pure_python_stream.getvalue()
+
+
 def test_from_yaml(get_test_data_file):
     stream = io.StringIO(get_test_data_file('dump.yaml'))
     serializer = YamlSerializer()
@@ -97,3 +120,44 @@ def test_pydantic_to_json():
     serializer.dump(Model(a=1), stream)
 
     assert stream.getvalue().strip() == '{"a":1}'
+
+
+def test_wrapped_data_not_copied(mock_func, get_test_data_file):
+    mock_func(NotifyWrapper, '__deepcopy__', exception=AssertionError('Should not be copied'))
+    yaml_stream = io.StringIO()
+    json_stream = io.StringIO()
+
+    YamlSerializer().dump(tag({'a': ['b', {'c': 0, 'd': 1}], 'e': {1}}), yaml_stream)
+    JsonSerializer().dump(tag({'a': ['b', {'c': 0, 'd': 1}]}), json_stream)
+
+    assert yaml_stream.getvalue() == get_test_data_file('dump.yaml')
+    assert json_stream.getvalue() == get_test_data_file('dump.json')
+
+
+def test_pickle__round_trip():
+    serializer = PickleSerializer()
+    my_data = tag({'a': ['b', {'c': 0, 'd': 1.5}], 'e': {1}, 'f': SimpleNamespace(value='initial')})
+    stream = io.BytesIO()
+
+    serializer.dump(my_data, stream)
+    stream.seek(0)
+    result = serializer.load(stream)
+
+    assert result == {'a': ['b', {'c': 0, 'd': 1.5}], 'e': {1}, 'f': {'value': 'initial'}}
+    assert type(result['a'][1]) is dict
+
+
+def test_pickle__dataclass_and_pydantic():
+    serializer = PickleSerializer()
+
+    @dataclasses.dataclass
+    class Point:
+        x: int
+
+    class Model(pydantic.BaseModel):
+        a: int
+    stream = io.BytesIO()
+    serializer.dump({'point': Point(1), 'model': Model(a=1)}, stream)
+    stream.seek(0)
+
+    assert serializer.load(stream) == {'point': {'x': 1}, 'model': {'a': 1}}
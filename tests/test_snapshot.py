@@ -0,0 +1,101 @@
+import copy
+import threading
+
+import pytest
+
+from syncx import manage
+from syncx import sync
+from syncx import tag
+
+
+def test_snapshot_unaffected_by_changes():
+    data = tag({'list': [1, {'value': 'initial'}], 'set': {1}, 'unchanged': {'a': 1}})
+    snapshot = manage(data).snapshot()
+
+    data['list'][1]['value'] = 'changed'
+    data['list'].append(3)
+    data['set'].add(2)
+    data['new'] = True
+    del data['unchanged']
+
+    assert snapshot == {'list': [1, {'value': 'initial'}], 'set': {1}, 'unchanged': {'a': 1}}
+    assert snapshot['list'][1]['value'] == 'initial'
+    assert len(snapshot['list']) == 2
+    assert 2 not in snapshot['set']
+    assert list(snapshot) == ['list', 'set', 'unchanged']
+    assert copy.deepcopy(snapshot) == {'list': [1, {'value': 'initial'}], 'set': {1}, 'unchanged': {'a': 1}}
+
+
+def test_snapshot_copies_only_changed_containers():
+    data = tag({'a': {'value': 1}, 'b': {'value': 2}})
+    before = manage(data).snapshot()
+
+    data['a']['value'] = 3
+    data['a']['value'] = 4
+
+    assert [original for original, copied in before._snapshot.preserved.values()] == [data['a'].__subject__]
+    assert before['b'] == {'value': 2}
+    assert before['a'] == {'value': 1}
+
+
+def test_snapshot_version():
+    data = tag({'value': 0})
+    first = manage(data).snapshot()
+    data['value'] = 1
+    second = manage(data).snapshot()
+
+    assert first.version == 0
+    assert second.version == 1
+    assert first == {'value': 0}
+    assert second == {'value': 1}
+
+
+def test_snapshot_read_only():
+    snapshot = manage(tag({'value': 0})).snapshot()
+
+    with pytest.raises(TypeError):
+        snapshot['value'] = 1
+    with pytest.raises(AttributeError):
+        snapshot.value = 1
+
+
+def test_snapshot_released_when_not_used():
+    data = tag({'value': 0})
+    manage(data).snapshot()
+
+    data['value'] = 1
+
+    assert not data._manager.snapshots
+
+
+def test_snapshot_after_rollback(run_in_tmp_path):
+    data = sync({'values': [1, 2]}, 'data.yaml', history=True)
+    data['values'].append(3)
+    snapshot = manage(data).snapshot()
+
+    with data:
+        data['values'].clear()
+        data['values'].append(4)
+    data._manager.undo()
+    data._manager.undo()
+
+    assert snapshot == {'values': [1, 2, 3]}
+
+
+def test_snapshot_consistent_while_changed_in_another_thread():
+    data = tag({'values': list(range(100))}, read_write_lock=True)
+    snapshot = manage(data).snapshot()
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            data['values'].append(data['values'].pop(0))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(20):
+            assert list(snapshot['values']) == list(range(100))
+    finally:
+        stop.set()
+        thread.join()
@@ -1,18 +1,43 @@
 from dataclasses import astuple
+from decimal import Decimal
+from uuid import UUID
 
 import pytest
 
+import dictdiffer
 from dictdiffer import diff
 from syncx.sync_logic import Content
 from syncx.sync_logic import DeltaSignature
 from syncx.sync_logic import DeltaWithSignature
 from syncx.sync_logic import MultiClientIncremental
 from syncx.sync_logic import get_signature
+from syncx.sync_logic import paths_overlap
+from syncx.sync_logic import touched_paths
+from syncx.sync_logic import verify_chain
 
 
 def test_get_signature():
-    assert astuple(get_signature(None, 'foobar')) == (0, '5f6f3065208dde5f4624d7dfafc36a296a526590')
-    assert astuple(get_signature(DeltaSignature(1, 'aaa'), 'foobar')) == (2, '5f6f3065208dde5f4624d7dfafc36a296a526590')
+    assert astuple(get_signature(None, 'foobar')) == (0, 'c18dc11b6030b5c2e7d66b0dff5089994c0b2ebb')
+    assert astuple(get_signature(DeltaSignature(1, 'aa' * 20), 'foobar')) == (
+        2, 'c9ab35e8f6df1fc8b3f741a4649f1436166e36c7'
+    )
+
+
+def test_get_signature__non_json_values():
+    delta = [('add', '', [('tags', {'b', 'a'}), ('price', Decimal('1.10')), ('id', UUID(int=1))])]
+    same_delta = [('add', '', [('tags', {'a', 'b'}), ('price', Decimal('1.10')), ('id', UUID(int=1))])]
+
+    assert get_signature(None, delta) == get_signature(None, same_delta)
+
+
+def test_verify_chain():
+    first = DeltaWithSignature(get_signature(None, [('add', '', [('a', 1)])]), [('add', '', [('a', 1)])])
+    second = DeltaWithSignature(get_signature(first.signature, [('add', '', [('b', 2)])]), [('add', '', [('b', 2)])])
+
+    assert verify_chain(None, [first, second])
+    assert verify_chain(first.signature, [second])
+    assert not verify_chain(None, [second])
+    assert not verify_chain(None, [first, DeltaWithSignature(second.signature, [('add', '', [('b', 3)])])])
 
 
 @pytest.mark.parametrize('remote_object, should_be_ok', (
@@ -68,4 +93,46 @@ def test_ok_to_apply__with_unapplied_deltas(remote_object, should_be_ok):
         local_latest_signature,
         local_delta,
         local_object,
-    ) == should_be_ok
\ No newline at end of file
+    ) == should_be_ok
+
+
+def test_touched_paths():
+    delta = [
+        ('change', 'a.b', (1, 2)),
+        ('add', 'c', [('d', 1), ('e', 2)]),
+        ('remove', ['list'], [(3, 'x')]),
+    ]
+    assert touched_paths(delta) == {('a', 'b'), ('c', 'd'), ('c', 'e'), ('list',)}
+
+
+@pytest.mark.parametrize('paths, other_paths, expected', (
+    ({('a', 'b')}, {('a', 'c')}, False),
+    ({('a', 'b')}, {('a', 'b')}, True),
+    ({('a',)}, {('a', 'b', 'c')}, True),
+    ({('a', 'b', 'c')}, {('a',)}, True),
+    ({()}, {('a',)}, True),
+    (set(), {('a',)}, False),
+))
+def test_paths_overlap(paths, other_paths, expected):
+    assert paths_overlap(paths, other_paths) == expected
+
+
+def test_ok_to_apply__disjoint_changes_accepted_without_copying(mock_func):
+    baseline = {'a': {'value': 0}, 'b': {'value': 0}}
+    local_object = {'a': {'value': 1}, 'b': {'value': 0}}
+    local_delta = list(diff(baseline, local_object))
+    local_signature = get_signature(None, local_delta)
+    remote_delta = [('change', 'b.value', (0, 2))]
+    content = Content(
+        latest_signature=get_signature(local_signature, remote_delta),
+        full_object=baseline,
+        unapplied_changes=[
+            DeltaWithSignature(local_signature, local_delta),
+            DeltaWithSignature(get_signature(local_signature, remote_delta), remote_delta),
+        ],
+    )
+
+    mock_patch = mock_func(dictdiffer, 'patch')
+    mock_revert = mock_func(dictdiffer, 'revert')
+    assert MultiClientIncremental(None, None).ok_to_apply(content, local_signature, local_delta, local_object)
+    assert not mock_patch.calls and not mock_revert.calls
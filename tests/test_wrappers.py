@@ -5,6 +5,7 @@ import pytest
 from syncx import rollback
 from syncx import tag
 from syncx import untag
+from syncx import wrappers
 from syncx.manager import Manager
 from syncx.wrappers import CustomObjectWrapper
 from syncx.wrappers import DictWrapper
@@ -120,3 +121,115 @@ def test_context_manager(mock_func, should_rollback):
     assert len(mock_start.calls) == 1
     assert len(mock_end.calls) == 1
     assert mock_end.kwargs == {'do_rollback': should_rollback}
+
+
+def test_only_changed_members_wrapped(monkeypatch):
+    wrapped = tag({'list': [{'a': 1}], 'dict': {}})
+    iterated = []
+    get_iterable = wrappers.get_iterable
+    monkeypatch.setattr(wrappers, 'get_iterable', lambda obj: iterated.append(obj) or get_iterable(obj))
+
+    wrapped['list'].append({'b': 2})
+    wrapped['list'][0] = [3]
+    wrapped['dict']['c'] = {4}
+    wrapped['dict'].update({'d': {}}, e=[])
+
+    assert iterated == [{'b': 2}, [3], {4}, {}, []]  # Only the new members
+    assert type(wrapped['list'][1]) is DictWrapper
+    assert type(wrapped['list'][0]) is ListWrapper
+    assert type(wrapped['dict']['c']) is SetWrapper
+    assert type(wrapped['dict']['d']) is DictWrapper
+    assert type(wrapped['dict']['e']) is ListWrapper
+
+
+def test_moved_members_paths(catcher):
+    wrapped = tag([{'a': 1}, {'b': 2}], catcher.changed)
+
+    wrapped.insert(0, {})
+    wrapped[2]['b'] = 3
+    wrapped.pop(0)
+    wrapped[1]['b'] = 4
+
+    assert catcher.paths == [[], [2], [], [1]]
+
+
+def test_lazy(catcher):
+    wrapped = tag({'a': [{'b': 1}], 'c': {'d': set()}}, catcher.changed, lazy=True)
+    subject = wrapped.__subject__
+    assert type(subject['a']) is list
+
+    wrapped['a'][0]['b'] = 2
+    assert type(subject['a']) is ListWrapper
+    assert type(subject['a'].__subject__[0]) is DictWrapper
+    assert type(subject['c']) is dict
+
+    for value in wrapped.values():
+        assert wrappers.is_wrapped(value)
+    wrapped['c']['d'].add(3)
+
+    assert catcher.paths == [['a', 0], ['c', 'd']]
+    assert untag(wrapped) == {'a': [{'b': 2}], 'c': {'d': {3}}}
+
+
+def test_lazy__moved_members(catcher):
+    wrapped = tag([{'a': 1}, {'b': 2}], catcher.changed, lazy=True)
+    wrapped[1]['b'] = 3
+
+    wrapped.insert(0, {})
+    wrapped[2]['b'] = 4
+    wrapped[0]['c'] = 5
+
+    assert catcher.paths == [[1], [], [2], [0]]
+
+
+def test_lazy__rollback():
+    wrapped = tag({'a': {'b': 1}}, lazy=True)
+
+    with wrapped:
+        wrapped['a']['b'] = 2
+        wrapped['a']['c'] = {'d': 3}
+        wrapped['a']['c']['d'] = 4
+        rollback()
+
+    assert wrapped == {'a': {'b': 1}}
+
+
+def test_setdefault_returns_tracked_value(catcher):
+    wrapped = tag({}, catcher.changed)
+
+    wrapped.setdefault('a', []).append(1)
+    wrapped.setdefault('a', []).append(2)
+
+    assert wrapped == {'a': [1, 2]}
+    assert catcher.paths == [[], ['a'], [], ['a']]
+
+
+def test_sequence_members_keep_wrappers_when_moved(catcher):
+    wrapped = tag([{'a': 1}, {'b': 2}, {'c': 3}], catcher.changed)
+    member_wrappers = list(wrapped.__subject__)
+
+    wrapped.insert(0, {})
+    wrapped.remove({'a': 1})
+    del wrapped[0]
+
+    assert all(a is b for a, b in zip(wrapped.__subject__, member_wrappers[1:]))
+    assert '_path' not in object.__getattribute__(member_wrappers[1], '__dict__')
+
+    wrapped[1]['c'] = 4
+    wrapped.reverse()
+    wrapped[1]['b'] = 5
+
+    assert catcher.paths[-3:] == [[1], [], [1]]
+    assert wrapped == [{'c': 4}, {'b': 5}]
+
+
+def test_same_sequence_member_in_different_indexes(catcher):
+    wrapped = tag([{'a': 1}], catcher.changed)
+    wrapped.append(wrapped[0])
+
+    wrapped[0]['a'] = 2
+    wrapped[1]['a'] = 3
+
+    assert wrapped[0] is not wrapped[1]
+    assert catcher.paths == [[], [0], [1]]
+    assert wrapped == [{'a': 3}, {'a': 3}]
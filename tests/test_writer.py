@@ -0,0 +1,224 @@
+import asyncio
+import time
+
+import pytest
+
+from syncx import flush
+from syncx import manage
+from syncx import sync
+from syncx import sync_async
+from syncx.backend import AsyncFileBackend
+from syncx.backend import FileBackend
+
+
+def wait_for(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_changes_coalesced(mock_func):
+    mock_func(FileBackend, 'get', None)
+    mock_put = mock_func(FileBackend, 'put')
+    data = sync({'value': 0}, 'data.yaml', flush_interval=60)
+
+    for value in range(100):
+        data['value'] = value
+
+    assert len(mock_put.calls) == 1  # Initial save only
+
+    flush(data)
+    assert len(mock_put.calls) == 2
+    assert mock_put.calls[1].args[0]['value'] == 99
+
+    manage(data).flush()
+    assert len(mock_put.calls) == 2  # Nothing pending
+
+    data._manager.writer.close()
+
+
+def test_written_after_interval(mock_func):
+    mock_func(FileBackend, 'get', None)
+    mock_put = mock_func(FileBackend, 'put')
+    data = sync({'value': 0}, 'data.yaml', flush_interval=0.01)
+
+    data['value'] = 1
+    data['value'] = 2
+    wait_for(lambda: len(mock_put.calls) == 2)
+
+    assert len(mock_put.calls) == 2
+    assert mock_put.calls[1].args[0]['value'] == 2
+
+    data._manager.writer.close()
+
+
+def test_written_after_max_changes(mock_func):
+    mock_func(FileBackend, 'get', None)
+    mock_put = mock_func(FileBackend, 'put')
+    data = sync({'value': 0}, 'data.yaml', flush_interval=60, flush_changes=3)
+
+    for value in range(3):
+        data['value'] = value
+
+    wait_for(lambda: len(mock_put.calls) == 2)
+
+    assert len(mock_put.calls) == 2
+
+    data._manager.writer.close()
+
+
+def test_written_on_close(run_in_tmp_path):
+    data = sync({'value': 'initial'}, 'data.yaml', flush_interval=60)
+    data['value'] = 'changed'
+
+    data._manager.writer.close()
+
+    assert not data._manager.writer.thread.is_alive()
+    assert sync({}, 'data.yaml')['value'] == 'changed'
+
+
+def test_deltas_combined(mock_func, monkeypatch):
+    mock_func(FileBackend, 'get', None)
+    mock_put = mock_func(FileBackend, 'put')
+    monkeypatch.setattr(FileBackend, 'incremental', True)
+    data = sync({'value': 0}, 'data.yaml', flush_interval=60)
+
+    data['value'] = 1
+    data['other'] = 2
+    flush(data)
+
+    assert mock_put.calls[1].kwargs['delta'] == [
+        ('change', 'value', (0, 1)),
+        ('add', '', [('other', 2)]),
+    ]
+
+    data._manager.writer.close()
+
+
+def test_failed_write_retried(mock_func, mock_logger_exception, monkeypatch):
+    mock_func(FileBackend, 'get', None)
+    mock_put = mock_func(FileBackend, 'put')
+    monkeypatch.setattr(FileBackend, 'incremental', True)
+    data = sync({'value': 0}, 'data.yaml', flush_interval=0.01)
+    writer = data._manager.writer
+
+    mock_put.exception = OSError('Disk full')
+    data['value'] = 1
+    wait_for(lambda: mock_logger_exception.calls)
+    assert mock_logger_exception.calls
+    assert writer.thread.is_alive()
+
+    mock_put.exception = None
+    wait_for(lambda: not writer.dirty)
+    assert mock_put.calls[-1].kwargs['delta'] == [('change', 'value', (0, 1))]
+
+    writer.close()
+
+
+def test_failed_flush_keeps_changes(mock_func, monkeypatch):
+    mock_func(FileBackend, 'get', None)
+    mock_put = mock_func(FileBackend, 'put')
+    monkeypatch.setattr(FileBackend, 'incremental', True)
+    data = sync({'value': 0}, 'data.yaml', flush_interval=60)
+
+    mock_put.exception = OSError('Disk full')
+    data['value'] = 1
+    with pytest.raises(OSError):
+        flush(data)
+
+    mock_put.exception = None
+    data['other'] = 2
+    flush(data)
+    assert mock_put.calls[-1].kwargs['delta'] == [
+        ('change', 'value', (0, 1)),
+        ('add', '', [('other', 2)]),
+    ]
+
+    data._manager.writer.close()
+
+
+def test_async__changes_coalesced_on_loop(mock_func):
+    mock_func(FileBackend, 'get', None)
+    mock_write = mock_func(FileBackend, 'write')
+
+    async def main():
+        data = await sync_async({'value': 0}, 'data.yaml')
+        assert len(mock_write.calls) == 1  # Initial save
+
+        for value in range(100):
+            data['value'] = value
+        assert len(mock_write.calls) == 1  # Not written while the loop is busy
+
+        await asyncio.sleep(0.05)
+        assert len(mock_write.calls) == 2
+        assert mock_write.calls[1].args[0] == 'value: 99\n'
+
+    asyncio.run(main())
+
+
+def test_async__flush(run_in_tmp_path):
+
+    async def main():
+        data = await sync_async({'value': 'initial'}, 'data.yaml', flush_interval=60)
+        data['value'] = 'changed'
+        await flush(data)
+
+        assert (await AsyncFileBackend('data.yaml').get(data._manager.serializer)) == {'value': 'changed'}
+        await data._manager.writer.close()
+
+    asyncio.run(main())
+
+
+def test_async__pending_changes_written_when_loop_stops(run_in_tmp_path):
+
+    async def main():
+        data = await sync_async({'value': 'initial'}, 'data.yaml', flush_interval=60)
+        data['value'] = 'changed'
+
+    asyncio.run(main())
+
+    assert sync({}, 'data.yaml') == {'value': 'changed'}
+
+
+def test_async__failed_write_retried(mock_func, mock_logger_exception):
+    mock_func(FileBackend, 'get', None)
+    mock_write = mock_func(FileBackend, 'write')
+
+    async def main():
+        data = await sync_async({'value': 0}, 'data.yaml')
+        mock_write.exception = OSError('Disk full')
+        data['value'] = 1
+        await asyncio.sleep(0.05)
+
+        assert mock_logger_exception.calls
+        assert data._manager.writer.dirty
+
+        mock_write.exception = None
+        await flush(data)
+        assert mock_write.calls[-1].args[0] == 'value: 1\n'
+
+    asyncio.run(main())
+
+
+def test_async__max_changes(mock_func):
+    mock_func(FileBackend, 'get', None)
+    mock_write = mock_func(FileBackend, 'write')
+
+    async def main():
+        data = await sync_async({'value': 0}, 'data.yaml', flush_interval=60, flush_changes=2)
+        data['value'] = 1
+        data['value'] = 2
+        await asyncio.wait_for(data._manager.writer.task, 1)
+
+        assert len(mock_write.calls) == 2
+
+    asyncio.run(main())
+
+
+def test_async__existing_content(run_in_tmp_path):
+    sync({'value': 'existing'}, 'data.yaml')
+
+    async def main():
+        return await sync_async({}, 'data.yaml')
+
+    assert asyncio.run(main()) == {'value': 'existing'}